@@ -1,28 +1,68 @@
-from flask import Flask
+from flask import Flask, jsonify
 from flask_cors import CORS
 from app.config import Config
 from app.routes.courses import courses_bp
 from app.routes.structure import structure_bp
-from app.routes.search import search_bp
 from app.routes.auth import auth_bp
 from app.routes.user import user_bp
 from app.routes.user_courses import user_courses_bp
+from app.routes.health import health_bp
+from app.routes.curriculum import curriculum_bp, import_curriculum_command, export_curriculum_command
+from app.memory_graph import UnsupportedQuery
+from app.queries import start_plan_warm_up
+from app.rdf_loader import load_ontology_command
+from app.schema import bootstrap_schema_command, start_schema_bootstrap
+from app.search_index import course_store, start_warm_up, build_search_index_command
+from app.utils import BOOKMARK_HEADER, attach_bookmark, close_session
 
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
-    # Enable CORS for all routes and origins
-    CORS(app)
+    # Enable CORS for all routes and origins; browsers may read the bookmark header
+    CORS(app, expose_headers=[BOOKMARK_HEADER])
+
+    # Hand out the bookmark of the request's writes, then close its Neo4j session
+    app.after_request(attach_bookmark)
+    app.teardown_appcontext(close_session)
+
+    # Routes the in-memory graph has no handler for (see app/memory_graph.py)
+    @app.errorhandler(UnsupportedQuery)
+    def unsupported_query(e):
+        return jsonify({'error': 'This endpoint needs GRAPH_BACKEND=neo4j.'}), 501
 
     # Register blueprints
     app.register_blueprint(courses_bp)
     app.register_blueprint(structure_bp)
-    app.register_blueprint(search_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(user_bp)
     app.register_blueprint(user_courses_bp)
+    app.register_blueprint(health_bp)
+    app.register_blueprint(curriculum_bp)
+
+    # The search route imports torch; PhoBERT itself loads on first use or in the warm-up thread
+    if Config.SEARCH_ENABLED:
+        from app.routes.search import search_bp
+        app.register_blueprint(search_bp)
+
+        # Load the course embeddings built earlier (or by `flask build-search-index`)
+        course_store.load()
+        if Config.SEARCH_WARMUP:
+            start_warm_up()
+    app.cli.add_command(build_search_index_command)
+    app.cli.add_command(import_curriculum_command)
+    app.cli.add_command(export_curriculum_command)
+    app.cli.add_command(load_ontology_command)
+    app.cli.add_command(bootstrap_schema_command)
+
+    # The in-memory graph has no schema and no query plans
+    if Config.GRAPH_BACKEND == 'neo4j':
+        if Config.SCHEMA_BOOTSTRAP:
+            start_schema_bootstrap()
+        # Compile the registered queries so the first requests after a deploy hit cached plans
+        if Config.NEO4J_PLAN_WARMUP:
+            start_plan_warm_up()
 
     
     @app.route('/', methods=['GET'])
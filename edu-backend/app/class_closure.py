@@ -0,0 +1,63 @@
+# app/class_closure.py
+# The transitive rdfs__subClassOf closure, read with one query and kept in
+# process. Classes only change when the ontology is (re)loaded or a class-level
+# relation is written; those bump graph_version.CLASSES, and other workers pick
+# the change up within CLASS_CLOSURE_TTL.
+import hashlib
+import json
+from app import graph_version
+from app.config import Config
+from app.queries import named_query
+from app.search_cache import LRUCache
+from app.utils import execute_read
+
+# Courses are the instances of every subclass of this class
+COURSE_ROOT_LABEL = 'Môn học'
+
+class ClassClosure:
+    def __init__(self, rows):
+        self.labels = {}
+        # ancestor elementId -> {descendant elementId: shortest rdfs__subClassOf distance}
+        self.descendants = {}
+        for row in rows:
+            self.labels[row['child_id']] = row['child_label']
+            self.labels[row['ancestor_id']] = row['ancestor_label']
+            self.descendants.setdefault(row['ancestor_id'], {})[row['child_id']] = row['depth']
+        roots = [class_id for class_id, label in self.labels.items() if label == COURSE_ROOT_LABEL]
+        self.course_classes = sorted({class_id for root in roots for class_id in self.descendants.get(root, {})})
+
+        # GET /structure/ontology-classes is serialized once per closure, with a
+        # strong ETag over the exact bytes
+        self.structure_json = json.dumps({'ontology_structure': self.ontology_structure()}, ensure_ascii=False).encode('utf-8')
+        self.etag = hashlib.sha256(self.structure_json).hexdigest()
+
+    # Each ancestor with all of its descendants, nearest first
+    def ontology_structure(self):
+        return [
+            {
+                'ancestor': {'ancestor_id': ancestor_id, 'ancestor_label': self.labels[ancestor_id]},
+                'children': [
+                    {'child_id': child_id, 'child_label': self.labels[child_id], 'depth': depth}
+                    for child_id, depth in sorted(descendants.items(), key=lambda item: (item[1], item[0]))
+                ]
+            }
+            for ancestor_id, descendants in sorted(self.descendants.items())
+        ]
+
+_closure_cache = LRUCache(1, Config.CLASS_CLOSURE_TTL)
+
+def class_closure():
+    key = graph_version.current(graph_version.CLASSES)
+    closure = _closure_cache.get(key)
+    if closure is None:
+        closure = ClassClosure(execute_read(named_query('class_closure')))
+        _closure_cache.set(key, closure)
+    return closure
+
+def course_classes():
+    return class_closure().course_classes
+
+# Call after any write that may add, remove or re-parent a class
+def classes_changed():
+    graph_version.bump(graph_version.CLASSES)
+    graph_version.bump(graph_version.COURSES)
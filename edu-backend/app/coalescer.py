@@ -0,0 +1,109 @@
+# app/coalescer.py
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+# Collects texts submitted by concurrent callers, encodes them in one batched call
+# and hands each caller its own row. A batch takes everything already queued (up to
+# `max_batch`), and only waits, for at most `window_ms` after its first text, while
+# other submit() calls are still in flight, so a lone query never waits at all.
+# Texts that arrive during a forward pass are batched into the next one
+class BatchCoalescer:
+    def __init__(self, encode_fn, window_ms=5, max_batch=32):
+        self.encode_fn = encode_fn
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        # submit() calls that have not returned yet
+        self._in_flight = 0
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'batches': 0,
+            'items': 0,
+            'max_batch_size': 0,
+            'batch_sizes': {},
+            'total_wait_ms': 0.0,
+            'max_wait_ms': 0.0,
+            'errors': 0
+        }
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='batch-coalescer', daemon=True)
+                    self._thread.start()
+
+    def submit(self, text):
+        with self._stats_lock:
+            self._in_flight += 1
+        try:
+            self._ensure_started()
+            future = Future()
+            self._queue.put((text, time.perf_counter(), future))
+            return future.result()
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+
+    def _others_in_flight(self, batch):
+        with self._stats_lock:
+            return self._in_flight > len(batch)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0][1] + self.window
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not self._others_in_flight(batch):
+                break
+            try:
+                batch.append(self._queue.get(timeout=min(remaining, 0.001)))
+            except queue.Empty:
+                pass
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.perf_counter()
+            self._record(len(batch), [(started - enqueued) * 1000 for _, enqueued, _ in batch])
+            try:
+                rows = self.encode_fn([text for text, _, _ in batch])
+            except Exception as e:
+                with self._stats_lock:
+                    self._stats['errors'] += 1
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), row in zip(batch, rows):
+                future.set_result(row)
+
+    def _record(self, size, waits_ms):
+        with self._stats_lock:
+            stats = self._stats
+            stats['batches'] += 1
+            stats['items'] += size
+            stats['max_batch_size'] = max(stats['max_batch_size'], size)
+            stats['batch_sizes'][size] = stats['batch_sizes'].get(size, 0) + 1
+            stats['total_wait_ms'] += sum(waits_ms)
+            stats['max_wait_ms'] = max(stats['max_wait_ms'], max(waits_ms))
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = dict(self._stats, batch_sizes=dict(sorted(self._stats['batch_sizes'].items())))
+        stats['window_ms'] = self.window * 1000
+        stats['max_batch'] = self.max_batch
+        stats['queued'] = self._queue.qsize()
+        stats['mean_batch_size'] = stats['items'] / stats['batches'] if stats['batches'] else 0.0
+        stats['mean_wait_ms'] = stats['total_wait_ms'] / stats['items'] if stats['items'] else 0.0
+        return stats
@@ -7,4 +7,78 @@ class Config:
     NEO4J_DATABASE = os.getenv("NEO4J_DATABASE")
     NEO4J_URI = os.getenv("NEO4J_URI")
     NEO4J_USER = os.getenv("NEO4J_USER")
-    NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
\ No newline at end of file
+    NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD")
+
+    # "neo4j", or "memory": the graph is built from MEMORY_GRAPH_SOURCE on first use and
+    # writes are appended to MEMORY_GRAPH_LOG, replayed on the next start and tailed by
+    # every worker sharing it (see app/memory_graph.py)
+    GRAPH_BACKEND = os.getenv("GRAPH_BACKEND", "neo4j")
+    MEMORY_GRAPH_SOURCE = os.getenv("MEMORY_GRAPH_SOURCE", "../ontology.rdf")
+    MEMORY_GRAPH_LOG = os.getenv("MEMORY_GRAPH_LOG", "memory_graph.log.jsonl")
+
+    # Driver connection pool; retries of transient errors give up after NEO4J_MAX_RETRY_TIME seconds
+    NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", 100))
+    NEO4J_ACQUISITION_TIMEOUT = float(os.getenv("NEO4J_ACQUISITION_TIMEOUT", 60))
+    NEO4J_MAX_CONNECTION_LIFETIME = float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", 3600))
+    NEO4J_MAX_RETRY_TIME = float(os.getenv("NEO4J_MAX_RETRY_TIME", 30))
+
+    # Rows per UNWIND statement of the bulk curriculum import
+    CURRICULUM_BATCH_SIZE = int(os.getenv("CURRICULUM_BATCH_SIZE", 500))
+
+    # Triples per write transaction of `flask load-ontology`
+    RDF_BATCH_SIZE = int(os.getenv("RDF_BATCH_SIZE", 2000))
+
+    # Create the indexes and constraints of app/schema.py (IF NOT EXISTS) in the background at startup
+    SCHEMA_BOOTSTRAP = os.getenv("SCHEMA_BOOTSTRAP", "true").lower() == "true"
+
+    # EXPLAIN every query of app/queries.py in the background at startup
+    NEO4J_PLAN_WARMUP = os.getenv("NEO4J_PLAN_WARMUP", "true").lower() == "true"
+
+    # In-process caches of the class closure and the GET /courses total; writes in this
+    # worker invalidate them at once, other workers see the change within the TTL
+    CLASS_CLOSURE_TTL = float(os.getenv("CLASS_CLOSURE_TTL", 300))
+    COURSE_COUNT_TTL = float(os.getenv("COURSE_COUNT_TTL", 60))
+    # Semester-bucketed course index behind GET /courses/<id>/eligible-relations
+    CURRICULUM_INDEX_TTL = float(os.getenv("CURRICULUM_INDEX_TTL", 60))
+    # Prerequisite DAG behind GET /curriculum/plan; relation writes in this worker update it in place
+    CURRICULUM_PLAN_TTL = float(os.getenv("CURRICULUM_PLAN_TTL", 60))
+
+    # Semantic search (POST /search); the encoder loads lazily or in a background warm-up
+    SEARCH_ENABLED = os.getenv("SEARCH_ENABLED", "true").lower() == "true"
+    SEARCH_WARMUP = os.getenv("SEARCH_WARMUP", "true").lower() == "true"
+    ENCODER_MODEL_NAME = os.getenv("ENCODER_MODEL_NAME", "vinai/phobert-base-v2")
+    # "fp32" (default) or "int8" dynamic quantization of the Linear layers
+    ENCODER_MODE = os.getenv("ENCODER_MODE", "fp32")
+    ENCODER_TORCH_THREADS = int(os.getenv("ENCODER_TORCH_THREADS", 0))
+
+    # "local" encodes inside each worker; "service" calls the shared process in app/embedding_service.py
+    ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "local")
+    ENCODER_SOCKET = os.getenv("ENCODER_SOCKET", "/tmp/edu-encoder.sock")
+    ENCODER_SERVICE_TIMEOUT = float(os.getenv("ENCODER_SERVICE_TIMEOUT", 30))
+    ENCODER_FALLBACK = os.getenv("ENCODER_FALLBACK", "true").lower() == "true"
+
+    # Concurrent search queries are encoded together, up to this many; a batch waits at most this many ms
+    # for other in-flight queries (0 disables), a lone query never waits (see app/coalescer.py)
+    SEARCH_COALESCE_WINDOW_MS = float(os.getenv("SEARCH_COALESCE_WINDOW_MS", 5))
+    SEARCH_COALESCE_MAX_BATCH = int(os.getenv("SEARCH_COALESCE_MAX_BATCH", 32))
+
+    # Precomputed course embeddings used by POST /search
+    SEARCH_INDEX_PATH = os.getenv("SEARCH_INDEX_PATH", "search_index/course_embeddings.npz")
+    SEARCH_FAISS_PATH = os.getenv("SEARCH_FAISS_PATH", "search_index/courses.faiss")
+
+    # "matrix": one float16 matrix memory-mapped read-only by every worker, optionally
+    # PCA-reduced to SEARCH_PCA_DIMS (0 keeps all 768); "faiss": in-process FAISS index
+    SEARCH_VECTOR_BACKEND = os.getenv("SEARCH_VECTOR_BACKEND", "matrix")
+    SEARCH_MATRIX_PATH = os.getenv("SEARCH_MATRIX_PATH", "search_index/courses.f16.npy")
+    SEARCH_PCA_DIMS = int(os.getenv("SEARCH_PCA_DIMS", 0))
+
+    # Hybrid ranking: similarity + weight * (BM25 / best BM25). With SEARCH_CANDIDATES > 0 only that many
+    # top BM25 courses are scored densely whenever the query has lexical matches
+    SEARCH_BM25_WEIGHT = float(os.getenv("SEARCH_BM25_WEIGHT", 0.2))
+    SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", 0))
+    SEARCH_ENCODE_BATCH_SIZE = int(os.getenv("SEARCH_ENCODE_BATCH_SIZE", 32))
+
+    # LRU/TTL caches of query embeddings and top-k results (size 0 disables)
+    SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", 1024))
+    SEARCH_EMBEDDING_CACHE_TTL = float(os.getenv("SEARCH_EMBEDDING_CACHE_TTL", 86400))
+    SEARCH_RESULT_CACHE_TTL = float(os.getenv("SEARCH_RESULT_CACHE_TTL", 600))
@@ -0,0 +1,72 @@
+# app/constraints.py
+# Semester rules shared by the course routes, the curriculum import and
+# POST /curriculum/validate. A tienQuyet/hocTruoc relation points from a course
+# to one taken in an earlier semester; songHanh courses share a semester.
+
+# Semester rule for a relation from a course to its target; None when allowed
+def relation_semester_error(relation_type, course_semester, target_semester):
+    if course_semester is None or target_semester is None:
+        return None
+    if relation_type == 'ns0__tienQuyet' and course_semester <= target_semester:
+        return f'Prerequisite violation: The course (semester {course_semester}) must come after its prerequisite (semester {target_semester}).'
+    if relation_type == 'ns0__hocTruoc' and course_semester <= target_semester:
+        return f'Prior violation: The course (semester {course_semester}) must come after the course taken before it (semester {target_semester}).'
+    if relation_type == 'ns0__songHanh' and course_semester != target_semester:
+        return f'Parallel violation: The courses must be in the same semester ({course_semester} and {target_semester}).'
+    return None
+
+# The semester relations of a set of courses held in memory. check() validates
+# a proposed change set against it in one pass: semester moves, new relations
+# and removed ones, with only the relations the change touches re-checked
+class SemesterConstraints:
+    def __init__(self, semesters, relations):
+        # course id -> semester (None when unset)
+        self.semesters = semesters
+        # relation id -> (course id, relation type, target id)
+        self.relations = relations
+        # course id -> ids of its relations in either direction
+        self.touching = {}
+        for relation_id, (course_id, _, target_id) in relations.items():
+            self.touching.setdefault(course_id, set()).add(relation_id)
+            self.touching.setdefault(target_id, set()).add(relation_id)
+
+    # moves: {course id: new semester}; added: [(course id, relation type, target id)];
+    # removed: relation ids. With everything=True every stored relation is checked
+    def check(self, moves=None, added=(), removed=(), everything=False):
+        moves = moves or {}
+        removed = set(removed)
+        if everything:
+            relation_ids = set(self.relations)
+        else:
+            relation_ids = {relation_id for course_id in moves for relation_id in self.touching.get(course_id, ())}
+        relations = [(relation_id, *self.relations[relation_id]) for relation_id in sorted(relation_ids - removed)]
+        relations += [(None, *relation) for relation in added]
+
+        errors = []
+        for relation_id, course_id, relation_type, target_id in relations:
+            course_semester = moves.get(course_id, self.semesters.get(course_id))
+            target_semester = moves.get(target_id, self.semesters.get(target_id))
+            error = relation_semester_error(relation_type, course_semester, target_semester)
+            if error:
+                errors.append({
+                    'relation_id': relation_id,
+                    'course_id': course_id,
+                    'relation_type': relation_type,
+                    'target_id': target_id,
+                    'course_semester': course_semester,
+                    'target_semester': target_semester,
+                    'error': error
+                })
+        return errors
+
+    # Builds the constraints from rows of {relation_id, course_id, relation_type,
+    # target_id, course_semester, target_semester}
+    @classmethod
+    def from_rows(cls, rows):
+        semesters = {}
+        relations = {}
+        for row in rows:
+            semesters[row['course_id']] = row['course_semester']
+            semesters[row['target_id']] = row['target_semester']
+            relations[row['relation_id']] = (row['course_id'], row['relation_type'], row['target_id'])
+        return cls(semesters, relations)
@@ -0,0 +1,100 @@
+# app/course_bitsets.py
+# Courses a student can take next, as bitset tests. Every course instance gets a
+# bit; each course's tienQuyet prerequisites are a row of uint64 words and a
+# student's completed courses another, so a course is open when its row has no
+# bit outside the student's, the rule incomplete_prerequisites applies when a
+# course is marked 'hoàn thành'. Built from the curriculum index and cached with it.
+from itertools import repeat
+import numpy as np
+from app.config import Config
+from app.curriculum_index import curriculum_index
+from app.search_cache import LRUCache
+
+# Word tests (students x mask words) done at once by next_courses()
+CHUNK_WORDS = 1 << 22
+
+def _word_bits(positions):
+    positions = np.asarray(positions, dtype=np.int64)
+    return positions // 64, np.left_shift(np.uint64(1), (positions % 64).astype(np.uint64))
+
+class CourseBitsets:
+    def __init__(self, index):
+        self.index = index
+        self.courses = index.courses
+        self.course_ids = sorted(index.courses)
+        self.positions = {course_id: position for position, course_id in enumerate(self.course_ids)}
+        self.words = max(1, (len(self.course_ids) + 63) // 64)
+        prerequisites = {}
+        for course_id, relation_type, target_id in index.relations.values():
+            if relation_type == 'ns0__tienQuyet' and target_id in self.positions:
+                prerequisites.setdefault(self.positions[course_id], set()).add(self.positions[target_id])
+        # Only courses with prerequisites need the mask test; the others are open
+        # to everyone who has not completed or started them
+        self.gated = np.array(sorted(prerequisites), dtype=np.int64)
+        # Prerequisite masks are sparse, so only their non-zero words are kept:
+        # mask_words[k] is word mask_columns[k] of a gated course's mask, and the
+        # words of gated course g start at mask_starts[g]
+        columns = []
+        words = []
+        starts = []
+        for position in self.gated:
+            word_indexes, bits = _word_bits(sorted(prerequisites[position]))
+            merged = {}
+            for word_index, bit in zip(word_indexes.tolist(), bits):
+                merged[word_index] = merged.get(word_index, np.uint64(0)) | bit
+            starts.append(len(columns))
+            columns.extend(merged)
+            words.extend(merged.values())
+        self.mask_columns = np.array(columns, dtype=np.int64)
+        self.mask_words = np.array(words, dtype=np.uint64)
+        self.mask_starts = np.array(starts, dtype=np.int64)
+
+    def _rows(self, user_ids, progress, key):
+        rows = []
+        positions = []
+        for row, user_id in enumerate(user_ids):
+            course_ids = progress.get(user_id, {}).get(key) or ()
+            found = np.fromiter(map(self.positions.get, course_ids, repeat(-1)), dtype=np.int64, count=len(course_ids))
+            found = found[found >= 0]
+            rows.append(np.full(len(found), row, dtype=np.int64))
+            positions.append(found)
+        flags = np.zeros((len(user_ids), self.words * 64), dtype=bool)
+        if rows:
+            flags[np.concatenate(rows), np.concatenate(positions)] = True
+        return flags
+
+    # {user_id: {completed, taken}} (course ids) -> (completed bitsets, taken
+    # flags), one row per user. Bit p of a bitset is bit p % 64 of word p // 64
+    def progress(self, user_ids, progress):
+        completed = np.packbits(self._rows(user_ids, progress, 'completed'), axis=1, bitorder='little')
+        taken = self._rows(user_ids, progress, 'taken')[:, :len(self.course_ids)]
+        return completed.view('<u8').astype(np.uint64), taken
+
+    # One boolean row per user: courses not completed or in progress whose
+    # prerequisite mask has no bit outside the user's completed bitset
+    def next_courses(self, user_ids, progress):
+        completed, taken = self.progress(user_ids, progress)
+        open_courses = ~taken
+        if not len(self.gated):
+            return open_courses
+        missing = ~completed
+        chunk = max(1, CHUNK_WORDS // len(self.mask_words))
+        for start in range(0, len(user_ids), chunk):
+            unmet = (missing[start:start + chunk, self.mask_columns] & self.mask_words) != 0
+            blocked = np.logical_or.reduceat(unmet, self.mask_starts, axis=1)
+            open_courses[start:start + chunk, self.gated] &= ~blocked
+        return open_courses
+
+    def course_list(self, row):
+        return [self.courses[self.course_ids[position]] for position in np.flatnonzero(row)]
+
+_bitsets_cache = LRUCache(1, Config.CURRICULUM_INDEX_TTL)
+
+# Rebuilt whenever curriculum_index() hands out a new index
+def course_bitsets():
+    index = curriculum_index()
+    bitsets = _bitsets_cache.get('bitsets')
+    if bitsets is None or bitsets.index is not index:
+        bitsets = CourseBitsets(index)
+        _bitsets_cache.set('bitsets', bitsets)
+    return bitsets
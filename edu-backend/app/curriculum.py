@@ -0,0 +1,216 @@
+# app/curriculum.py
+# Bulk curriculum import/export. A curriculum is a list of courses keyed by
+# ns0__maMonHoc; each course may list the codes it relates to under a relation
+# type key, e.g. {"ns0__maMonHoc": "mm21", "ns0__hocKy": 3, "ns0__songHanh": ["mm22"]}.
+# A top-level "relations" list of {course, relation_type, target} is accepted too.
+# In CSV the relation columns hold ';'-separated codes and rdf__type the class URIs.
+import csv
+import io
+import json
+from app.config import Config
+from app.constraints import SemesterConstraints
+from app.queries import RELATION_TYPES, named_query, relation_query
+from app.utils import execute_query
+
+EDU_NS = 'http://localhost/ontologies/2024/10/11/edu_program#'
+COURSE_FIELDS = ['ns0__maMonHoc', 'rdfs__label', 'ns0__hocKy', 'ns0__soTinChi', 'ns0__laMonTuChon', 'rdf__type']
+CSV_COLUMNS = COURSE_FIELDS + list(RELATION_TYPES)
+
+class CurriculumError(ValueError):
+    def __init__(self, errors):
+        super().__init__(f'{len(errors)} curriculum error(s).')
+        self.errors = errors
+
+def _split(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(';') if part.strip()]
+    return [str(part).strip() for part in value if str(part).strip()]
+
+def _number(value, convert):
+    if value is None or value == '':
+        return None
+    return convert(value)
+
+def _boolean(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ('true', '1', 'x', 'yes')
+
+def _class_uri(value):
+    return value if '://' in value else EDU_NS + value
+
+# Normalizes courses (from JSON or CSV rows) and relations into
+# ({code: course}, [(course, relation_type, target)]); raises CurriculumError
+def parse_curriculum(courses, relations=()):
+    errors = []
+    parsed = {}
+    pairs = []
+    for index, row in enumerate(courses):
+        if not isinstance(row, dict):
+            errors.append({'index': index, 'error': 'A course must be an object.'})
+            continue
+        code = str(row.get('ns0__maMonHoc') or '').strip()
+        if not code:
+            errors.append({'index': index, 'error': 'Missing ns0__maMonHoc.'})
+            continue
+        if code in parsed:
+            errors.append({'index': index, 'course': code, 'error': f'Course {code} appears more than once.'})
+            continue
+        try:
+            course = {
+                'ns0__maMonHoc': code,
+                'rdfs__label': row.get('rdfs__label') or None,
+                'ns0__hocKy': _number(row.get('ns0__hocKy'), int),
+                'ns0__soTinChi': _number(row.get('ns0__soTinChi'), float),
+                'ns0__laMonTuChon': _boolean(row.get('ns0__laMonTuChon')),
+                'rdf__type': [_class_uri(value) for value in _split(row.get('rdf__type'))] or None,
+                'uri': EDU_NS + code
+            }
+        except (TypeError, ValueError) as e:
+            errors.append({'index': index, 'course': code, 'error': f'Invalid value: {e}'})
+            continue
+        parsed[code] = course
+        for relation_type in RELATION_TYPES:
+            pairs.extend((code, relation_type, target) for target in _split(row.get(relation_type)))
+    for index, relation in enumerate(relations):
+        if not isinstance(relation, dict):
+            errors.append({'index': index, 'error': 'A relation must be an object.'})
+            continue
+        pairs.append((str(relation.get('course') or '').strip(), relation.get('relation_type'), str(relation.get('target') or '').strip()))
+
+    for course, relation_type, target in pairs:
+        if relation_type not in RELATION_TYPES:
+            errors.append({'course': course, 'error': f'Unknown relation type {relation_type}.'})
+        elif not course or not target:
+            errors.append({'course': course, 'error': f'Relation {relation_type} needs both a course and a target code.'})
+    if errors:
+        raise CurriculumError(errors)
+    return parsed, list(dict.fromkeys(pairs))
+
+def read_curriculum(stream, fmt):
+    if fmt == 'csv':
+        return parse_curriculum(list(csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig'))))
+    return parse_document(json.load(stream))
+
+# A decoded JSON curriculum: a list of courses, or {"courses": [...], "relations": [...]}
+def parse_document(data):
+    if isinstance(data, list):
+        return parse_curriculum(data)
+    if not isinstance(data, dict):
+        raise CurriculumError([{'error': 'Expected a list of courses or an object with "courses" and "relations".'}])
+    courses = data.get('courses', [])
+    relations = data.get('relations', [])
+    errors = [{'error': f'"{key}" must be a list.'} for key, value in (('courses', courses), ('relations', relations)) if not isinstance(value, list)]
+    if errors:
+        raise CurriculumError(errors)
+    return parse_curriculum(courses, relations)
+
+def _changed(course, existing):
+    for field in ('rdfs__label', 'ns0__hocKy', 'ns0__soTinChi', 'ns0__laMonTuChon'):
+        if course[field] is not None and course[field] != existing[field]:
+            return True
+    return bool(course['rdf__type'] and set(course['rdf__type']) - set(existing['rdf__type']))
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+# Checks the semester rules over the whole resulting curriculum: the imported
+# relations plus the stored ones touching an imported course, with imported
+# semesters applied as moves over the stored ones
+def validate_curriculum(courses, pairs, existing, stored_relations):
+    semesters = {code: course['ns0__hocKy'] for code, course in existing.items()}
+    stored = {}
+    for index, relation in enumerate(stored_relations):
+        semesters.setdefault(relation['course'], relation['course_semester'])
+        semesters.setdefault(relation['target'], relation['target_semester'])
+        stored[index] = (relation['course'], relation['relation_type'], relation['target'])
+    moves = {}
+    for code, course in courses.items():
+        if course['ns0__hocKy'] is not None or code not in semesters:
+            moves[code] = course['ns0__hocKy']
+
+    errors = []
+    added = []
+    known = set(stored.values())
+    for course, relation_type, target in pairs:
+        missing = next((code for code in (course, target) if code not in semesters and code not in moves), None)
+        if missing is not None:
+            errors.append({'course': course, 'relation_type': relation_type, 'target': target, 'error': f'Course {missing} does not exist.'})
+        elif (course, relation_type, target) not in known:
+            added.append((course, relation_type, target))
+
+    for error in SemesterConstraints(semesters, stored).check(moves, added, everything=True):
+        errors.append({
+            'course': error['course_id'],
+            'relation_type': error['relation_type'],
+            'target': error['target_id'],
+            'source': 'import' if error['relation_id'] is None else 'stored',
+            'error': error['error']
+        })
+    return errors
+
+# Upserts a parsed curriculum in one transaction. Nothing is written when any
+# rule fails; with dry_run nothing is written either way
+def import_curriculum_unit(tx, courses, pairs, dry_run=False):
+    codes = sorted(set(courses) | {code for course, _, target in pairs for code in (course, target)})
+    existing = {row['ns0__maMonHoc']: row for row in execute_query(named_query('courses_by_code'), {'codes': codes}, tx)}
+    stored_relations = execute_query(named_query('semester_relations_by_code'), {'codes': codes}, tx)
+
+    errors = validate_curriculum(courses, pairs, existing, stored_relations)
+    if errors:
+        raise CurriculumError(errors)
+
+    created = [course for code, course in courses.items() if code not in existing]
+    updated = [course for code, course in courses.items() if code in existing and _changed(course, existing[code])]
+    report = {
+        'created': len(created),
+        'updated': len(updated),
+        'unchanged': len(courses) - len(created) - len(updated),
+        'relations_created': 0,
+        'relations_unchanged': len(pairs),
+        'dry_run': dry_run
+    }
+    if dry_run:
+        return report, [course['ns0__maMonHoc'] for course in created + updated]
+
+    for batch in _batches(created + updated, Config.CURRICULUM_BATCH_SIZE):
+        tx.run(named_query('merge_courses'), {'courses': batch}).consume()
+    pairs_by_type = {}
+    for course, relation_type, target in pairs:
+        pairs_by_type.setdefault(relation_type, []).append({'course': course, 'target': target})
+    for relation_type, type_pairs in pairs_by_type.items():
+        for batch in _batches(type_pairs, Config.CURRICULUM_BATCH_SIZE):
+            summary = tx.run(relation_query('merge_relations_by_code', relation_type), {'pairs': batch}).consume()
+            report['relations_created'] += summary.counters.relationships_created
+    report['relations_unchanged'] -= report['relations_created']
+    return report, [course['ns0__maMonHoc'] for course in created + updated]
+
+def _course_row(record):
+    row = {field: record[field] for field in COURSE_FIELDS}
+    for relation in record['relations']:
+        row.setdefault(relation['relation_type'], []).append(relation['target'])
+    return row
+
+# Streams the exported curriculum chunk by chunk, in the format import accepts
+def export_json(records):
+    yield '{"courses": ['
+    for index, record in enumerate(records):
+        yield (',\n' if index else '\n') + json.dumps(_course_row(record), ensure_ascii=False)
+    yield '\n]}\n'
+
+def export_csv(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    for record in records:
+        row = _course_row(record)
+        writer.writerow({column: ';'.join(value) if isinstance(value, list) else value for column, value in row.items()})
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
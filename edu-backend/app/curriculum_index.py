@@ -0,0 +1,75 @@
+# app/curriculum_index.py
+# Every course instance with its semester and semester relations, read with one
+# query and kept in process. Course and relation writes bump
+# graph_version.COURSES (class changes bump it too), and other workers pick the
+# change up within CURRICULUM_INDEX_TTL.
+import bisect
+from app import graph_version
+from app.class_closure import course_classes
+from app.config import Config
+from app.constraints import SemesterConstraints
+from app.queries import SEMESTER_RELATION_TYPES, named_query
+from app.search_cache import LRUCache
+from app.utils import execute_read
+
+class CurriculumIndex:
+    def __init__(self, rows):
+        # course elementId -> {course_id, ns0__maMonHoc, rdfs__label}
+        self.courses = {}
+        self.semesters = {}
+        # semester -> course elementIds, in elementId order
+        self.by_semester = {}
+        # relation type -> target elementId -> elementIds of the courses pointing at it
+        self.incoming = {relation_type: {} for relation_type in SEMESTER_RELATION_TYPES}
+        # relation elementId -> (course elementId, relation type, target elementId)
+        self.relations = {}
+        for row in rows:
+            course_id = row['course_id']
+            self.courses[course_id] = {
+                'course_id': course_id,
+                'ns0__maMonHoc': row['ns0__maMonHoc'],
+                'rdfs__label': row['rdfs__label']
+            }
+            if row['semester'] is not None:
+                self.semesters[course_id] = row['semester']
+                self.by_semester.setdefault(row['semester'], []).append(course_id)
+            for relation in row['relations']:
+                self.incoming[relation['relation_type']].setdefault(relation['target_id'], set()).add(course_id)
+                self.relations[relation['relation_id']] = (course_id, relation['relation_type'], relation['target_id'])
+        for bucket in self.by_semester.values():
+            bucket.sort()
+        self.semester_order = sorted(self.by_semester)
+        self.constraints = SemesterConstraints(self.semesters, self.relations)
+
+    # Courses that could become the target of a new relation of each semester type:
+    # tienQuyet/hocTruoc need an earlier semester and no relation of the same type
+    # back to the course, songHanh the same semester
+    def eligible(self, course_id):
+        results = {relation_type: [] for relation_type in SEMESTER_RELATION_TYPES}
+        semester = self.semesters.get(course_id)
+        if semester is None:
+            return results
+        blocked = {
+            relation_type: self.incoming[relation_type].get(course_id, ())
+            for relation_type in ('ns0__tienQuyet', 'ns0__hocTruoc')
+        }
+        for earlier in self.semester_order[:bisect.bisect_left(self.semester_order, semester)]:
+            for other_id in self.by_semester[earlier]:
+                course = self.courses[other_id]
+                for relation_type, sources in blocked.items():
+                    if other_id not in sources:
+                        results[relation_type].append(course)
+        results['ns0__songHanh'] = [
+            self.courses[other_id] for other_id in self.by_semester[semester] if other_id != course_id
+        ]
+        return results
+
+_index_cache = LRUCache(1, Config.CURRICULUM_INDEX_TTL)
+
+def curriculum_index():
+    key = (graph_version.current(graph_version.CLASSES), graph_version.current(graph_version.COURSES))
+    index = _index_cache.get(key)
+    if index is None:
+        index = CurriculumIndex(execute_read(named_query('curriculum_index'), {'classes': course_classes()}))
+        _index_cache.set(key, index)
+    return index
@@ -0,0 +1,266 @@
+# app/curriculum_plan.py
+# The prerequisite DAG of the course instances: a tienQuyet or hocTruoc relation
+# from a course to its target means the target has to be taken first. The plan
+# is built once from the curriculum index and kept in process; relation writes in
+# this worker update it in place (relations_added, relation_removed,
+# course_removed), other workers rebuild it within CURRICULUM_PLAN_TTL.
+import heapq
+import threading
+from app import graph_version
+from app.config import Config
+from app.curriculum_index import curriculum_index
+from app.search_cache import LRUCache
+
+PREREQUISITE_TYPES = ('ns0__tienQuyet', 'ns0__hocTruoc')
+
+class CurriculumPlan:
+    def __init__(self, courses, relations):
+        # course elementId -> {course_id, ns0__maMonHoc, rdfs__label}
+        self.courses = courses
+        # prerequisite relation elementId -> (course elementId, target elementId)
+        self.relations = {}
+        # course -> {prerequisite: number of relations}, and the reverse
+        self.requires = {course_id: {} for course_id in courses}
+        self.unlocks = {course_id: {} for course_id in courses}
+        # course -> prerequisite relation elementIds in either direction
+        self.touching = {course_id: set() for course_id in courses}
+        self.lock = threading.RLock()
+        for relation_id, (course_id, relation_type, target_id) in relations.items():
+            self._link(relation_id, course_id, relation_type, target_id)
+        self._rebuild()
+
+    # Records the relation; True when it adds a new (course, prerequisite) pair
+    def _link(self, relation_id, course_id, relation_type, target_id):
+        if relation_type not in PREREQUISITE_TYPES or course_id not in self.courses or target_id not in self.courses:
+            return False
+        if relation_id in self.relations:
+            return False
+        self.relations[relation_id] = (course_id, target_id)
+        self.touching[course_id].add(relation_id)
+        self.touching[target_id].add(relation_id)
+        count = self.requires[course_id].get(target_id, 0)
+        self.requires[course_id][target_id] = count + 1
+        self.unlocks[target_id][course_id] = count + 1
+        return count == 0
+
+    # Forgets the relation; True when its (course, prerequisite) pair is gone
+    def _unlink(self, relation_id):
+        course_id, target_id = self.relations.pop(relation_id)
+        self.touching[course_id].discard(relation_id)
+        self.touching[target_id].discard(relation_id)
+        count = self.requires[course_id][target_id] - 1
+        if count:
+            self.requires[course_id][target_id] = count
+            self.unlocks[target_id][course_id] = count
+            return False
+        del self.requires[course_id][target_id], self.unlocks[target_id][course_id]
+        return True
+
+    def _earliest_from(self, course_id):
+        return 1 + max((self.earliest[target_id] for target_id in self.requires[course_id]), default=0)
+
+    # Cycles (strongly connected components with more than one course, or a course
+    # requiring itself) and Kahn's algorithm over everything else; courses in or
+    # behind a cycle get no earliest semester
+    def _rebuild(self):
+        self.cycles = self._find_cycles()
+        pending = {course_id: len(required) for course_id, required in self.requires.items()}
+        ready = sorted(course_id for course_id, count in pending.items() if count == 0)
+        self.earliest = {}
+        while ready:
+            course_id = ready.pop()
+            self.earliest[course_id] = self._earliest_from(course_id)
+            for dependent in self.unlocks[course_id]:
+                pending[dependent] -= 1
+                if pending[dependent] == 0:
+                    ready.append(dependent)
+        self._result = None
+
+    # Tarjan's algorithm, iterative so long prerequisite chains cannot hit the recursion limit
+    def _find_cycles(self):
+        index = {}
+        low = {}
+        stack = []
+        on_stack = set()
+        cycles = []
+        for root in self.requires:
+            if root in index:
+                continue
+            work = [(root, iter(self.requires[root]))]
+            index[root] = low[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, children = work[-1]
+                child = next(children, None)
+                if child is not None:
+                    if child not in index:
+                        index[child] = low[child] = len(index)
+                        stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(self.requires[child])))
+                    elif child in on_stack:
+                        low[node] = min(low[node], index[child])
+                    continue
+                work.pop()
+                if work:
+                    low[work[-1][0]] = min(low[work[-1][0]], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1 or node in self.requires[node]:
+                        cycles.append(sorted(component))
+        return sorted(cycles)
+
+    # True when target_id already depends on course_id, so course -> target would close a cycle.
+    # Only courses with a later earliest semester than course_id can depend on it
+    def _depends_on(self, target_id, course_id):
+        floor = self.earliest[course_id]
+        seen = {target_id}
+        stack = [target_id]
+        while stack:
+            node = stack.pop()
+            if node == course_id:
+                return True
+            for prerequisite in self.requires[node]:
+                if prerequisite not in seen and self.earliest[prerequisite] >= floor:
+                    seen.add(prerequisite)
+                    stack.append(prerequisite)
+        return False
+
+    # Raising a course's earliest semester can only raise those of the courses it unlocks
+    def _raise(self, course_id):
+        stack = [course_id]
+        while stack:
+            node = stack.pop()
+            for dependent in self.unlocks[node]:
+                if self.earliest[node] + 1 > self.earliest[dependent]:
+                    self.earliest[dependent] = self.earliest[node] + 1
+                    stack.append(dependent)
+
+    # Lowering one may lower dependents; they are recomputed in order of their old
+    # earliest semester, so every prerequisite is settled before its dependents
+    def _lower(self, course_ids):
+        heap = [(self.earliest[course_id], course_id) for course_id in course_ids]
+        heapq.heapify(heap)
+        while heap:
+            _, node = heapq.heappop(heap)
+            earliest = self._earliest_from(node)
+            if earliest != self.earliest[node]:
+                self.earliest[node] = earliest
+                for dependent in self.unlocks[node]:
+                    heapq.heappush(heap, (self.earliest[dependent], dependent))
+
+    # Incremental while the graph is acyclic; a relation that closes a cycle, or any
+    # change while a cycle exists, recomputes from the relations held in memory
+    def add(self, relation_id, course_id, relation_type, target_id):
+        with self.lock:
+            # Even a second relation between linked courses changes result()'s relation count
+            self._result = None
+            if not self._link(relation_id, course_id, relation_type, target_id):
+                return
+            if self.cycles or course_id == target_id or self._depends_on(target_id, course_id):
+                self._rebuild()
+                return
+            if self.earliest[target_id] + 1 > self.earliest[course_id]:
+                self.earliest[course_id] = self.earliest[target_id] + 1
+                self._raise(course_id)
+
+    def remove(self, relation_id):
+        with self.lock:
+            if relation_id not in self.relations:
+                return
+            course_id, _ = self.relations[relation_id]
+            self._result = None
+            if not self._unlink(relation_id):
+                return
+            if self.cycles:
+                self._rebuild()
+                return
+            self._lower([course_id])
+
+    def remove_course(self, course_id):
+        with self.lock:
+            if course_id not in self.courses:
+                return
+            dependents = list(self.unlocks[course_id])
+            for relation_id in list(self.touching[course_id]):
+                self._unlink(relation_id)
+            for mapping in (self.courses, self.requires, self.unlocks, self.touching, self.earliest):
+                mapping.pop(course_id, None)
+            if self.cycles:
+                self._rebuild()
+                return
+            self._lower(dependents)
+            self._result = None
+
+    # The longest prerequisite chain, first course first
+    def _critical_path(self):
+        if not self.earliest:
+            return []
+        node = max(self.earliest, key=lambda course_id: (self.earliest[course_id], course_id))
+        path = [node]
+        while self.earliest[node] > 1:
+            node = max(target_id for target_id in self.requires[node] if self.earliest[target_id] == self.earliest[node] - 1)
+            path.append(node)
+        return path[::-1]
+
+    def _course(self, course_id):
+        return {**self.courses[course_id], 'earliest_semester': self.earliest.get(course_id)}
+
+    # Sorting by earliest semester is a topological order: every prerequisite's
+    # earliest semester is lower than its dependents'
+    def result(self):
+        with self.lock:
+            if self._result is None:
+                order = sorted(self.earliest, key=lambda course_id: (self.earliest[course_id], course_id))
+                in_cycle = {course_id for cycle in self.cycles for course_id in cycle}
+                critical_path = self._critical_path()
+                self._result = {
+                    'courses': len(self.courses),
+                    'relations': len(self.relations),
+                    'order': [self._course(course_id) for course_id in order],
+                    'critical_path_length': len(critical_path),
+                    'critical_path': [self._course(course_id) for course_id in critical_path],
+                    'cycles': [[self._course(course_id) for course_id in cycle] for cycle in self.cycles],
+                    'blocked': [self._course(course_id) for course_id in sorted(self.courses) if course_id not in self.earliest and course_id not in in_cycle]
+                }
+            return self._result
+
+_plan_cache = LRUCache(1, Config.CURRICULUM_PLAN_TTL)
+
+def curriculum_plan():
+    key = graph_version.current(graph_version.CLASSES)
+    plan = _plan_cache.get(key)
+    if plan is None:
+        index = curriculum_index()
+        plan = CurriculumPlan(dict(index.courses), index.relations)
+        _plan_cache.set(key, plan)
+    return plan
+
+# Write hooks: applied to this worker's plan if one is loaded, otherwise the next
+# curriculum_plan() reads the new relations anyway
+def _loaded_plan():
+    return _plan_cache.get(graph_version.current(graph_version.CLASSES))
+
+# rows: [{relation_id, relation_type, target_id}] created from course_id
+def relations_added(course_id, rows):
+    plan = _loaded_plan()
+    if plan is not None:
+        for row in rows:
+            plan.add(row['relation_id'], course_id, row['relation_type'], row['target_id'])
+
+def relation_removed(relation_id):
+    plan = _loaded_plan()
+    if plan is not None:
+        plan.remove(relation_id)
+
+def course_removed(course_id):
+    plan = _loaded_plan()
+    if plan is not None:
+        plan.remove_course(course_id)
@@ -0,0 +1,194 @@
+# app/embedding_matrix.py
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+import numpy as np
+
+def _as_matrix(vectors):
+    matrix = np.asarray(vectors, dtype='float32')
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+def _normalize(matrix):
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+# Principal components of the (centered) embeddings, at most `dims` of them
+def fit_pca(vectors, dims):
+    vectors = _as_matrix(vectors)
+    mean = vectors.mean(axis=0)
+    _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+    return mean, np.ascontiguousarray(vt[:min(dims, vt.shape[0])].T)
+
+# Unpublished or superseded versions younger than this are left on disk by save()
+STALE_VERSION_SECONDS = 60
+
+# The version files of the index at `path`: {root}.{version}{ext} and {root}.{version}.pca.npz
+def _version_pattern(path):
+    root, ext = os.path.splitext(os.path.basename(path))
+    return re.compile(rf'{re.escape(root)}\.[0-9a-f]{{32}}({re.escape(ext)}|\.pca\.npz)$')
+
+def _read_meta(path):
+    try:
+        with open(f'{path}.meta.json', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# All course embeddings as one contiguous float16 matrix (optionally PCA-reduced)
+# in a .npy file that every worker memory-maps read-only. Scoring is one matmul,
+# upcast to float32 a chunk of rows at a time. Same interface as VectorIndex.
+# Each save writes a new version of the matrix (and projection) under a unique
+# name and then swaps in {path}.meta.json, which names the version with its row
+# keys, so a worker loading concurrently sees the old or the new index, never a mix.
+class MatrixIndex:
+    def __init__(self, dims=0, chunk_rows=4096):
+        self.dims = dims
+        self.chunk_rows = chunk_rows
+        self.matrix = None
+        self.row_keys = []
+        self.key_to_row = {}
+        self.mean = None
+        self.components = None
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.row_keys)
+
+    def __contains__(self, key):
+        return key in self.key_to_row
+
+    def keys(self):
+        return list(self.row_keys)
+
+    def _project(self, vectors):
+        vectors = _as_matrix(vectors)
+        if self.components is not None:
+            vectors = (vectors - self.mean) @ self.components
+        return _normalize(vectors)
+
+    def _set_rows(self, keys, matrix):
+        self.row_keys = list(keys)
+        self.key_to_row = {key: row for row, key in enumerate(self.row_keys)}
+        self.matrix = matrix
+
+    # The projection is fitted on the first batch added to an empty index (a full rebuild)
+    def add(self, keys, vectors):
+        keys = list(keys)
+        if not keys:
+            return
+        vectors = _as_matrix(vectors)
+        with self.lock:
+            if not self.row_keys and self.dims and vectors.shape[1] > self.dims and len(keys) > 1:
+                self.mean, self.components = fit_pca(vectors, self.dims)
+            rows = self._project(vectors).astype('float16')
+            self.remove([key for key in keys if key in self.key_to_row])
+            matrix = rows if self.matrix is None or not self.row_keys else np.vstack([self.matrix, rows])
+            self._set_rows(self.row_keys + keys, matrix)
+
+    def update(self, key, vector):
+        self.add([key], [vector])
+
+    def remove(self, keys):
+        with self.lock:
+            rows = [self.key_to_row[key] for key in keys if key in self.key_to_row]
+            if not rows:
+                return 0
+            keep = np.ones(len(self.row_keys), dtype=bool)
+            keep[rows] = False
+            self._set_rows([key for key, kept in zip(self.row_keys, keep) if kept], np.asarray(self.matrix)[keep])
+            return len(rows)
+
+    def clear(self):
+        with self.lock:
+            self._set_rows([], None)
+            self.mean = None
+            self.components = None
+
+    def _scores(self, query, rows=None):
+        query = self._project(query)[0]
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        scores = np.empty(matrix.shape[0], dtype='float32')
+        for start in range(0, matrix.shape[0], self.chunk_rows):
+            scores[start:start + self.chunk_rows] = matrix[start:start + self.chunk_rows].astype('float32') @ query
+        return scores
+
+    # Top-k (key, cosine similarity) pairs, best first
+    def search(self, query, top_k=10):
+        with self.lock:
+            if not self.row_keys:
+                return []
+            scores = self._scores(query)
+            top_k = min(top_k, len(scores))
+            best = np.argpartition(-scores, top_k - 1)[:top_k]
+            best = best[np.argsort(-scores[best])]
+            return [(self.row_keys[row], float(scores[row])) for row in best]
+
+    def score(self, query, keys):
+        with self.lock:
+            keys = [key for key in keys if key in self.key_to_row]
+            if not keys:
+                return []
+            scores = self._scores(query, [self.key_to_row[key] for key in keys])
+            return list(zip(keys, scores.tolist()))
+
+    def save(self, path):
+        with self.lock:
+            if self.matrix is None:
+                return
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            root, ext = os.path.splitext(path)
+            version = uuid.uuid4().hex
+            meta = {'keys': self.row_keys, 'dims': self.dims, 'matrix': os.path.basename(f'{root}.{version}{ext}')}
+            with open(f'{root}.{version}{ext}', 'wb') as f:
+                np.save(f, np.ascontiguousarray(self.matrix, dtype='float16'))
+            if self.components is not None:
+                with open(f'{root}.{version}.pca.npz', 'wb') as f:
+                    np.savez(f, mean=self.mean, components=self.components)
+                meta['pca'] = os.path.basename(f'{root}.{version}.pca.npz')
+            # Map the new version before it is published, so it stays readable even if
+            # another worker's cleanup removes it right after
+            matrix = np.load(f'{root}.{version}{ext}', mmap_mode='r')
+            previous = _read_meta(path) or {}
+            fd, tmp_path = tempfile.mkstemp(suffix='.json', dir=directory)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, f'{path}.meta.json')
+            # Older versions go, except the one just replaced, which a worker may still
+            # be loading, and recent ones another worker may be about to publish
+            keep = {meta['matrix'], meta.get('pca'), previous.get('matrix'), previous.get('pca')}
+            pattern = _version_pattern(path)
+            cutoff = time.time() - STALE_VERSION_SECONDS
+            for name in os.listdir(directory):
+                if pattern.match(name) and name not in keep:
+                    try:
+                        if os.path.getmtime(os.path.join(directory, name)) < cutoff:
+                            os.unlink(os.path.join(directory, name))
+                    except FileNotFoundError:
+                        pass
+            # Serve from the shared read-only mapping like every other worker
+            self.matrix = matrix
+
+    def load(self, path):
+        meta = _read_meta(path)
+        if meta is None or 'matrix' not in meta or meta.get('dims', 0) != self.dims:
+            return False
+        directory = os.path.dirname(os.path.abspath(path))
+        with self.lock:
+            mean = components = None
+            try:
+                if meta.get('pca'):
+                    with np.load(os.path.join(directory, meta['pca'])) as pca:
+                        mean, components = pca['mean'], pca['components']
+                matrix = np.load(os.path.join(directory, meta['matrix']), mmap_mode='r')
+            except FileNotFoundError:
+                return False
+            self.mean, self.components = mean, components
+            self._set_rows(meta['keys'], matrix)
+            return True
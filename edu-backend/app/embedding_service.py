@@ -0,0 +1,221 @@
+# app/embedding_service.py
+# Optional shared encoder process. One process owns PhoBERT and the torch
+# thread pool and serves every gunicorn worker over a Unix socket:
+#
+#   python -m app.embedding_service --socket /tmp/edu-encoder.sock --threads 4
+#   ENCODER_BACKEND=service gunicorn run:app
+#
+# With ENCODER_BACKEND=local (the default) the workers encode in-process.
+import argparse
+import json
+import logging
+import os
+import socket
+import socketserver
+import struct
+import threading
+import numpy as np
+from app.coalescer import BatchCoalescer
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('>I')
+
+def _send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('Embedding service closed the connection.')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return _recv_exactly(sock, size)
+
+
+# Each request is a JSON frame {"texts": [...], "batch_size": n}; the reply is a
+# JSON frame {"rows": n, "dim": d} (or {"error": ...}) followed by the float32 matrix
+class EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                request = json.loads(_recv_frame(self.request))
+            except ConnectionError:
+                return
+            if request.get('ping'):
+                _send_frame(self.request, json.dumps({'ok': True}).encode('utf-8'))
+                continue
+            if request.get('stats'):
+                _send_frame(self.request, json.dumps(self.server.coalescer.metrics()).encode('utf-8'))
+                continue
+            try:
+                embeddings = self.server.encode(request['texts'], request.get('batch_size') or Config.SEARCH_ENCODE_BATCH_SIZE)
+            except Exception as e:
+                _send_frame(self.request, json.dumps({'error': str(e)}).encode('utf-8'))
+                continue
+            _send_frame(self.request, json.dumps({'rows': embeddings.shape[0], 'dim': embeddings.shape[1]}).encode('utf-8'))
+            _send_frame(self.request, embeddings.tobytes())
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path):
+        from app.encoder import encode_batch, load_encoder
+        load_encoder()
+        self._encode_batch = encode_batch
+        # Forward passes run one at a time so the torch thread pool is never oversubscribed
+        self._model_lock = threading.Lock()
+        # Single-query requests from different workers are merged into one forward pass
+        self.coalescer = BatchCoalescer(self._encode_locked, Config.SEARCH_COALESCE_WINDOW_MS, Config.SEARCH_COALESCE_MAX_BATCH)
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, EmbeddingRequestHandler)
+
+    def _encode_locked(self, texts, batch_size=None):
+        with self._model_lock:
+            return np.ascontiguousarray(self._encode_batch(texts, batch_size=batch_size or Config.SEARCH_ENCODE_BATCH_SIZE).numpy(), dtype='float32')
+
+    def encode(self, texts, batch_size):
+        if len(texts) == 1 and Config.SEARCH_COALESCE_WINDOW_MS > 0:
+            return self.coalescer.submit(texts[0]).reshape(1, -1)
+        return self._encode_locked(texts, batch_size)
+
+
+class EmbeddingClient:
+    def __init__(self, socket_path, timeout=None):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    # A stale connection (e.g. after the service restarted) is retried once; a
+    # timeout is not, the service is busy and would be sent the work again
+    def _call(self, request, retry=True):
+        try:
+            sock = self._connection()
+            _send_frame(sock, json.dumps(request).encode('utf-8'))
+            header = json.loads(_recv_frame(sock))
+            if 'rows' not in header:
+                return header, None
+            return header, _recv_frame(sock)
+        except TimeoutError:
+            self._close()
+            raise
+        except OSError:
+            self._close()
+            if not retry:
+                raise
+            return self._call(request, retry=False)
+
+    def ping(self):
+        try:
+            header, _ = self._call({'ping': True})
+            return bool(header.get('ok'))
+        except OSError:
+            return False
+
+    def stats(self):
+        header, _ = self._call({'stats': True})
+        return header
+
+    def encode(self, texts, batch_size=None):
+        header, payload = self._call({'texts': list(texts), 'batch_size': batch_size})
+        if 'error' in header:
+            raise RuntimeError(f'Embedding service error: {header["error"]}')
+        return np.frombuffer(payload, dtype='float32').reshape(header['rows'], header['dim'])
+
+
+client = EmbeddingClient(Config.ENCODER_SOCKET, Config.ENCODER_SERVICE_TIMEOUT)
+
+def _use_service():
+    return Config.ENCODER_BACKEND == 'service'
+
+# Encode already-preprocessed texts into a float32 matrix, through the shared
+# service when configured, otherwise with the in-process model. The fallback is
+# only for a service that is not running; a slow one (a timeout) raises instead,
+# so every worker does not load PhoBERT at once and redo work the service has
+def encode_texts(texts, batch_size=None):
+    batch_size = batch_size or Config.SEARCH_ENCODE_BATCH_SIZE
+    if _use_service():
+        try:
+            return client.encode(texts, batch_size)
+        except (ConnectionRefusedError, FileNotFoundError) as e:
+            if not Config.ENCODER_FALLBACK:
+                raise
+            logger.warning('Embedding service at %s is unavailable (%s); encoding in this worker', Config.ENCODER_SOCKET, e)
+    from app.encoder import encode_batch
+    return encode_batch(texts, batch_size=batch_size).numpy()
+
+# Query texts from concurrent request threads share one encoder call. The shared
+# service coalesces queries from every worker itself, so they go straight to it
+query_coalescer = BatchCoalescer(encode_texts, Config.SEARCH_COALESCE_WINDOW_MS, Config.SEARCH_COALESCE_MAX_BATCH)
+
+def encode_query(text):
+    if Config.SEARCH_COALESCE_WINDOW_MS > 0 and not _use_service():
+        return query_coalescer.submit(text)
+    return encode_texts([text])[0]
+
+def encoder_metrics():
+    metrics = {'backend': Config.ENCODER_BACKEND, 'query_coalescer': query_coalescer.metrics()}
+    if _use_service():
+        try:
+            metrics['service_coalescer'] = client.stats()
+        except OSError as e:
+            metrics['service_coalescer'] = {'error': str(e)}
+    return metrics
+
+def encoder_ready():
+    if _use_service() and client.ping():
+        return True
+    if _use_service() and not Config.ENCODER_FALLBACK:
+        return False
+    from app.encoder import is_loaded
+    return is_loaded()
+
+def warm_up_encoder():
+    if _use_service() and (client.ping() or not Config.ENCODER_FALLBACK):
+        return
+    from app.encoder import load_encoder
+    load_encoder()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared PhoBERT embedding service.')
+    parser.add_argument('--socket', default=Config.ENCODER_SOCKET)
+    parser.add_argument('--threads', type=int, default=Config.ENCODER_TORCH_THREADS)
+    args = parser.parse_args()
+
+    Config.ENCODER_TORCH_THREADS = args.threads
+    server = EmbeddingServer(args.socket)
+    print(f'Embedding service listening on {args.socket}')
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# app/encoder.py
+import threading
+import torch
+from app.config import Config
+from app.text_processing import preprocess_text
+
+# PhoBERT chỉ được nạp khi cần lần đầu (hoặc bởi luồng warm-up), để các worker
+# chỉ phục vụ CRUD không phải trả vài giây và vài trăm MB lúc khởi động
+_tokenizer = None
+_model = None
+_load_lock = threading.Lock()
+
+ENCODER_MODES = ('fp32', 'int8')
+
+# "int8" applies torch dynamic quantization to every Linear layer: weights are
+# stored as int8 and activations are quantized on the fly, which is what makes
+# CPU-only inference faster and smaller
+def build_encoder(model_name, mode='fp32'):
+    if mode not in ENCODER_MODES:
+        raise ValueError(f'Unknown encoder mode {mode!r}, expected one of {ENCODER_MODES}.')
+    from transformers import AutoTokenizer, AutoModel
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    if mode == 'int8':
+        model = quantize_model(model)
+    return tokenizer, model
+
+def quantize_model(model):
+    from torch.ao.quantization import quantize_dynamic
+    return quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+def load_encoder():
+    global _tokenizer, _model
+    if _model is None:
+        with _load_lock:
+            if _model is None:
+                if Config.ENCODER_TORCH_THREADS:
+                    torch.set_num_threads(Config.ENCODER_TORCH_THREADS)
+                _tokenizer, _model = build_encoder(Config.ENCODER_MODEL_NAME, Config.ENCODER_MODE)
+    return _tokenizer, _model
+
+def is_loaded():
+    return _model is not None
+
+# Hàm Mean Pooling để lấy embedding của câu
+def mean_pooling(model_output, attention_mask):
+    token_embeddings = model_output.last_hidden_state  # (batch_size, sequence_length, hidden_size)
+    input_mask_expanded = attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
+    return torch.sum(token_embeddings * input_mask_expanded, 1) / torch.clamp(input_mask_expanded.sum(1), min=1e-9)
+
+# Hàm mã hóa câu thành embeddings sử dụng PhoBERT
+def encode_sentence(sentence, encoder=None):
+    tokenizer, model = encoder or load_encoder()
+    sentence = preprocess_text(sentence)  # Chuyển đổi viết tắt trước khi mã hóa
+    inputs = tokenizer(sentence, return_tensors='pt', truncation=True, max_length=128, padding=True)
+    with torch.no_grad():
+        outputs = model(**inputs)
+    return mean_pooling(outputs, inputs['attention_mask'])
+
+# Mã hóa nhiều câu cùng lúc: sắp xếp theo độ dài token để mỗi batch chỉ cần
+# padding tới câu dài nhất của chính nó, mỗi batch chạy một lần forward
+def encode_batch(texts, batch_size=32, encoder=None):
+    tokenizer, model = encoder or load_encoder()
+    texts = [preprocess_text(text) for text in texts]
+    if not texts:
+        return torch.empty((0, model.config.hidden_size))
+
+    encoded = tokenizer(texts, truncation=True, max_length=128)
+    order = sorted(range(len(texts)), key=lambda i: len(encoded['input_ids'][i]))
+
+    embeddings = [None] * len(texts)
+    with torch.no_grad():
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            inputs = tokenizer.pad({
+                'input_ids': [encoded['input_ids'][i] for i in bucket],
+                'attention_mask': [encoded['attention_mask'][i] for i in bucket]
+            }, return_tensors='pt')
+            outputs = model(**inputs)
+            for i, embedding in zip(bucket, mean_pooling(outputs, inputs['attention_mask'])):
+                embeddings[i] = embedding
+    return torch.stack(embeddings)
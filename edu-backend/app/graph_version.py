@@ -0,0 +1,22 @@
+# app/graph_version.py
+import threading
+
+# In-process version counters for data that caches depend on. Writers bump the
+# relevant name and readers include the current value in their cache keys.
+COURSE_LABELS = 'course_labels'
+# rdfs__subClassOf closure (app/class_closure.py)
+CLASSES = 'classes'
+# Course membership, fields and semester relations, e.g. the cached GET /courses
+# total and the curriculum index (app/curriculum_index.py)
+COURSES = 'courses'
+
+_versions = {}
+_lock = threading.Lock()
+
+def bump(name):
+    with _lock:
+        _versions[name] = _versions.get(name, 0) + 1
+        return _versions[name]
+
+def current(name):
+    return _versions.get(name, 0)
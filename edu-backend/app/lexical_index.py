@@ -0,0 +1,109 @@
+# app/lexical_index.py
+import math
+import re
+import threading
+import unicodedata
+from app.text_processing import preprocess_text
+
+# Bỏ dấu tiếng Việt để "lập trình", "lap trinh" và "Lập Trình" khớp cùng một từ
+def fold_diacritics(text):
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+
+def normalize_code(code):
+    return re.sub(r'\s+', '', code or '').upper()
+
+# Both the raw words and their abbreviation expansion are indexed, so "PBL"
+# matches "PBL1: ..." as well as "Project Based Learning"; "pbl1" also yields "pbl"
+def tokenize(text):
+    raw = fold_diacritics(re.sub(r'[^\w\s]', ' ', (text or '').lower())).split()
+    seen = set(raw)
+    expanded = [word for word in fold_diacritics(preprocess_text(text or '')).lower().split() if word not in seen]
+    tokens = []
+    for word in raw + expanded:
+        tokens.append(word)
+        prefix = re.match(r'^([^\W\d_]+)\d+$', word)
+        if prefix:
+            tokens.append(prefix.group(1))
+    return tokens
+
+
+# In-memory inverted index over course labels and codes, scored with BM25
+class LexicalIndex:
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_terms = {}
+        self.doc_lengths = {}
+        self.codes = {}
+        self.doc_codes = {}
+        self.total_length = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def add(self, doc_id, label, code=None):
+        with self.lock:
+            self.remove(doc_id)
+            terms = {}
+            for token in tokenize(label) + tokenize(code):
+                terms[token] = terms.get(token, 0) + 1
+            self.doc_terms[doc_id] = terms
+            self.doc_lengths[doc_id] = sum(terms.values())
+            self.total_length += self.doc_lengths[doc_id]
+            for token, tf in terms.items():
+                self.postings.setdefault(token, {})[doc_id] = tf
+            if code:
+                self.doc_codes[doc_id] = normalize_code(code)
+                self.codes.setdefault(self.doc_codes[doc_id], set()).add(doc_id)
+
+    def remove(self, doc_id):
+        with self.lock:
+            terms = self.doc_terms.pop(doc_id, None)
+            if terms is None:
+                return
+            self.total_length -= self.doc_lengths.pop(doc_id)
+            for token in terms:
+                docs = self.postings[token]
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[token]
+            code = self.doc_codes.pop(doc_id, None)
+            if code is not None:
+                self.codes[code].discard(doc_id)
+                if not self.codes[code]:
+                    del self.codes[code]
+
+    def clear(self):
+        with self.lock:
+            self.postings = {}
+            self.doc_terms = {}
+            self.doc_lengths = {}
+            self.codes = {}
+            self.doc_codes = {}
+            self.total_length = 0
+
+    # Courses whose code is exactly the query, e.g. "INT3306" or "int 3306"
+    def exact_code(self, query):
+        return sorted(self.codes.get(normalize_code(query), ()))
+
+    # doc_id -> BM25 score for every course sharing at least one term with the query
+    def search(self, query):
+        with self.lock:
+            doc_count = len(self.doc_terms)
+            if not doc_count:
+                return {}
+            average_length = self.total_length / doc_count
+            scores = {}
+            for token in set(tokenize(query)):
+                docs = self.postings.get(token)
+                if not docs:
+                    continue
+                idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+            return scores
@@ -0,0 +1,653 @@
+# app/memory_graph.py
+# In-memory stand-in for Neo4j (GRAPH_BACKEND=memory). The graph is built from
+# ontology.rdf with the same n10s naming the routes query, and writes are appended
+# to a JSON-lines log that is replayed on the next start. Every worker process
+# replays the log, and picks up what the others appended before its next
+# statement, so gunicorn may run several workers on the same log.
+#
+# MemoryDriver has the part of the neo4j driver API app/utils.py uses (sessions,
+# execute_read/execute_write, begin_transaction, bookmarks), so nothing above it
+# changes. Statements are recognized by their text in the app/queries.py registry
+# and answered by the Python handler of the same name below; a statement with no
+# handler raises UnsupportedQuery (a 501). Courses, structure, search, user-course
+# routes and the curriculum export are covered; users, auth and the curriculum
+# import still need Neo4j.
+#
+# Reads run lock-free on the current snapshot. A write transaction works on a copy
+# that replaces the snapshot on commit, so the backend suits read-mostly data.
+# Writers in all workers are serialized by a lock on {MEMORY_GRAPH_LOG}.lock.
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from neo4j import Bookmarks
+
+class UnsupportedQuery(NotImplementedError):
+    def __init__(self, query):
+        super().__init__(f'The memory graph backend cannot run this statement:\n{query.strip()}')
+
+class ReadOnlyTransaction(RuntimeError):
+    pass
+
+
+class MemoryGraph:
+    def __init__(self):
+        self.nodes = {}
+        self.rels = {}
+        self.outgoing = {}
+        self.incoming = {}
+        self.uris = {}
+        self.next_id = 0
+        self.relationships_created = 0
+        # Set once the graph is committed and never modified again, so derived
+        # results (label scans, the course closure) can be kept
+        self.frozen = False
+        self._cache = {}
+
+    def cached(self, key, compute):
+        if not self.frozen:
+            return compute()
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def copy(self):
+        graph = MemoryGraph()
+        graph.nodes = {node_id: {'labels': set(node['labels']), 'props': dict(node['props'])} for node_id, node in self.nodes.items()}
+        graph.rels = dict(self.rels)
+        graph.outgoing = {node_id: set(rel_ids) for node_id, rel_ids in self.outgoing.items()}
+        graph.incoming = {node_id: set(rel_ids) for node_id, rel_ids in self.incoming.items()}
+        graph.uris = dict(self.uris)
+        graph.next_id = self.next_id
+        return graph
+
+    # Ids are handed out in load order, so a reload from the same ontology and
+    # write log reproduces the same elementIds
+    def _new_id(self, prefix):
+        self.next_id += 1
+        return f'{prefix}:{self.next_id}'
+
+    def create_node(self, labels, props):
+        node_id = self._new_id('n')
+        self.nodes[node_id] = {'labels': set(labels), 'props': {key: value for key, value in props.items() if value is not None}}
+        self.outgoing[node_id] = set()
+        self.incoming[node_id] = set()
+        return node_id
+
+    def resource(self, uri):
+        if uri not in self.uris:
+            self.uris[uri] = self.create_node({'Resource'}, {'uri': uri})
+        return self.uris[uri]
+
+    def create_rel(self, rel_type, start, end):
+        rel_id = self._new_id('r')
+        self.rels[rel_id] = (rel_type, start, end)
+        self.outgoing[start].add(rel_id)
+        self.incoming[end].add(rel_id)
+        self.relationships_created += 1
+        return rel_id
+
+    def merge_rel(self, rel_type, start, end):
+        for rel_id in self.outgoing[start]:
+            if self.rels[rel_id] == (rel_type, start, end):
+                return rel_id
+        return self.create_rel(rel_type, start, end)
+
+    def delete_rel(self, rel_id):
+        _, start, end = self.rels.pop(rel_id)
+        self.outgoing[start].discard(rel_id)
+        self.incoming[end].discard(rel_id)
+
+    def detach_delete(self, node_id):
+        for rel_id in list(self.outgoing[node_id] | self.incoming[node_id]):
+            self.delete_rel(rel_id)
+        node = self.nodes.pop(node_id)
+        del self.outgoing[node_id], self.incoming[node_id]
+        if node['props'].get('uri') in self.uris:
+            del self.uris[node['props']['uri']]
+
+    def props(self, node_id):
+        return self.nodes[node_id]['props']
+
+    def out(self, node_id, rel_type=None):
+        for rel_id in sorted(self.outgoing.get(node_id, ()), key=_id_order):
+            if rel_type is None or self.rels[rel_id][0] == rel_type:
+                yield rel_id, self.rels[rel_id][2]
+
+    def into(self, node_id, rel_type=None):
+        for rel_id in sorted(self.incoming.get(node_id, ()), key=_id_order):
+            if rel_type is None or self.rels[rel_id][0] == rel_type:
+                yield rel_id, self.rels[rel_id][1]
+
+    def with_label(self, label):
+        return self.cached(('label', label), lambda: [node_id for node_id, node in self.nodes.items() if label in node['labels']])
+
+    # Nodes reachable over one or more rdfs__subClassOf hops, like [:rdfs__subClassOf*]
+    def ancestors(self, node_id):
+        found = []
+        stack = [node_id]
+        while stack:
+            for _, parent in self.out(stack.pop(), 'rdfs__subClassOf'):
+                if parent not in found:
+                    found.append(parent)
+                    stack.append(parent)
+        return found
+
+    def courses(self):
+        return self.cached('courses', self._courses)
+
+    def _courses(self):
+        roots = {node_id for node_id in self.with_label('Resource') if self.props(node_id).get('rdfs__label') == 'Môn học'}
+        classes = {node_id for node_id in self.with_label('Resource') if roots & set(self.ancestors(node_id))}
+        rows = []
+        for class_id in sorted(classes, key=_id_order):
+            rows.extend(instance for _, instance in self.into(class_id, 'rdf__type') if 'Resource' in self.nodes[instance]['labels'])
+        return rows
+
+    def find(self, node_id, label=None):
+        node = self.nodes.get(node_id)
+        if node is None or (label is not None and label not in node['labels']):
+            return None
+        return node_id
+
+def _id_order(element_id):
+    return int(element_id.split(':')[1])
+
+def _props_map(graph, node_id):
+    return dict(graph.props(node_id))
+
+def _course_fields(graph, node_id):
+    props = graph.props(node_id)
+    return {field: props.get(field) for field in ('ns0__hocKy', 'ns0__laMonTuChon', 'ns0__maMonHoc', 'ns0__soTinChi', 'rdfs__label')}
+
+def _relations(graph, node_id):
+    return [{'relation_id': rel_id, 'relation_type': graph.rels[rel_id][0], 'target_id': target,
+             'rdfs__label': graph.props(target).get('rdfs__label')} for rel_id, target in graph.out(node_id)]
+
+def _coalesce(value, current):
+    return current if value is None else value
+
+
+# Handlers by query name: fn(graph, params, relation_type), relation_type only set for relation templates
+HANDLERS = {}
+WRITES = set()
+
+def handles(name, write=False):
+    def register(fn):
+        HANDLERS[name] = fn
+        if write:
+            WRITES.add(name)
+        return fn
+    return register
+
+@handles('course_exists')
+def _course_exists(graph, params, _):
+    node_id = graph.find(params['course_id'])
+    return [{'course': _props_map(graph, node_id)}] if node_id else []
+
+@handles('check_relations')
+def _check_relations(graph, params, _):
+    course = graph.find(params['course_id'])
+    if course is None:
+        return []
+    rows = []
+    for index, item in enumerate(params['relations']):
+        target = graph.find(item['target_id'])
+        rows.append({
+            'index': index,
+            'target_exists': target is not None,
+            'course_semester': graph.props(course).get('ns0__hocKy'),
+            'target_semester': graph.props(target).get('ns0__hocKy') if target else None,
+            'duplicate': target is not None and any(
+                graph.rels[rel_id][2] == target and rel_id != item.get('relation_id')
+                for rel_id, _ in graph.out(course, item['relation_type']))
+        })
+    return rows
+
+@handles('relation_start')
+def _relation_start(graph, params, _):
+    rel = graph.rels.get(params['relation_id'])
+    return [{'course_id': rel[1]}] if rel else []
+
+@handles('create_course', write=True)
+def _create_course(graph, params, _):
+    props = {field: params.get(field) for field in ('ns0__hocKy', 'ns0__maMonHoc', 'ns0__soTinChi', 'rdfs__label')}
+    props['ns0__laMonTuChon'] = _coalesce(params.get('ns0__laMonTuChon'), False)
+    node_id = graph.create_node({'Resource', 'owl__NamedIndividual'}, props)
+    return [{'course_id': node_id, 'course': _props_map(graph, node_id)}]
+
+@handles('update_course', write=True)
+def _update_course(graph, params, _):
+    node_id = graph.find(params['course_id'])
+    if node_id is None:
+        return []
+    props = graph.props(node_id)
+    for field in ('ns0__hocKy', 'ns0__laMonTuChon', 'ns0__soTinChi', 'rdfs__label'):
+        if params.get(field) is not None:
+            props[field] = params[field]
+    return [{'course_id': node_id, 'course': dict(props)}]
+
+@handles('existing_courses')
+def _existing_courses(graph, params, _):
+    return [{'course_id': node_id} for node_id in dict.fromkeys(params['course_ids']) if graph.find(node_id)]
+
+@handles('move_courses', write=True)
+def _move_courses(graph, params, _):
+    rows = []
+    for move in params['moves']:
+        if graph.find(move['course_id']):
+            graph.props(move['course_id'])['ns0__hocKy'] = move['semester']
+            rows.append({'course_id': move['course_id'], 'ns0__hocKy': move['semester']})
+    return rows
+
+@handles('course_semester_relations')
+def _course_semester_relations(graph, params, _):
+    node_ids = [node_id for node_id in params['course_ids'] if graph.find(node_id)]
+    rel_ids = sorted({rel_id for node_id in node_ids for rel_id in graph.outgoing[node_id] | graph.incoming[node_id]}, key=_id_order)
+    return [{'relation_id': rel_id, 'course_id': source, 'relation_type': rel_type, 'target_id': target,
+             'course_semester': graph.props(source).get('ns0__hocKy'), 'target_semester': graph.props(target).get('ns0__hocKy')}
+            for rel_id in rel_ids for rel_type, source, target in [graph.rels[rel_id]]
+            if rel_type in ('ns0__hocTruoc', 'ns0__songHanh', 'ns0__tienQuyet')]
+
+@handles('delete_course', write=True)
+def _delete_course(graph, params, _):
+    node_id = graph.find(params['course_id'])
+    if node_id is None:
+        return []
+    graph.detach_delete(node_id)
+    return [{'course_id': node_id}]
+
+@handles('create_relations', write=True)
+def _create_relations(graph, params, relation_type):
+    course = graph.find(params['course_id'])
+    if course is None:
+        return []
+    rows = []
+    for target_id in params['target_ids']:
+        target = graph.find(target_id)
+        if target is not None:
+            rows.append({'relation_id': graph.create_rel(relation_type, course, target), 'target_id': target})
+    return rows
+
+@handles('update_relation', write=True)
+def _update_relation(graph, params, relation_type):
+    rel = graph.rels.get(params['relation_id'])
+    if rel is None:
+        return []
+    graph.delete_rel(params['relation_id'])
+    target = graph.find(params['target_id'])
+    if target is None:
+        return []
+    rel_id = graph.create_rel(relation_type, rel[1], target)
+    return [{'relation_id': rel_id, 'relation_type': relation_type, 'target_id': target, 'course_id': rel[1]}]
+
+def _instances(graph, classes):
+    return list(dict.fromkeys(instance for class_id in classes if graph.find(class_id)
+                              for _, instance in graph.into(class_id, 'rdf__type') if 'Resource' in graph.nodes[instance]['labels']))
+
+@handles('curriculum_index')
+def _curriculum_index(graph, params, _):
+    rows = []
+    for course in _instances(graph, params['classes']):
+        props = graph.props(course)
+        relations = [
+            {'relation_id': rel_id, 'relation_type': relation_type, 'target_id': target}
+            for relation_type in ('ns0__tienQuyet', 'ns0__hocTruoc', 'ns0__songHanh')
+            for rel_id, target in graph.out(course, relation_type)
+        ]
+        rows.append({'course_id': course, 'ns0__maMonHoc': props.get('ns0__maMonHoc'), 'rdfs__label': props.get('rdfs__label'),
+                     'semester': props.get('ns0__hocKy'), 'relations': relations})
+    return rows
+
+@handles('export_courses')
+def _export_courses(graph, params, _):
+    rows = []
+    for node_id in graph.with_label('Resource'):
+        props = graph.props(node_id)
+        if props.get('ns0__maMonHoc') is None:
+            continue
+        rows.append({
+            **{field: props.get(field) for field in ('ns0__maMonHoc', 'rdfs__label', 'ns0__hocKy', 'ns0__soTinChi', 'ns0__laMonTuChon')},
+            'rdf__type': [graph.props(class_id).get('uri') for _, class_id in graph.out(node_id, 'rdf__type')],
+            'relations': [{'relation_type': graph.rels[rel_id][0], 'target': graph.props(target)['ns0__maMonHoc']}
+                          for rel_id, target in graph.out(node_id) if graph.props(target).get('ns0__maMonHoc') is not None]
+        })
+    # ORDER BY puts courses without a semester last
+    rows.sort(key=lambda row: (row['ns0__hocKy'] is None, row['ns0__hocKy'] or 0, row['ns0__maMonHoc']))
+    return rows
+
+@handles('count_courses')
+def _count_courses(graph, params, _):
+    return [{'total_courses': len(_instances(graph, params['classes']))}]
+
+@handles('list_courses')
+def _list_courses(graph, params, _):
+    wanted = params.get('filter_relation')
+    after = params.get('after')
+    rows = []
+    for instance in _instances(graph, params['classes']):
+        semester = graph.props(instance).get('ns0__hocKy')
+        key = (2147483647 if semester is None else semester, instance)
+        if after is not None and key <= (after['semester'], after['course_id']):
+            continue
+        if wanted is not None and not set(wanted) <= {graph.rels[rel_id][0] for rel_id in graph.outgoing[instance]}:
+            continue
+        rows.append((key, instance))
+    rows.sort()
+    page = rows[params['skip']:params['skip'] + params['limit']]
+    statuses = {}
+    for uc in _user_courses(graph, user_id=params.get('user_id')):
+        statuses.setdefault(graph.props(uc).get('course_id'), graph.props(uc).get('status'))
+    return [{'course_id': instance, **_course_fields(graph, instance),
+             'relations': [rel for rel in _relations(graph, instance) if rel['rdfs__label'] is not None],
+             'course_status': statuses.get(instance), 'semester': key[0]} for key, instance in page]
+
+@handles('course_by_id')
+def _course_by_id(graph, params, _):
+    node_id = graph.find(params['course_id'])
+    if node_id is None:
+        return []
+    relations = [rel for rel in _relations(graph, node_id) if rel['rdfs__label'] is not None]
+    return [{'course_id': node_id, **_course_fields(graph, node_id), 'relations': relations}]
+
+@handles('search_courses')
+def _search_courses(graph, params, _):
+    return [{'elementId': node_id, 'code': graph.props(node_id).get('ns0__maMonHoc'), 'courseName': graph.props(node_id).get('rdfs__label')}
+            for node_id in dict.fromkeys(graph.courses())]
+
+@handles('search_course')
+def _search_course(graph, params, _):
+    return [row for row in _search_courses(graph, params, None) if row['elementId'] == params['course_id']]
+
+@handles('delete_relation', write=True)
+def _delete_relation(graph, params, _):
+    if params['relation_id'] not in graph.rels:
+        return []
+    graph.delete_rel(params['relation_id'])
+    return [{'deleted_relation_id': params['relation_id']}]
+
+@handles('relation_types')
+def _relation_types(graph, params, _):
+    return [{'relation_type': rel_type} for rel_type in dict.fromkeys(rel[0] for rel in graph.rels.values())]
+
+# Breadth-first from each class, so depth is the shortest path like min(length(path))
+@handles('class_closure')
+def _class_closure(graph, params, _):
+    rows = []
+    for child in graph.with_label('Resource'):
+        depths = {}
+        frontier = [child]
+        depth = 0
+        while frontier:
+            depth += 1
+            following = []
+            for node_id in frontier:
+                for _, parent in graph.out(node_id, 'rdfs__subClassOf'):
+                    if parent not in depths:
+                        depths[parent] = depth
+                        following.append(parent)
+            frontier = following
+        for ancestor, ancestor_depth in depths.items():
+            if 'Resource' in graph.nodes[ancestor]['labels']:
+                rows.append({'child_id': child, 'child_label': graph.props(child).get('rdfs__label'), 'ancestor_id': ancestor,
+                             'ancestor_label': graph.props(ancestor).get('rdfs__label'), 'depth': ancestor_depth})
+    return rows
+
+# Like a {key: value} pattern, where a null value matches nothing
+def _user_courses(graph, **match):
+    if any(value is None for value in match.values()):
+        return []
+    return [uc for uc in graph.with_label('UserCourse') if all(graph.props(uc).get(key) == value for key, value in match.items())]
+
+@handles('user_course_exists')
+def _user_course_exists(graph, params, _):
+    return [{'uc': _props_map(graph, uc)} for uc in _user_courses(graph, user_id=params['user_id'], course_id=params['course_id'])]
+
+@handles('incomplete_prerequisites')
+def _incomplete_prerequisites(graph, params, _):
+    course_b = graph.find(params['course_id'])
+    if course_b is None:
+        return []
+    rows = []
+    for course_a in dict.fromkeys(target for _, target in graph.out(course_b, 'ns0__tienQuyet')):
+        if not _user_courses(graph, user_id=params['user_id'], course_id=course_a, status='hoàn thành'):
+            rows.append({'course_id': course_a})
+    return rows
+
+@handles('user_progress')
+def _user_progress(graph, params, _):
+    user_ids = set(params['user_ids'])
+    progress = {}
+    for uc in graph.with_label('UserCourse'):
+        props = graph.props(uc)
+        if props.get('user_id') in user_ids:
+            row = progress.setdefault(props['user_id'], {'user_id': props['user_id'], 'completed': [], 'taken': []})
+            if props.get('status') == 'hoàn thành':
+                row['completed'].append(props.get('course_id'))
+            if props.get('status') in ('hoàn thành', 'đang học'):
+                row['taken'].append(props.get('course_id'))
+    return list(progress.values())
+
+@handles('create_user_course', write=True)
+def _create_user_course(graph, params, _):
+    node_id = graph.create_node({'UserCourse'}, {key: params.get(key) for key in ('user_id', 'course_id', 'status')})
+    return [{'user_course_id': node_id, 'uc': _props_map(graph, node_id)}]
+
+@handles('update_user_course', write=True)
+def _update_user_course(graph, params, _):
+    node_id = graph.find(params['user_course_id'], 'UserCourse')
+    if node_id is None:
+        return []
+    if params.get('status') is not None:
+        graph.props(node_id)['status'] = params['status']
+    return [{'user_course_id': node_id, 'uc': _props_map(graph, node_id)}]
+
+@handles('user_course_ids')
+def _user_course_ids(graph, params, _):
+    node_id = graph.find(params['user_course_id'], 'UserCourse')
+    return [{'user_id': graph.props(node_id).get('user_id'), 'course_id': graph.props(node_id).get('course_id')}] if node_id else []
+
+def _user_course_row(graph, node_id):
+    props = graph.props(node_id)
+    return {'user_course_id': node_id, 'user_id': props.get('user_id'), 'course_id': props.get('course_id'), 'status': props.get('status')}
+
+@handles('user_course_by_id')
+def _user_course_by_id(graph, params, _):
+    node_id = graph.find(params['user_course_id'], 'UserCourse')
+    return [_user_course_row(graph, node_id)] if node_id else []
+
+@handles('all_user_courses')
+def _all_user_courses(graph, params, _):
+    return [_user_course_row(graph, node_id) for node_id in graph.with_label('UserCourse')]
+
+@handles('delete_user_course', write=True)
+def _delete_user_course(graph, params, _):
+    node_id = graph.find(params['user_course_id'], 'UserCourse')
+    if node_id is not None:
+        graph.detach_delete(node_id)
+    return []
+
+
+# The part of the neo4j result/transaction/session API that app/utils.py uses
+class MemoryRecord(dict):
+    def data(self):
+        return dict(self)
+
+class MemoryResult(list):
+    def __init__(self, rows, relationships_created=0):
+        super().__init__(MemoryRecord(row) for row in rows)
+        self.counters = type('Counters', (), {'relationships_created': relationships_created})()
+
+    def consume(self):
+        return self
+
+class MemoryTransaction:
+    def __init__(self, driver, graph, writable):
+        self.driver = driver
+        self.graph = graph
+        self.writable = writable
+        self.log = []
+
+    def run(self, query, params=None):
+        params = params or {}
+        # EXPLAIN (the plan cache warm-up) has nothing to compile here
+        if query.lstrip().startswith('EXPLAIN'):
+            return MemoryResult([])
+        name, relation_type = self.driver.query_key(query)
+        if name in WRITES:
+            if not self.writable:
+                raise ReadOnlyTransaction(f'{name} writes and cannot run in a read transaction.')
+            self.log.append({'name': name, 'relation_type': relation_type, 'params': params})
+        created = self.graph.relationships_created
+        rows = HANDLERS[name](self.graph, params, relation_type)
+        return MemoryResult(rows, self.graph.relationships_created - created)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class MemorySession:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def execute_read(self, work, *args, **kwargs):
+        return work(MemoryTransaction(self.driver, self.driver.graph, False), *args, **kwargs)
+
+    def execute_write(self, work, *args, **kwargs):
+        return self.driver.write(work, *args, **kwargs)
+
+    def begin_transaction(self):
+        return MemoryTransaction(self.driver, self.driver.graph, False)
+
+    def last_bookmarks(self):
+        return Bookmarks()
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+class MemoryDriver:
+    def __init__(self, source, log_path):
+        self.source = source
+        self.log_path = log_path
+        self.lock = threading.Lock()
+        self._graph = None
+        self._query_keys = None
+        # Bytes of the write log applied to the current graph
+        self._log_offset = 0
+
+    # Loaded on first use: app.queries and the RDF parser import app.utils, which creates this driver.
+    # Entries another worker appended since are applied before the graph is handed out
+    @property
+    def graph(self):
+        if self._graph is None:
+            with self.lock:
+                if self._graph is None:
+                    self._graph = self.load()
+        elif self._log_size() > self._log_offset:
+            with self.lock:
+                self._catch_up()
+        return self._graph
+
+    def query_key(self, query):
+        if self._query_keys is None:
+            from app.queries import QUERY_KEYS
+            self._query_keys = QUERY_KEYS
+        key = self._query_keys.get(query)
+        if key is None or key[0] not in HANDLERS:
+            raise UnsupportedQuery(query)
+        return key
+
+    def _log_size(self):
+        if not self.log_path:
+            return 0
+        try:
+            return os.path.getsize(self.log_path)
+        except FileNotFoundError:
+            return 0
+
+    # Applies the complete log lines from `offset` on; returns the offset after the last one
+    def _replay(self, graph, offset):
+        if not self.log_path or not os.path.exists(self.log_path):
+            return offset
+        with open(self.log_path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+        # A line still being appended has no newline yet and is left for next time
+        data = data[:data.rfind(b'\n') + 1]
+        for line in data.splitlines():
+            entry = json.loads(line)
+            HANDLERS[entry['name']](graph, entry['params'], entry['relation_type'])
+        return offset + len(data)
+
+    def load(self):
+        from app.rdf_loader import PREFIXES, RDF_TYPE, convert, iter_triples, short_name
+        graph = MemoryGraph()
+        prefixes = dict(PREFIXES)
+        for subject, predicate, obj, datatype in iter_triples(self.source):
+            node_id = graph.resource(subject)
+            if datatype is not None:
+                graph.props(node_id)[short_name(predicate, prefixes)] = convert(obj, datatype)
+            elif predicate == RDF_TYPE:
+                graph.nodes[node_id]['labels'].add(short_name(obj, prefixes))
+                graph.merge_rel('rdf__type', node_id, graph.resource(obj))
+            else:
+                graph.merge_rel(short_name(predicate, prefixes), node_id, graph.resource(obj))
+        self._log_offset = self._replay(graph, 0)
+        graph.relationships_created = 0
+        graph.frozen = True
+        return graph
+
+    # Called with self.lock held
+    def _catch_up(self):
+        if self._log_size() <= self._log_offset:
+            return
+        graph = self._graph.copy()
+        offset = self._replay(graph, self._log_offset)
+        if offset != self._log_offset:
+            graph.frozen = True
+            self._graph, self._log_offset = graph, offset
+
+    # Serializes writers across worker processes; taken after self.lock
+    @contextmanager
+    def _log_lock(self):
+        if not self.log_path:
+            yield
+            return
+        with open(f'{self.log_path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Writers are serialized and start from every entry logged so far; the copy
+    # becomes the graph only if work returns
+    def write(self, work, *args, **kwargs):
+        self.graph
+        with self.lock, self._log_lock():
+            self._catch_up()
+            tx = MemoryTransaction(self, self._graph.copy(), True)
+            result = work(tx, *args, **kwargs)
+            if tx.log and self.log_path:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in tx.log))
+                self._log_offset = self._log_size()
+            tx.graph.frozen = True
+            self._graph = tx.graph
+        return result
+
+    def session(self, **config):
+        return MemorySession(self)
+
+    def close(self):
+        pass
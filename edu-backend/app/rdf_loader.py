@@ -0,0 +1,521 @@
+# app/rdf_loader.py
+# Loads ontology.rdf (RDF/XML) or ontology.owl (Turtle) into Neo4j with the same
+# shape n10s produces with handleRDFTypes LABELS_AND_NODES, which is what the
+# routes query: (:Resource {uri}) nodes, ns0__/rdfs__/owl__ property keys and
+# relationship types, and rdf:type as both a label and an rdf__type relationship.
+#
+#   flask load-ontology ../ontology.rdf           # full load
+#   flask load-ontology ../ontology.rdf --diff    # only the triples that changed since the last load
+#
+# Files are parsed incrementally (one top-level element / one statement at a time)
+# and written in batched UNWIND transactions. Every load records the triples it
+# saw in a JSON-lines state file, which --diff compares against.
+import hashlib
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+import click
+from flask.cli import with_appcontext
+from app.class_closure import classes_changed
+from app.config import Config
+from app.schema import constraint_statement
+from app.search_index import rebuild_course_embeddings
+from app.utils import execute_write, write_transaction
+
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+RDFS = 'http://www.w3.org/2000/01/rdf-schema#'
+OWL = 'http://www.w3.org/2002/07/owl#'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+XML = 'http://www.w3.org/XML/1998/namespace'
+EDU = 'http://localhost/ontologies/2024/10/11/edu_program#'
+RDF_TYPE = RDF + 'type'
+
+# Prefixes n10s assigned when the ontology was first imported (see note.txt)
+PREFIXES = {EDU: 'ns0', RDF: 'rdf', RDFS: 'rdfs', OWL: 'owl', XSD: 'xsd'}
+
+INTEGER_TYPES = {XSD + name for name in ('integer', 'int', 'long', 'short', 'byte', 'nonNegativeInteger', 'positiveInteger', 'negativeInteger', 'nonPositiveInteger')}
+FLOAT_TYPES = {XSD + name for name in ('decimal', 'double', 'float')}
+
+def bnode(*parts):
+    return 'bnode://' + hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+# Triples are (subject, predicate, object, datatype): object is a URI when
+# datatype is None, otherwise a literal's lexical form ('' datatype = plain string)
+def literal(subject, predicate, value, datatype=None):
+    return (subject, predicate, value, datatype or '')
+
+
+# RDF/XML
+def _split_tag(tag):
+    namespace, _, local = tag[1:].partition('}')
+    return namespace, local
+
+def _uri(tag):
+    namespace, local = _split_tag(tag)
+    return namespace + local
+
+def _resolve(reference, base):
+    if '://' in reference:
+        return reference
+    if reference.startswith('#'):
+        return base.split('#')[0] + reference
+    return base.rsplit('/', 1)[0] + '/' + reference if reference else base
+
+def _subject(element, base, anonymous_id):
+    about = element.get(f'{{{RDF}}}about')
+    if about is not None:
+        return _resolve(about, base)
+    node_id = element.get(f'{{{RDF}}}nodeID')
+    if node_id is not None:
+        return 'bnode://' + node_id
+    element_id = element.get(f'{{{RDF}}}ID')
+    if element_id is not None:
+        return _resolve('#' + element_id, base)
+    return anonymous_id
+
+def _node_element(element, base, anonymous_id):
+    subject = _subject(element, base, anonymous_id)
+    if element.tag != f'{{{RDF}}}Description':
+        yield (subject, RDF_TYPE, _uri(element.tag), None)
+    for name, value in element.attrib.items():
+        if not name.startswith(('{' + RDF, '{' + XML)):
+            yield literal(subject, _uri(name), value)
+    for index, prop in enumerate(element):
+        if isinstance(prop.tag, str):
+            yield from _property_element(subject, prop, base, index)
+
+def _property_element(subject, prop, base, index):
+    predicate = _uri(prop.tag)
+    resource = prop.get(f'{{{RDF}}}resource')
+    node_id = prop.get(f'{{{RDF}}}nodeID')
+    parse_type = prop.get(f'{{{RDF}}}parseType')
+    children = [child for child in prop if isinstance(child.tag, str)]
+    if resource is not None:
+        yield (subject, predicate, _resolve(resource, base), None)
+    elif node_id is not None:
+        yield (subject, predicate, 'bnode://' + node_id, None)
+    elif parse_type == 'Resource':
+        inner = bnode(subject, predicate, index)
+        yield (subject, predicate, inner, None)
+        for inner_index, child in enumerate(children):
+            yield from _property_element(inner, child, base, inner_index)
+    elif parse_type == 'Collection':
+        items = [(bnode(subject, predicate, index, 'item', position), child) for position, child in enumerate(children)]
+        cells = [bnode(subject, predicate, index, 'cell', position) for position in range(len(items))]
+        yield (subject, predicate, cells[0] if cells else RDF + 'nil', None)
+        for position, ((item_id, child), cell) in enumerate(zip(items, cells)):
+            item = _subject(child, base, item_id)
+            yield from _node_element(child, base, item_id)
+            yield (cell, RDF + 'first', item, None)
+            yield (cell, RDF + 'rest', cells[position + 1] if position + 1 < len(cells) else RDF + 'nil', None)
+    elif parse_type == 'Literal':
+        yield literal(subject, predicate, ''.join(ET.tostring(child, encoding='unicode') for child in children), RDF + 'XMLLiteral')
+    elif children:
+        for position, child in enumerate(children):
+            inner_id = bnode(subject, predicate, index, position)
+            yield (subject, predicate, _subject(child, base, inner_id), None)
+            yield from _node_element(child, base, inner_id)
+    else:
+        yield literal(subject, predicate, prop.text or '', prop.get(f'{{{RDF}}}datatype'))
+
+# Each top-level element is handled and discarded as soon as its end tag is read
+def iter_rdfxml(path):
+    depth = 0
+    root = None
+    base = ''
+    count = 0
+    for event, element in ET.iterparse(path, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = element
+                base = element.get(f'{{{XML}}}base', '')
+            depth += 1
+            continue
+        depth -= 1
+        if depth == 1:
+            yield from _node_element(element, element.get(f'{{{XML}}}base', base), bnode('top', count))
+            count += 1
+            root.remove(element)
+
+
+# Turtle
+_TOKEN = re.compile(r'''
+    (?P<ws>\s+|\#[^\n]*)
+  | (?P<iri><[^>]*>)
+  | (?P<long>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\')
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<directive>@prefix|@base|PREFIX\b|BASE\b)
+  | (?P<lang>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<datatype>\^\^)
+  | (?P<number>[+-]?(?:\d+\.\d*(?:[eE][+-]?\d+)?|\.\d+(?:[eE][+-]?\d+)?|\d+[eE][+-]?\d+|\d+))
+  | (?P<boolean>(?:true|false)(?![\w:-]))
+  | (?P<a>a(?![\w:-]))
+  | (?P<bnode>_:[\w.-]*\w)
+  | (?P<pname>[A-Za-z][\w.-]*?:[\w.:%-]*|:[\w.:%-]*)
+  | (?P<punct>[.;,\[\]()])
+''', re.VERBOSE)
+
+_ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+def _unescape(text):
+    return re.sub(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)',
+                  lambda m: chr(int(m.group(1)[1:], 16)) if m.group(1)[0] in 'uU' and len(m.group(1)) > 1 else _ESCAPES.get(m.group(1), m.group(1)), text)
+
+# Tokens are read line by line; only a long (""") string can span lines
+def _turtle_tokens(path):
+    pending = ''
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            text = pending + line
+            if text.count('"""') % 2 or text.count("'''") % 2:
+                pending = text
+                continue
+            pending = ''
+            position = 0
+            while position < len(text):
+                match = _TOKEN.match(text, position)
+                if match is None:
+                    raise ValueError(f'Unexpected Turtle input: {text[position:position + 40]!r}')
+                position = match.end()
+                if match.lastgroup != 'ws':
+                    yield match.lastgroup, match.group()
+
+
+class _TurtleParser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.lookahead = next(tokens, None)
+        self.prefixes = {}
+        self.base = ''
+        self.anonymous = 0
+
+    def next(self):
+        token = self.lookahead
+        self.lookahead = next(self.tokens, None)
+        return token
+
+    def expect(self, value):
+        token = self.next()
+        if token is None or token[1] != value:
+            raise ValueError(f'Expected {value!r} in Turtle, got {token!r}')
+
+    def iri(self, token):
+        kind, value = token
+        if kind == 'iri':
+            return _resolve(value[1:-1], self.base) if value[1:-1] else self.base
+        if kind == 'a':
+            return RDF_TYPE
+        prefix, _, local = value.partition(':')
+        if prefix not in self.prefixes:
+            raise ValueError(f'Unknown Turtle prefix {prefix!r}')
+        return self.prefixes[prefix] + local
+
+    def statements(self):
+        while self.lookahead is not None:
+            kind, value = self.lookahead
+            if kind == 'directive':
+                self.directive()
+                continue
+            subject = self.subject()
+            self.anonymous = 0
+            yield from self.subject_triples(subject)
+            if self.lookahead and self.lookahead[1] == '.':
+                self.next()
+
+    def directive(self):
+        _, keyword = self.next()
+        if keyword.lower().endswith('prefix'):
+            _, name = self.next()
+            self.prefixes[name[:-1]] = self.iri(self.next())
+        else:
+            self.base = self.iri(self.next())
+        if keyword.startswith('@'):
+            self.expect('.')
+
+    def subject(self):
+        token = self.lookahead
+        if token[1] in ('[', '('):
+            return None
+        self.next()
+        return 'bnode://' + token[1][2:] if token[0] == 'bnode' else self.iri(token)
+
+    # A subject may itself be [ ... ] or ( ... ); its triples come first
+    def subject_triples(self, subject):
+        if subject is None:
+            triples = []
+            subject = self.object_term(triples, 'statement', 0)
+            yield from triples
+            if self.lookahead and self.lookahead[1] in ('.', None):
+                return
+        triples = []
+        self.predicate_objects(subject, triples)
+        yield from triples
+
+    def predicate_objects(self, subject, triples):
+        while self.lookahead and self.lookahead[1] not in ('.', ']'):
+            predicate = self.iri(self.next())
+            while True:
+                triples.append(self.object_triple(subject, predicate, triples))
+                if self.lookahead and self.lookahead[1] == ',':
+                    self.next()
+                    continue
+                break
+            if self.lookahead and self.lookahead[1] == ';':
+                while self.lookahead and self.lookahead[1] == ';':
+                    self.next()
+                continue
+            break
+
+    def object_triple(self, subject, predicate, triples):
+        kind, value = self.lookahead
+        if kind in ('string', 'long'):
+            self.next()
+            text = _unescape(value[3:-3] if kind == 'long' else value[1:-1])
+            datatype = None
+            if self.lookahead and self.lookahead[0] == 'datatype':
+                self.next()
+                datatype = self.iri(self.next())
+            elif self.lookahead and self.lookahead[0] == 'lang':
+                self.next()
+            return literal(subject, predicate, text, datatype)
+        if kind == 'number':
+            self.next()
+            datatype = XSD + ('integer' if re.fullmatch(r'[+-]?\d+', value) else 'decimal' if 'e' not in value.lower() else 'double')
+            return literal(subject, predicate, value, datatype)
+        if kind == 'boolean':
+            self.next()
+            return literal(subject, predicate, value, XSD + 'boolean')
+        return (subject, predicate, self.object_term(triples, subject, predicate), None)
+
+    def object_term(self, triples, subject, predicate):
+        token = self.next()
+        if token[1] == '[':
+            self.anonymous += 1
+            node = bnode(subject, predicate, self.anonymous)
+            self.predicate_objects(node, triples)
+            self.expect(']')
+            return node
+        if token[1] == '(':
+            self.anonymous += 1
+            head = bnode(subject, predicate, self.anonymous, 'list')
+            cell = head
+            position = 0
+            while self.lookahead[1] != ')':
+                triples.append(self.object_triple(cell, RDF + 'first', triples))
+                position += 1
+                following = RDF + 'nil' if self.lookahead[1] == ')' else bnode(head, position)
+                triples.append((cell, RDF + 'rest', following, None))
+                cell = following
+            self.next()
+            return head if position else RDF + 'nil'
+        if token[0] == 'bnode':
+            return 'bnode://' + token[1][2:]
+        return self.iri(token)
+
+def iter_turtle(path):
+    return _TurtleParser(_turtle_tokens(path)).statements()
+
+def iter_triples(path):
+    with open(path, 'rb') as f:
+        head = f.read(512).lstrip()
+    if head.startswith(b'<?xml') or head.startswith(b'<rdf:RDF'):
+        return iter_rdfxml(path)
+    return iter_turtle(path)
+
+
+# Neo4j mapping
+# `prefixes` is one parse's copy of PREFIXES: unknown namespaces get the next free
+# nsN prefix in it, as n10s does, without leaking into later parses
+def short_name(uri, prefixes):
+    match = re.match(r'^(.*[#/])([^#/]*)$', uri)
+    namespace, local = match.groups() if match else ('', uri)
+    if namespace not in prefixes:
+        prefixes[namespace] = f"ns{sum(prefix.startswith('ns') for prefix in prefixes.values())}"
+    return f'{prefixes[namespace]}__{local}'
+
+def convert(value, datatype):
+    if datatype in INTEGER_TYPES:
+        return int(value)
+    if datatype in FLOAT_TYPES:
+        return float(value)
+    if datatype == XSD + 'boolean':
+        return value.strip().lower() in ('true', '1')
+    return value
+
+def _quote(name):
+    return '`' + name.replace('`', '``') + '`'
+
+MERGE_NODES_QUERY = """
+UNWIND $rows AS row
+MERGE (n:Resource {uri: row.uri})
+SET n += row.props
+"""
+
+# Labels and relationship types cannot be parameters; each batch runs one
+# statement per distinct label or type (a few dozen for this ontology)
+def _label_query(label, remove=False):
+    if remove:
+        return f'UNWIND $uris AS uri MATCH (n:Resource {{uri: uri}}) REMOVE n:{_quote(label)}'
+    return f'UNWIND $uris AS uri MERGE (n:Resource {{uri: uri}}) SET n:{_quote(label)}'
+
+def _relationship_query(rel_type, remove=False):
+    if remove:
+        return f"""
+        UNWIND $pairs AS pair
+        MATCH (s:Resource {{uri: pair.s}})-[rel:{_quote(rel_type)}]->(o:Resource {{uri: pair.o}})
+        DELETE rel
+        """
+    return f"""
+    UNWIND $pairs AS pair
+    MERGE (s:Resource {{uri: pair.s}})
+    MERGE (o:Resource {{uri: pair.o}})
+    MERGE (s)-[:{_quote(rel_type)}]->(o)
+    """
+
+DELETE_NODES_QUERY = """
+UNWIND $uris AS uri
+MATCH (n:Resource {uri: uri})
+DETACH DELETE n
+"""
+
+URI_CONSTRAINT_QUERY = constraint_statement('n10s_unique_uri', 'Resource', ('uri',))
+
+
+class GraphWriter:
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.props = {}
+        self.labels = {}
+        self.relationships = {}
+        self.removed_labels = {}
+        self.removed_relationships = {}
+        self.deleted = []
+        self.pending = 0
+        self.stats = {'written': 0, 'transactions': 0}
+        self.prefixes = dict(PREFIXES)
+
+    def add(self, triple, remove=False):
+        subject, predicate, obj, datatype = triple
+        self.stats['written'] += 1
+        if datatype is not None:
+            props = self.props.setdefault(subject, {})
+            props[short_name(predicate, self.prefixes)] = None if remove else convert(obj, datatype)
+        elif predicate == RDF_TYPE:
+            target = self.removed_labels if remove else self.labels
+            target.setdefault(short_name(obj, self.prefixes), []).append(subject)
+            relationships = self.removed_relationships if remove else self.relationships
+            relationships.setdefault('rdf__type', []).append({'s': subject, 'o': obj})
+        else:
+            relationships = self.removed_relationships if remove else self.relationships
+            relationships.setdefault(short_name(predicate, self.prefixes), []).append({'s': subject, 'o': obj})
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def delete_nodes(self, uris):
+        self.deleted.extend(uris)
+
+    def _write(self, tx):
+        if self.props:
+            rows = [{'uri': uri, 'props': props} for uri, props in self.props.items()]
+            tx.run(MERGE_NODES_QUERY, {'rows': rows}).consume()
+        for rel_type, pairs in self.removed_relationships.items():
+            tx.run(_relationship_query(rel_type, remove=True), {'pairs': pairs}).consume()
+        for label, uris in self.removed_labels.items():
+            tx.run(_label_query(label, remove=True), {'uris': uris}).consume()
+        for label, uris in self.labels.items():
+            tx.run(_label_query(label), {'uris': uris}).consume()
+        for rel_type, pairs in self.relationships.items():
+            tx.run(_relationship_query(rel_type), {'pairs': pairs}).consume()
+        if self.deleted:
+            tx.run(DELETE_NODES_QUERY, {'uris': self.deleted}).consume()
+
+    def flush(self):
+        if self.pending or self.deleted:
+            write_transaction(self._write)
+            self.stats['transactions'] += 1
+        self.props, self.labels, self.relationships = {}, {}, {}
+        self.removed_labels, self.removed_relationships = {}, {}
+        self.deleted = []
+        self.pending = 0
+
+
+def _state_key(triple):
+    return json.dumps(triple, ensure_ascii=False)
+
+def read_state(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as f:
+        return {line.rstrip('\n') for line in f if line.strip()}
+
+def _resources(keys):
+    resources = set()
+    for key in keys:
+        subject, _, obj, datatype = json.loads(key)
+        resources.add(subject)
+        if datatype is None:
+            resources.add(obj)
+    return resources
+
+# Full load streams triples straight into batched writes; diff mode compares them
+# with the previous load's state and writes only additions and removals
+def load_ontology(path, state_path=None, diff=False, batch_size=None):
+    state_path = state_path or f'{path}.load-state.json'
+    writer = GraphWriter(batch_size or Config.RDF_BATCH_SIZE)
+    execute_write(URI_CONSTRAINT_QUERY)
+    previous = read_state(state_path) if diff else None
+    tmp_path = f'{state_path}.tmp'
+    seen = set()
+    # (subject, predicate) of every literal -> the last such triple, which is the
+    # value a full load leaves on the property
+    literals = {}
+    report = {'mode': 'diff' if previous is not None else 'full', 'added': 0, 'removed': 0, 'unchanged': 0}
+
+    with open(tmp_path, 'w', encoding='utf-8') as state:
+        for triple in iter_triples(path):
+            key = _state_key(triple)
+            if key in seen:
+                continue
+            seen.add(key)
+            state.write(key + '\n')
+            if triple[3] is not None:
+                literals[triple[0], triple[1]] = triple
+            if previous is not None and key in previous:
+                report['unchanged'] += 1
+                continue
+            report['added'] += 1
+            writer.add(triple)
+
+    if previous is not None:
+        removed = previous - seen
+        # A removed literal only nulls its property when no value of it is left;
+        # otherwise the property is rewritten from a surviving one
+        for key in sorted(removed):
+            subject, predicate, obj, datatype = json.loads(key)
+            report['removed'] += 1
+            if datatype is not None and (subject, predicate) in literals:
+                writer.add(literals[subject, predicate])
+                continue
+            writer.add((subject, predicate, obj, datatype), remove=True)
+        writer.flush()
+        writer.delete_nodes(sorted(_resources(removed) - _resources(seen)))
+    writer.flush()
+    os.replace(tmp_path, state_path)
+    report.update(writer.stats)
+    classes_changed()
+    if report['added'] or report['removed']:
+        rebuild_course_embeddings()
+    return report
+
+
+@click.command('load-ontology')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--diff', is_flag=True, help='Only write triples that changed since the last load.')
+@click.option('--state', 'state_path', default=None, help='State file of the last load (default: PATH.load-state.json).')
+@click.option('--batch-size', type=int, default=None)
+@with_appcontext
+def load_ontology_command(path, diff, state_path, batch_size):
+    report = load_ontology(path, state_path, diff, batch_size)
+    click.echo(json.dumps(report))
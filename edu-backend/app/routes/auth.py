@@ -1,6 +1,7 @@
 # app/routes/auth.py
 from flask import Blueprint, jsonify, request
-from app.utils import execute_query
+from app.queries import named_query
+from app.utils import execute_query, execute_read
 import bcrypt
 
 auth_bp = Blueprint('auth', __name__)
@@ -17,7 +18,7 @@ def register():
         return jsonify({'message': 'Username and password are required'}), 400
 
     # Check if username already exists
-    query = "MATCH (u:User {username: $username}) RETURN u"
+    query = named_query('user_by_username')
     params = {'username': username}
     result = execute_query(query, params)
 
@@ -50,9 +51,9 @@ def login():
         return jsonify({'message': 'Username and password are required'}), 400
 
     # Find the user in Neo4j
-    query = "MATCH (u:User {username: $username}) RETURN u.password AS password, u.role AS role, elementId(u) AS elementId"
+    query = named_query('login_user')
     params = {'username': username}
-    result = execute_query(query, params)
+    result = execute_read(query, params)
 
     if not result:
         return jsonify({'message': 'Invalid username or password'}), 401
@@ -1,86 +1,50 @@
 # app/routes/courses.py
+import base64
+import json
 from flask import Blueprint, jsonify, request
-from app.utils import execute_query
+from app import graph_version
+from app.class_closure import course_classes
+from app.config import Config
+from app.constraints import SemesterConstraints, relation_semester_error
+from app.curriculum_index import curriculum_index
+from app.curriculum_plan import course_removed, relation_removed, relations_added
+from app.queries import RELATION_TYPES, named_query, relation_query
+from app.utils import execute_query, execute_read, write_transaction
+from app.search_cache import LRUCache
+from app.search_index import refresh_course_embedding, remove_course_embedding
+
+# Total of GET /courses, keyed by the class and course versions
+course_count_cache = LRUCache(1, Config.COURSE_COUNT_TTL)
 
 # Utility functions
-def check_existing_course(course_id):
-    query = """
-    MATCH (course) WHERE elementId(course) = $course_id
-    RETURN course
-    """
+def check_existing_course(course_id, tx=None):
+    query = named_query('course_exists')
     params = {'course_id': course_id}
-    return execute_query(query, params)
-
-def check_existing_target(target_id):
-    query = """
-    MATCH (target) WHERE elementId(target) = $target_id
-    RETURN target
-    """
-    params = {'target_id': target_id}
-    return execute_query(query, params)
-
-def check_existing_relation(course_id, target_id, relation_type):
-    query = """
-    MATCH (course)-[rel:`{relation_type}`]->(target)
-    WHERE elementId(course) = $course_id AND elementId(target) = $target_id
-    RETURN rel
-    """
-    params = {
-        'course_id': course_id,
-        'target_id': target_id
-    }
-    return execute_query(query, params)
-
-def check_prerequisite_violation(course_id, target_id):
-    # Check if course A is a prerequisite of course B and both are in the same semester
-    query = """
-    MATCH (courseA)-[:ns0__tienQuyet]->(courseB)
-    WHERE elementId(courseA) = $course_id AND elementId(courseB) = $target_id AND courseA.ns0__hocKy = courseB.ns0__hocKy
-    RETURN courseA, courseB
-    """
-    params = {
-        'course_id': course_id,
-        'target_id': target_id
-    }
-    return execute_query(query, params)
-
-def check_parallel_violation(course_id, target_id):
-    # Check if two courses are in a parallel relationship but cannot be taken in the same semester
-    query = """
-    MATCH (courseA)-[:ns0__songHanh]->(courseB)
-    WHERE elementId(courseA) = $course_id AND elementId(courseB) = $target_id AND courseA.ns0__hocKy <> courseB.ns0__hocKy
-    RETURN courseA, courseB
-    """
-    params = {
-        'course_id': course_id,
-        'target_id': target_id
-    }
-    return execute_query(query, params)
-
-def check_prior_violation(course_id, target_id):
-    # Check if course A must be taken before course B but both are in the same semester
-    query = """
-    MATCH (courseA)-[:ns0__hocTruoc]->(courseB)
-    WHERE elementId(courseA) = $course_id AND elementId(courseB) = $target_id AND courseA.ns0__hocKy = courseB.ns0__hocKy
-    RETURN courseA, courseB
-    """
-    params = {
-        'course_id': course_id,
-        'target_id': target_id
-    }
-    return execute_query(query, params)
+    return execute_query(query, params, tx)
+
+# Validates every {index, relation_type, target_id[, relation_id]} item with one
+# statement and returns the errors of the items that fail, in input order
+def check_relations(course_id, relations, tx):
+    params = {'course_id': course_id, 'relations': relations}
+    rows = execute_query(named_query('check_relations'), params, tx)
+    errors = []
+    seen = set()
+    for row, relation in zip(rows, relations):
+        relation_type = relation['relation_type']
+        target_id = relation['target_id']
+        if not row['target_exists']:
+            error = f'Target with id {target_id} does not exist.'
+        else:
+            error = relation_semester_error(relation_type, row['course_semester'], row['target_semester'])
+        if not error and (row['duplicate'] or (relation_type, target_id) in seen):
+            error = f'Relation {relation_type} between course {course_id} and target {target_id} already exists.'
+        seen.add((relation_type, target_id))
+        if error:
+            errors.append({'index': relation['index'], 'relation_type': relation_type, 'target_id': target_id, 'error': error})
+    return errors
 
 def create_course(data):
-    query = """
-    CREATE (course:Resource:owl__NamedIndividual {
-        ns0__hocKy: $ns0__hocKy,
-        ns0__laMonTuChon: coalesce($ns0__laMonTuChon, false),
-        ns0__maMonHoc: $ns0__maMonHoc,
-        ns0__soTinChi: $ns0__soTinChi,
-        rdfs__label: $rdfs__label
-    })
-    RETURN elementId(course) AS course_id, course
-    """
+    query = named_query('create_course')
     params = {
         'ns0__hocKy': data.get('ns0__hocKy'),
         'ns0__laMonTuChon': data.get('ns0__laMonTuChon'),
@@ -90,27 +54,8 @@ def create_course(data):
     }
     return execute_query(query, params)
 
-def create_relation(course_id, relation):
-    query = f"""
-    MATCH (course) WHERE elementId(course) = $course_id
-    MATCH (target) WHERE elementId(target) = $target_id
-    CREATE (course)-[:`{relation['relation_type']}`]->(target)
-    """
-    params = {
-        'course_id': course_id,
-        'target_id': relation['target_id']
-    }
-    execute_query(query, params)
-
-def update_course(course_id, data):
-    query = """
-    MATCH (course) WHERE elementId(course) = $course_id
-    SET course.ns0__hocKy = coalesce($ns0__hocKy, course.ns0__hocKy),
-        course.ns0__laMonTuChon = coalesce($ns0__laMonTuChon, course.ns0__laMonTuChon),
-        course.ns0__soTinChi = coalesce($ns0__soTinChi, course.ns0__soTinChi),
-        course.rdfs__label = coalesce($rdfs__label, course.rdfs__label)
-    RETURN elementId(course) AS course_id, course
-    """
+def update_course(course_id, data, tx=None):
+    query = named_query('update_course')
     params = {
         'course_id': course_id,
         'ns0__hocKy': data.get('ns0__hocKy'),
@@ -118,26 +63,87 @@ def update_course(course_id, data):
         'ns0__soTinChi': data.get('ns0__soTinChi'),
         'rdfs__label': data.get('rdfs__label')
     }
-    return execute_query(query, params)
+    return execute_query(query, params, tx)
+
+# Existence check, semester checks and the update run in one transaction, so the
+# related semesters cannot change between the check and the write
+def update_course_unit(tx, course_id, data):
+    if not check_existing_course(course_id, tx):
+        return None, (f'Course with id {course_id} does not exist.', 404)
+
+    # Extract the new semester value from the input data
+    new_semester = data.get('ns0__hocKy')
 
-def update_relation(relation_id, relation_type, target_id):
-    # Match the existing relation to be updated
-    query = f"""
-    MATCH ()-[rel]->() 
-    WHERE elementId(rel) = $relation_id
-    WITH rel, startNode(rel) AS start
-    DELETE rel
-    WITH start
-    MATCH (new_target) WHERE elementId(new_target) = $target_id
-    CREATE (start)-[newRel:`{relation_type}`]->(new_target)
-    RETURN elementId(newRel) AS relation_id, type(newRel) AS relation_type, elementId(new_target) AS target_id
-    """
+    # If the semester is being updated, re-check the relations in both directions
+    if new_semester is not None:
+        related = execute_query(named_query('course_semester_relations'), {'course_ids': [course_id]}, tx)
+        errors = SemesterConstraints.from_rows(related).check(moves={course_id: new_semester})
+        if errors:
+            return None, (errors[0]['error'], 400)
+
+    return update_course(course_id, data, tx), None
+
+# Moves many courses at once: the semester rules are checked against the final
+# semesters of every moved course, and all moves are written by one statement
+# in the same transaction, or none is
+def move_courses_unit(tx, moves):
+    course_ids = list(moves)
+    existing = {row['course_id'] for row in execute_query(named_query('existing_courses'), {'course_ids': course_ids}, tx)}
+    missing = [{'course_id': course_id, 'error': f'Course with id {course_id} does not exist.'} for course_id in course_ids if course_id not in existing]
+    if missing:
+        return missing, 404
+
+    related = execute_query(named_query('course_semester_relations'), {'course_ids': course_ids}, tx)
+    errors = SemesterConstraints.from_rows(related).check(moves=moves)
+    if errors:
+        return errors, 400
+
+    params = {'moves': [{'course_id': course_id, 'semester': semester} for course_id, semester in moves.items()]}
+    return execute_query(named_query('move_courses'), params, tx), 200
+
+def delete_course_unit(tx, course_id):
+    # DETACH DELETE drops the course together with its relationships in both directions
+    return bool(execute_query(named_query('delete_course'), {'course_id': course_id}, tx))
+
+# The whole payload is validated and written in one transaction: either every
+# relation is created or, when any item fails, none is
+def add_relations_unit(tx, course_id, relations):
+    if not check_existing_course(course_id, tx):
+        return [{'error': f'Course with id {course_id} does not exist.'}], 404
+    errors = check_relations(course_id, relations, tx)
+    if errors:
+        return errors, 400
+
+    targets_by_type = {}
+    for relation in relations:
+        targets_by_type.setdefault(relation['relation_type'], []).append(relation['target_id'])
+    created = []
+    for relation_type, target_ids in targets_by_type.items():
+        params = {'course_id': course_id, 'target_ids': target_ids}
+        rows = execute_query(relation_query('create_relations', relation_type), params, tx)
+        created.extend({**row, 'relation_type': relation_type} for row in rows)
+    return created, 201
+
+def update_relation_unit(tx, relation_id, relation_type, target_id):
+    start = execute_query(named_query('relation_start'), {'relation_id': relation_id}, tx)
+    if not start:
+        return None, (f'Relation with id {relation_id} does not exist.', 404)
+
+    # The relation itself does not count as a duplicate of its replacement
+    relation = {'index': 0, 'relation_type': relation_type, 'target_id': target_id, 'relation_id': relation_id}
+    errors = check_relations(start[0]['course_id'], [relation], tx)
+    if errors:
+        return None, (errors[0]['error'], 400)
+    return update_relation(relation_id, relation_type, target_id, tx), None
+
+def update_relation(relation_id, relation_type, target_id, tx=None):
+    # Replace the existing relation with one of the new type and target
+    query = relation_query('update_relation', relation_type)
     params = {
         'relation_id': relation_id,
-        'relation_type': relation_type,
         'target_id': target_id
     }
-    return execute_query(query, params)
+    return execute_query(query, params, tx)
 
 # Blueprint setup
 courses_bp = Blueprint('courses', __name__)
@@ -165,44 +171,35 @@ def add_course():
         'rdfs__label': course[0]['course']['rdfs__label']
     }
 
+    # Keep the precomputed search embeddings and the cached total in sync with the new course
+    graph_version.bump(graph_version.COURSES)
+    refresh_course_embedding(course_data['course_id'])
+
     return jsonify({'message': 'Course added successfully!', 'course': course_data}), 201
 
 @courses_bp.route('/courses/<course_id>/relations', methods=['POST'])
 def add_course_relations(course_id):
     data = request.get_json()
-    relations = data.get('relations', [])
-    
+    relations = [
+        {'index': index, 'relation_type': relation.get('relation_type'), 'target_id': relation.get('target_id')}
+        for index, relation in enumerate(data.get('relations', []))
+        if relation.get('relation_type') and relation.get('target_id')
+    ]
+
+    # Reject unknown relation types before any query runs
     for relation in relations:
-        relation_type = relation.get('relation_type')
-        target_id = relation.get('target_id')
-        if relation_type and target_id:
-            existing_target = check_existing_target(target_id)
-            if not existing_target:
-                return jsonify({'error': f'Target with id {target_id} does not exist.'}), 400
-
-            # Check for prerequisite violation
-            if relation_type == 'ns0__tienQuyet':
-                violation = check_prerequisite_violation(course_id, target_id)
-                if violation:
-                    return jsonify({'error': 'Prerequisite violation: Both courses are in the same semester.'}), 400
-
-            # Check for parallel violation
-            if relation_type == 'ns0__songHanh':
-                violation = check_parallel_violation(course_id, target_id)
-                if violation:
-                    return jsonify({'error': 'Parallel violation: Courses cannot be taken in different semesters.'}), 400
-
-            # Check for prior violation
-            if relation_type == 'ns0__hocTruoc':
-                violation = check_prior_violation(course_id, target_id)
-                if violation:
-                    return jsonify({'error': 'Prior violation: Both courses are in the same semester.'}), 400
-
-            existing_relation = check_existing_relation(course_id, target_id, relation_type)
-            if existing_relation:
-                return jsonify({'error': f'Relation {relation_type} between course {course_id} and target {target_id} already exists.'}), 400
-
-            create_relation(course_id, relation)
+        if relation['relation_type'] not in RELATION_TYPES:
+            return jsonify({'error': f'Unknown relation type {relation["relation_type"]}.'}), 400
+    if not relations:
+        return jsonify({'message': 'Relations added successfully!'}), 201
+
+    result, status = write_transaction(add_relations_unit, course_id, relations)
+    if status == 404:
+        return jsonify(result[0]), 404
+    if status == 400:
+        return jsonify({'error': 'No relations were added.', 'errors': result}), 400
+    graph_version.bump(graph_version.COURSES)
+    relations_added(course_id, result)
     return jsonify({'message': 'Relations added successfully!'}), 201
 
 @courses_bp.route('/courses/relations/<relation_id>', methods=['PUT'])
@@ -210,106 +207,85 @@ def update_relation_by_id(relation_id):
     data = request.get_json()
     relation_type = data.get('relation_type')
     target_id = data.get('target_id')
-    
+
     if not relation_type or not target_id:
         return jsonify({'error': 'Missing relation_type or target_id.'}), 400
+    if relation_type not in RELATION_TYPES:
+        return jsonify({'error': f'Unknown relation type {relation_type}.'}), 400
 
-    # Check if the same relation already exists
-    query_check = """
-    MATCH (course)-[rel:`{relation_type}`]->(target)
-    WHERE elementId(rel) <> $relation_id AND elementId(target) = $target_id
-    RETURN rel
-    """
-    params_check = {
-        'relation_id': relation_id,
-        'target_id': target_id,
-        'relation_type': relation_type
-    }
-    existing_relation = execute_query(query_check, params_check)
-
-    if existing_relation:
-        return jsonify({'error': 'Relation with the same type and target already exists, update not allowed.'}), 400
-
-    # Check for prerequisite violation
-    if relation_type == 'ns0__tienQuyet':
-        violation = check_prerequisite_violation(target_id, relation_id)
-        if violation:
-            return jsonify({'error': 'Prerequisite violation: Both courses are in the same semester.'}), 400
-
-    # Check for parallel violation
-    if relation_type == 'ns0__songHanh':
-        violation = check_parallel_violation(target_id, relation_id)
-        if violation:
-            return jsonify({'error': 'Parallel violation: Courses cannot be taken in different semesters.'}), 400
-
-    # Check for prior violation
-    if relation_type == 'ns0__hocTruoc':
-        violation = check_prior_violation(target_id, relation_id)
-        if violation:
-            return jsonify({'error': 'Prior violation: Both courses are in the same semester.'}), 400
-    
-    updated_relation = update_relation(relation_id, relation_type, target_id)
-    
+    updated_relation, error = write_transaction(update_relation_unit, relation_id, relation_type, target_id)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
     if not updated_relation:
         return jsonify({'error': 'Failed to update relation.'}), 500
+    graph_version.bump(graph_version.COURSES)
+    relation_removed(relation_id)
+    relations_added(updated_relation[0]['course_id'], updated_relation)
 
     return jsonify({'message': 'Relation updated successfully!', 'relation': updated_relation}), 200
 
+# Opaque cursor: the (semester, elementId) sort key of the last course of a page
+def encode_cursor(row):
+    return base64.urlsafe_b64encode(json.dumps([row['semester'], row['course_id']]).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    semester, course_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    return {'semester': int(semester), 'course_id': str(course_id)}
+
+def count_courses(classes):
+    key = (graph_version.current(graph_version.CLASSES), graph_version.current(graph_version.COURSES))
+    total_courses = course_count_cache.get(key)
+    if total_courses is None:
+        result = execute_read(named_query('count_courses'), {'classes': classes})
+        total_courses = result[0]['total_courses'] if result else 0
+        course_count_cache.set(key, total_courses)
+    return total_courses
+
+# Pages are addressed by ?cursor= (the next_cursor of the previous page), which
+# costs the same at any depth, or by ?page= for clients that jump to a page number
 @courses_bp.route('/courses', methods=['GET'])
 def get_courses():
     page = int(request.args.get('page', 1))
     limit = int(request.args.get('limit', 10))
+    cursor = request.args.get('cursor')
     filter_relation = request.args.get('relation', None)
     user_id = request.args.get('user_id', None)
 
-    count_query = """
-    MATCH (ancestor:Resource {rdfs__label: 'Môn học'})
-    MATCH (n:Resource)-[:rdfs__subClassOf*]->(ancestor)
-    MATCH (instance:Resource)-[:rdf__type]->(n)
-    RETURN count(instance) AS total_courses
-    """
-    total_courses_result = execute_query(count_query, {})
-    total_courses = total_courses_result[0]['total_courses'] if total_courses_result else 0
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid cursor.'}), 400
 
+    classes = course_classes()
+    total_courses = count_courses(classes)
     total_pages = (total_courses + limit - 1) // limit
 
-    query = """
-    MATCH (ancestor:Resource {rdfs__label: 'Môn học'})
-    MATCH (n:Resource)-[:rdfs__subClassOf*]->(ancestor)
-    MATCH (instance:Resource)-[:rdf__type]->(n)
-    OPTIONAL MATCH (instance)-[rel]->(related)
-    OPTIONAL MATCH (uc:UserCourse {user_id: $user_id, course_id: elementId(instance)})
-    WITH instance, collect({relation_id: elementId(rel), relation_type: type(rel), target_id: elementId(related), rdfs__label: related.rdfs__label}) AS all_relations, uc.status AS course_status
-    WHERE ($filter_relation IS NULL OR all(r IN $filter_relation WHERE any(rel IN all_relations WHERE rel.relation_type = r)))
-    RETURN DISTINCT elementId(instance) AS course_id, instance.ns0__hocKy AS ns0__hocKy, instance.ns0__laMonTuChon AS ns0__laMonTuChon, instance.ns0__maMonHoc AS ns0__maMonHoc, instance.ns0__soTinChi AS ns0__soTinChi, instance.rdfs__label AS rdfs__label, [rel IN all_relations WHERE rel.rdfs__label IS NOT NULL] AS relations, course_status
-    ORDER BY instance.ns0__hocKy
-    SKIP $skip
-    LIMIT $limit
-    """
+    query = named_query('list_courses')
     params = {
+        'classes': classes,
+        'after': after,
         'filter_relation': filter_relation.split(',') if filter_relation else None,
         'user_id': user_id,
-        'skip': (page - 1) * limit,
+        'skip': 0 if after else (page - 1) * limit,
         'limit': limit
     }
-    courses = execute_query(query, params)
+    courses = execute_read(query, params)
+    next_cursor = encode_cursor(courses[-1]) if len(courses) == limit else None
+    for course in courses:
+        del course['semester']
 
     return jsonify({
         'total_courses': total_courses,
         'total_pages': total_pages,
-        'courses': courses
+        'courses': courses,
+        'next_cursor': next_cursor
     }), 200
     
 @courses_bp.route('/courses/<course_id>', methods=['GET'])
 def get_course_by_code(course_id):
-    query = """
-    MATCH (course) WHERE elementId(course) = $course_id
-    OPTIONAL MATCH (course)-[rel]->(related)
-    WITH course, collect({relation_id: elementId(rel), relation_type: type(rel), target_id: elementId(related), rdfs__label: related.rdfs__label}) AS relations
-    RETURN elementId(course) AS course_id, course.ns0__hocKy AS ns0__hocKy, course.ns0__laMonTuChon AS ns0__laMonTuChon, course.ns0__maMonHoc AS ns0__maMonHoc, course.ns0__soTinChi AS ns0__soTinChi, course.rdfs__label AS rdfs__label, [rel IN relations WHERE rel.rdfs__label IS NOT NULL] AS relations
-    """
+    query = named_query('course_by_id')
     params = {'course_id': course_id}
-    result = execute_query(query, params)
+    result = execute_read(query, params)
     course = result[0] if result else None
 
     if not course:
@@ -317,68 +293,34 @@ def get_course_by_code(course_id):
 
     return jsonify(course)
 
+# Body: {"moves": {course_id: new ns0__hocKy}}
+@courses_bp.route('/courses/semesters', methods=['PUT'])
+def move_courses():
+    moves = (request.get_json() or {}).get('moves')
+    if not isinstance(moves, dict) or not moves:
+        return jsonify({'error': 'Missing moves.'}), 400
+    invalid = [
+        {'course_id': course_id, 'error': f'Invalid semester {semester!r}.'}
+        for course_id, semester in moves.items()
+        if not isinstance(semester, int) or isinstance(semester, bool)
+    ]
+    if invalid:
+        return jsonify({'error': 'No courses were moved.', 'errors': invalid}), 400
+
+    result, status = write_transaction(move_courses_unit, moves)
+    if status != 200:
+        return jsonify({'error': 'No courses were moved.', 'errors': result}), status
+
+    graph_version.bump(graph_version.COURSES)
+    return jsonify({'message': f'{len(result)} courses moved successfully!', 'courses': result}), 200
+
 @courses_bp.route('/courses/<course_id>', methods=['PUT'])
 def update_course_by_code(course_id):
     data = request.get_json()
-    
-    # Check if the course exists
-    existing_course = check_existing_course(course_id)
-    if not existing_course:
-        return jsonify({'error': f'Course with id {course_id} does not exist.'}), 404
-
-    # Extract the new semester value from the input data
-    new_semester = data.get('ns0__hocKy')
 
-    # If the semester is being updated, check for violations
-    if new_semester is not None:
-        # Check for prior (`ns0__hocTruoc`) relationship violation
-        query_prior = """
-        MATCH (courseA)-[:ns0__hocTruoc]->(courseB)
-        WHERE elementId(courseA) = $course_id
-        RETURN elementId(courseB) AS target_id, courseB.ns0__hocKy AS semesterB, courseB.rdfs__label AS labelB
-        """
-        params = {'course_id': course_id}
-        related_courses_prior = execute_query(query_prior, params)
-
-        # Ensure the updated semester value does not violate prior rules
-        for related_course in related_courses_prior:
-            if new_semester >= related_course['semesterB']:
-                return jsonify({
-                    'error': f'Prior relation violation: The semester of this course ({new_semester}) must be earlier than the semester of course "{related_course["labelB"]}" ({related_course["semesterB"]}).'
-                }), 400
-
-        # Check for parallel (`ns0__songHanh`) relationship violation
-        query_parallel = """
-        MATCH (courseA)-[:ns0__songHanh]->(courseB)
-        WHERE elementId(courseA) = $course_id
-        RETURN elementId(courseB) AS target_id, courseB.ns0__hocKy AS semesterB, courseB.rdfs__label AS labelB
-        """
-        related_courses_parallel = execute_query(query_parallel, params)
-
-        # Ensure the updated semester value matches the semester of related courses in parallel relationships
-        for related_course in related_courses_parallel:
-            if new_semester != related_course['semesterB']:
-                return jsonify({
-                    'error': f'Parallel relation violation: The semester of this course ({new_semester}) must match the semester of course "{related_course["labelB"]}" ({related_course["semesterB"]}).'
-                }), 400
-
-        # Check for prerequisite (`ns0__tienQuyet`) relationship violation
-        query_prerequisite = """
-        MATCH (courseA)-[:ns0__tienQuyet]->(courseB)
-        WHERE elementId(courseA) = $course_id
-        RETURN elementId(courseB) AS target_id, courseB.ns0__hocKy AS semesterB, courseB.rdfs__label AS labelB
-        """
-        related_courses_prerequisite = execute_query(query_prerequisite, params)
-
-        # Ensure that the prerequisite course is in an earlier semester
-        for related_course in related_courses_prerequisite:
-            if new_semester >= related_course['semesterB']:
-                return jsonify({
-                    'error': f'Prerequisite relation violation: The semester of this course ({new_semester}) must be earlier than the semester of course "{related_course["labelB"]}" ({related_course["semesterB"]}).'
-                }), 400
-
-    # Proceed to update the course
-    updated_course = update_course(course_id, data)
+    updated_course, error = write_transaction(update_course_unit, course_id, data)
+    if error:
+        return jsonify({'error': error[0]}), error[1]
     if not updated_course:
         return jsonify({'error': 'Failed to update the course.'}), 500
 
@@ -391,75 +333,28 @@ def update_course_by_code(course_id):
         'rdfs__label': updated_course[0]['course']['rdfs__label']
     }
 
+    graph_version.bump(graph_version.COURSES)
+
+    # Only a label change needs the course to be re-embedded for search
+    if data.get('rdfs__label') is not None:
+        refresh_course_embedding(course_id)
+
     return jsonify({'message': 'Course updated successfully!', 'course': updated_course_data}), 200
 
 @courses_bp.route('/courses/<course_id>', methods=['DELETE'])
 def delete_course(course_id):
-    existing_course = check_existing_course(course_id)
-    if not existing_course:
+    # The course and all of its relationships go in one transaction, or nothing does
+    if not write_transaction(delete_course_unit, course_id):
         return jsonify({'error': f'Course with id {course_id} does not exist.'}), 404
 
-    delete_relationships_query = """
-    MATCH (course)-[rel]->()
-    WHERE elementId(course) = $course_id
-    DELETE rel
-    """
-    params = {'course_id': course_id}
-    execute_query(delete_relationships_query, params)
-
-    delete_inverse_relationships_query = """
-    MATCH ()-[rel]->(course)
-    WHERE elementId(course) = $course_id
-    DELETE rel
-    """
-    execute_query(delete_inverse_relationships_query, params)
-
-    delete_course_query = """
-    MATCH (course) WHERE elementId(course) = $course_id
-    DELETE course
-    """
-    execute_query(delete_course_query, params)
+    graph_version.bump(graph_version.COURSES)
+    course_removed(course_id)
+    remove_course_embedding(course_id)
 
     return jsonify({'message': f'Course with id {course_id} deleted successfully, along with all its relationships.'}), 200
 
 
 @courses_bp.route('/courses/<course_id>/eligible-relations', methods=['GET'])
 def get_eligible_courses_for_relation(course_id):
-    relation_types = ['ns0__tienQuyet', 'ns0__hocTruoc', 'ns0__songHanh']
-    results = {}
-    for relation_type in relation_types:
-        query = f"""
-        MATCH (courseA) WHERE elementId(courseA) = $course_id
-        MATCH (courseB:Resource)
-        WHERE elementId(courseB) <> $course_id
-        """
-
-        if relation_type == 'ns0__tienQuyet' or relation_type == 'ns0__hocTruoc':
-            # Ensure courseA and courseB are in different semesters
-            query += f"""
-            AND courseA.ns0__hocKy > courseB.ns0__hocKy
-            AND NOT (courseB)-[:{relation_type}]->(courseA)
-            """
-        elif relation_type == 'ns0__songHanh':
-            # Ensure courseA and courseB can be taken in the same semester
-            query += f"""
-            AND courseA.ns0__hocKy = courseB.ns0__hocKy
-            """
-
-        query += """
-        RETURN elementId(courseB) AS course_id, courseB.ns0__maMonHoc AS ns0__maMonHoc, courseB.rdfs__label AS rdfs__label
-        """
-        params = {
-            'course_id': course_id
-        }
-        eligible_courses = execute_query(query, params)
-        results[relation_type] = [
-            {
-                'course_id': course['course_id'],
-                'ns0__maMonHoc': course['ns0__maMonHoc'],
-                'rdfs__label': course['rdfs__label']
-            }
-            for course in eligible_courses
-        ]
-
-    return jsonify(results), 200
\ No newline at end of file
+    # All three lists come from one pass over the cached semester buckets
+    return jsonify(curriculum_index().eligible(course_id)), 200
\ No newline at end of file
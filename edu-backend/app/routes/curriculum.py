@@ -0,0 +1,144 @@
+# app/routes/curriculum.py
+import json
+import click
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from flask.cli import with_appcontext
+from app.class_closure import classes_changed
+from app.curriculum import CurriculumError, export_csv, export_json, import_curriculum_unit, parse_document, read_curriculum
+from app.curriculum_index import curriculum_index
+from app.curriculum_plan import curriculum_plan
+from app.queries import SEMESTER_RELATION_TYPES, named_query
+from app.search_index import queue_rebuild_course_embeddings, rebuild_course_embeddings
+from app.utils import stream_read, write_transaction
+
+curriculum_bp = Blueprint('curriculum', __name__)
+
+# The import endpoint queues the embedding rebuild behind the search index writes
+# instead of encoding in the request; the CLI waits for it
+def run_import(courses, pairs, dry_run, background=False):
+    report, changed_codes = write_transaction(import_curriculum_unit, courses, pairs, dry_run)
+    # Imported courses may be typed with classes the closure has not seen yet
+    if not dry_run:
+        classes_changed()
+    # New and relabelled courses get search embeddings; unchanged labels are not re-encoded
+    if changed_codes and not dry_run:
+        (queue_rebuild_course_embeddings if background else rebuild_course_embeddings)()
+    return report
+
+# Accepts a JSON body, a CSV body (Content-Type text/csv) or an uploaded
+# .json/.csv file in the "file" field; ?dry_run=true only validates
+@curriculum_bp.route('/curriculum/import', methods=['POST'])
+def import_curriculum():
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true'
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            courses, pairs = read_curriculum(upload.stream, 'csv' if upload.filename.lower().endswith('.csv') else 'json')
+        elif request.mimetype == 'text/csv':
+            courses, pairs = read_curriculum(request.stream, 'csv')
+        else:
+            courses, pairs = parse_document(request.get_json())
+        report = run_import(courses, pairs, dry_run, background=True)
+    except CurriculumError as e:
+        return jsonify({'error': 'Curriculum was not imported.', 'errors': e.errors}), 400
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'error': f'Could not read the curriculum: {e}'}), 400
+
+    return jsonify({'message': 'Curriculum validated.' if dry_run else 'Curriculum imported successfully!', **report}), 200
+
+# Streamed as it is read, so the export never holds the whole curriculum in memory
+@curriculum_bp.route('/curriculum/export', methods=['GET'])
+def export_curriculum():
+    fmt = request.args.get('format', 'json').lower()
+    if fmt not in ('json', 'csv'):
+        return jsonify({'error': f'Unsupported format {fmt}.'}), 400
+
+    records = stream_read(named_query('export_courses'))
+    if fmt == 'csv':
+        body, mimetype = export_csv(records), 'text/csv'
+    else:
+        body, mimetype = export_json(records), 'application/json'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=curriculum.{fmt}'
+    })
+
+# Reads {moves: {course_id: semester}, added: [{course_id, relation_type, target_id}],
+# removed: [relation_id]}; returns (moves, added, removed, errors)
+def parse_change_set(data, index):
+    errors = []
+    moves = {}
+    for course_id, semester in (data.get('moves') or {}).items():
+        if course_id not in index.courses:
+            errors.append({'course_id': course_id, 'error': f'Course with id {course_id} does not exist.'})
+        elif not isinstance(semester, int) or isinstance(semester, bool):
+            errors.append({'course_id': course_id, 'error': f'Invalid semester {semester!r}.'})
+        else:
+            moves[course_id] = semester
+    added = []
+    for relation in data.get('added') or []:
+        relation_type = relation.get('relation_type')
+        course_id = relation.get('course_id')
+        target_id = relation.get('target_id')
+        if relation_type not in SEMESTER_RELATION_TYPES:
+            errors.append({**relation, 'error': f'Unknown relation type {relation_type}.'})
+        elif course_id not in index.courses or target_id not in index.courses:
+            errors.append({**relation, 'error': f'Course with id {course_id if course_id not in index.courses else target_id} does not exist.'})
+        else:
+            added.append((course_id, relation_type, target_id))
+    removed = []
+    for relation_id in data.get('removed') or []:
+        if relation_id not in index.relations:
+            errors.append({'relation_id': relation_id, 'error': f'Relation with id {relation_id} does not exist.'})
+        else:
+            removed.append(relation_id)
+    return moves, added, removed, errors
+
+# GET checks every semester relation of the programme; POST checks a proposed
+# change set, reporting the relations it adds or whose courses it moves
+@curriculum_bp.route('/curriculum/validate', methods=['GET', 'POST'])
+def validate_programme():
+    index = curriculum_index()
+    if request.method == 'GET':
+        errors = index.constraints.check(everything=True)
+    else:
+        moves, added, removed, errors = parse_change_set(request.get_json() or {}, index)
+        if errors:
+            return jsonify({'error': 'Invalid change set.', 'errors': errors}), 400
+        errors = index.constraints.check(moves, added, removed)
+    return jsonify({
+        'valid': not errors,
+        'courses': len(index.courses),
+        'relations': len(index.relations),
+        'errors': errors
+    }), 200
+
+# Topological order, earliest feasible semester per course, the critical path and
+# any prerequisite cycles, from the in-process prerequisite DAG
+@curriculum_bp.route('/curriculum/plan', methods=['GET'])
+def get_curriculum_plan():
+    return jsonify(curriculum_plan().result()), 200
+
+
+@click.command('import-curriculum')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--dry-run', is_flag=True, help='Validate without writing anything.')
+@with_appcontext
+def import_curriculum_command(path, dry_run):
+    try:
+        with open(path, 'rb') as f:
+            courses, pairs = read_curriculum(f, 'csv' if path.lower().endswith('.csv') else 'json')
+        report = run_import(courses, pairs, dry_run)
+    except CurriculumError as e:
+        for error in e.errors:
+            click.echo(json.dumps(error, ensure_ascii=False), err=True)
+        raise click.ClickException('Curriculum was not imported.')
+    click.echo(json.dumps(report))
+
+@click.command('export-curriculum')
+@click.option('--format', 'fmt', type=click.Choice(['json', 'csv']), default='json')
+@click.option('--output', '-o', type=click.File('w', encoding='utf-8'), default='-')
+@with_appcontext
+def export_curriculum_command(fmt, output):
+    records = stream_read(named_query('export_courses'))
+    for chunk in (export_csv(records) if fmt == 'csv' else export_json(records)):
+        output.write(chunk)
@@ -0,0 +1,29 @@
+# app/routes/health.py
+from flask import Blueprint, jsonify
+from app.config import Config
+from app.embedding_service import encoder_metrics
+from app.queries import plan_cache_state
+from app.schema import schema_state
+from app.search_cache import cache_metrics
+from app.search_index import course_store, search_state, search_ready
+
+health_bp = Blueprint('health', __name__)
+
+@health_bp.route('/health/ready', methods=['GET'])
+def ready():
+    # CRUD routes are always served; search is ready once PhoBERT and the course embeddings are loaded
+    search = {
+        'enabled': Config.SEARCH_ENABLED,
+        'ready': Config.SEARCH_ENABLED and search_ready(),
+        'warming_up': search_state['warming_up'],
+        'indexed_courses': len(course_store.entries),
+        'error': search_state['error']
+    }
+    ready = not Config.SEARCH_ENABLED or search['ready']
+    return jsonify({'ready': ready, 'search': search}), 200 if ready else 503
+
+@health_bp.route('/health/metrics', methods=['GET'])
+def metrics():
+    # Batch size / queue wait counters of the query coalescer(s), search cache hit rates
+    # and progress of the query plan warm-up and schema bootstrap
+    return jsonify({'encoder': encoder_metrics(), 'search_cache': cache_metrics(), 'plan_cache': plan_cache_state, 'schema': schema_state}), 200
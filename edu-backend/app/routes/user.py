@@ -1,6 +1,7 @@
 # app/routes/user.py
 from flask import Blueprint, jsonify, request
-from app.utils import execute_query
+from app.queries import named_query
+from app.utils import execute_query, execute_read
 import bcrypt
 
 user_bp = Blueprint('user', __name__)
@@ -21,7 +22,7 @@ def add_user():
         return jsonify({'message': 'Username and password are required'}), 400
 
     # Check if username, student_id, or email already exists
-    query = "MATCH (u:User) WHERE u.username = $username OR u.student_id = $student_id OR u.email = $email RETURN u"
+    query = named_query('users_by_identity')
     params = {'username': username, 'student_id': student_id, 'email': email}
     result = execute_query(query, params)
 
@@ -64,7 +65,7 @@ def update_user(user_id):
 
     # Check if the new student_id or email already exists for another user
     if new_student_id or new_email:
-        query = "MATCH (u:User) WHERE (u.student_id = $student_id OR u.email = $email) AND elementId(u) <> $user_id RETURN u"
+        query = named_query('other_users_by_identity')
         params.update({'student_id': new_student_id, 'email': new_email})
         existing_user = execute_query(query, params)
         if existing_user:
@@ -113,7 +114,7 @@ def get_user(user_id):
     # Check if the user exists
     query = "MATCH (u:User) WHERE elementId(u) = $user_id RETURN u"
     params = {'user_id': user_id}
-    result = execute_query(query, params)
+    result = execute_read(query, params)
 
     if not result:
         return jsonify({'message': f'User with id {user_id} does not exist'}), 404
@@ -135,7 +136,7 @@ def get_user(user_id):
 @user_bp.route('/user/get-all-users', methods=['GET'])
 def get_all_users():
     query = "MATCH (u:User) RETURN elementId(u) AS user_id, u.username AS username, u.role AS role, u.name AS name, u.birth_date AS birth_date, u.student_id AS student_id, u.email AS email"
-    result = execute_query(query)
+    result = execute_read(query)
 
     users = [
         {
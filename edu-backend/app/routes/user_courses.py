@@ -1,13 +1,12 @@
 # app/routes/user_courses.py
 from flask import Blueprint, jsonify, request
-from app.utils import execute_query
+from app.course_bitsets import course_bitsets
+from app.queries import named_query
+from app.utils import execute_query, execute_read
 
 # Utility functions
 def check_existing_user_course(user_id, course_id):
-    query = """
-    MATCH (uc:UserCourse) WHERE uc.user_id = $user_id AND uc.course_id = $course_id
-    RETURN uc
-    """
+    query = named_query('user_course_exists')
     params = {
         'user_id': user_id,
         'course_id': course_id
@@ -15,12 +14,7 @@ def check_existing_user_course(user_id, course_id):
     return execute_query(query, params)
 
 def check_prerequisite_completion(user_id, course_id):
-    query = """
-    MATCH (courseA)<-[:ns0__tienQuyet]-(courseB)
-    MATCH (uc:UserCourse {user_id: $user_id, course_id: elementId(courseA)})
-    WHERE elementId(courseB) = $course_id AND uc.status <> 'hoàn thành'
-    RETURN uc
-    """
+    query = named_query('incomplete_prerequisites')
     params = {
         'user_id': user_id,
         'course_id': course_id
@@ -28,14 +22,7 @@ def check_prerequisite_completion(user_id, course_id):
     return execute_query(query, params)
 
 def create_user_course(data):
-    query = """
-    CREATE (uc:UserCourse {
-        user_id: $user_id,
-        course_id: $course_id,
-        status: $status
-    })
-    RETURN elementId(uc) AS user_course_id, uc
-    """
+    query = named_query('create_user_course')
     params = {
         'user_id': data.get('user_id'),
         'course_id': data.get('course_id'),
@@ -44,17 +31,17 @@ def create_user_course(data):
     return execute_query(query, params)
 
 def update_user_course(user_course_id, data):
-    query = """
-    MATCH (uc:UserCourse) WHERE elementId(uc) = $user_course_id
-    SET uc.status = coalesce($status, uc.status)
-    RETURN elementId(uc) AS user_course_id, uc
-    """
+    query = named_query('update_user_course')
     params = {
         'user_course_id': user_course_id,
         'status': data.get('status')
     }
     return execute_query(query, params)
 
+# {user_id: {completed, taken}} of the given students, with one query
+def user_progress(user_ids):
+    return {row['user_id']: row for row in execute_read(named_query('user_progress'), {'user_ids': user_ids})}
+
 # Blueprint setup
 user_courses_bp = Blueprint('user_courses', __name__)
 
@@ -89,10 +76,7 @@ def update_user_course_by_id(user_course_id):
 
     # Check for prerequisite completion if updating to 'hoàn thành'
     if status == 'hoàn thành':
-        user_course_query = """
-        MATCH (uc:UserCourse) WHERE elementId(uc) = $user_course_id
-        RETURN uc.user_id AS user_id, uc.course_id AS course_id
-        """
+        user_course_query = named_query('user_course_ids')
         user_course_params = {'user_course_id': user_course_id}
         user_course_result = execute_query(user_course_query, user_course_params)
         if not user_course_result:
@@ -120,12 +104,9 @@ def update_user_course_by_id(user_course_id):
 
 @user_courses_bp.route('/user-courses/<user_course_id>', methods=['GET'])
 def get_user_course_by_id(user_course_id):
-    query = """
-    MATCH (uc:UserCourse) WHERE elementId(uc) = $user_course_id
-    RETURN elementId(uc) AS user_course_id, uc.user_id AS user_id, uc.course_id AS course_id, uc.status AS status
-    """
+    query = named_query('user_course_by_id')
     params = {'user_course_id': user_course_id}
-    result = execute_query(query, params)
+    result = execute_read(query, params)
     user_course = result[0] if result else None
 
     if not user_course:
@@ -135,11 +116,8 @@ def get_user_course_by_id(user_course_id):
 
 @user_courses_bp.route('/user-courses', methods=['GET'])
 def get_all_user_courses():
-    query = """
-    MATCH (uc:UserCourse)
-    RETURN elementId(uc) AS user_course_id, uc.user_id AS user_id, uc.course_id AS course_id, uc.status AS status
-    """
-    result = execute_query(query, {})
+    query = named_query('all_user_courses')
+    result = execute_read(query, {})
     user_courses = [
         {
             'user_course_id': uc['user_course_id'],
@@ -153,12 +131,34 @@ def get_all_user_courses():
 
 @user_courses_bp.route('/user-courses/<user_course_id>', methods=['DELETE'])
 def delete_user_course(user_course_id):
-    query = """
-    MATCH (uc:UserCourse) WHERE elementId(uc) = $user_course_id
-    DELETE uc
-    """
+    query = named_query('delete_user_course')
     params = {'user_course_id': user_course_id}
     execute_query(query, params)
 
     return jsonify({'message': f'UserCourse with id {user_course_id} deleted successfully.'}), 200
 
+# Every course the student can take next: not completed or in progress, with all
+# of its tienQuyet prerequisites completed
+@user_courses_bp.route('/user-courses/next/<user_id>', methods=['GET'])
+def get_next_courses(user_id):
+    bitsets = course_bitsets()
+    eligible = bitsets.next_courses([user_id], user_progress([user_id]))
+    return jsonify({'user_id': user_id, 'courses': bitsets.course_list(eligible[0])}), 200
+
+# The same for a whole cohort in one call: {"user_ids": [...]}. Each course is
+# listed once under "courses"; students map to course ids
+@user_courses_bp.route('/user-courses/next', methods=['POST'])
+def get_next_courses_batch():
+    user_ids = (request.get_json() or {}).get('user_ids')
+    if not isinstance(user_ids, list) or not all(isinstance(user_id, str) for user_id in user_ids):
+        return jsonify({'error': 'user_ids must be a list of user ids.'}), 400
+    user_ids = list(dict.fromkeys(user_ids))
+
+    bitsets = course_bitsets()
+    eligible = bitsets.next_courses(user_ids, user_progress(user_ids))
+    students = {user_id: [course['course_id'] for course in bitsets.course_list(row)] for user_id, row in zip(user_ids, eligible)}
+    course_ids = {course_id for ids in students.values() for course_id in ids}
+    return jsonify({
+        'courses': {course_id: bitsets.courses[course_id] for course_id in sorted(course_ids)},
+        'students': students
+    }), 200
@@ -0,0 +1,110 @@
+# app/schema.py
+# Indexes and uniqueness constraints for the properties the routes look nodes up
+# by. Every statement is IF NOT EXISTS, so the bootstrap can run on each start
+# (SCHEMA_BOOTSTRAP) or by hand with `flask bootstrap-schema`.
+import json
+import threading
+import click
+from flask.cli import with_appcontext
+from neo4j.exceptions import Neo4jError
+from app.queries import WARM_UP_PARAMS, named_query
+from app.utils import execute_write, read_transaction
+
+# (name, label, properties); unique ones become constraints
+CONSTRAINTS = [
+    ('n10s_unique_uri', 'Resource', ('uri',)),
+    ('user_username_unique', 'User', ('username',)),
+    ('user_email_unique', 'User', ('email',)),
+    ('user_student_id_unique', 'User', ('student_id',)),
+]
+INDEXES = [
+    ('user_course_user_course', 'UserCourse', ('user_id', 'course_id')),
+    ('resource_label', 'Resource', ('rdfs__label',)),
+    ('resource_course_code', 'Resource', ('ns0__maMonHoc',)),
+]
+
+def _properties(variable, properties):
+    keys = ', '.join(f'{variable}.{prop}' for prop in properties)
+    return f'({keys})' if len(properties) > 1 else keys
+
+def constraint_statement(name, label, properties):
+    return f'CREATE CONSTRAINT {name} IF NOT EXISTS FOR (n:{label}) REQUIRE {_properties("n", properties)} IS UNIQUE'
+
+def index_statement(name, label, properties):
+    return f'CREATE INDEX {name} IF NOT EXISTS FOR (n:{label}) ON ({", ".join(f"n.{prop}" for prop in properties)})'
+
+# A uniqueness constraint cannot be created while duplicates exist; the property
+# still gets a range index and the duplicates are reported for cleanup
+def bootstrap_schema():
+    report = {'constraints': [], 'indexes': [], 'errors': []}
+    for name, label, properties in CONSTRAINTS:
+        try:
+            execute_write(constraint_statement(name, label, properties))
+            report['constraints'].append(name)
+        except Neo4jError as e:
+            report['errors'].append({'name': name, 'error': e.message})
+            fallback = f'{name.removesuffix("_unique")}_index'
+            execute_write(index_statement(fallback, label, properties))
+            report['indexes'].append(fallback)
+    for name, label, properties in INDEXES:
+        execute_write(index_statement(name, label, properties))
+        report['indexes'].append(name)
+    # New indexes are populated in the background; wait so the EXPLAIN check sees them
+    execute_write('CALL db.awaitIndexes($timeout)', {'timeout': 300})
+    return report
+
+# The lookups the indexes are for, by their name in app/queries.py
+HOT_QUERIES = [
+    'user_by_username', 'login_user', 'users_by_identity', 'other_users_by_identity',
+    'user_course_exists', 'incomplete_prerequisites', 'user_progress', 'count_courses', 'list_courses',
+    'search_courses', 'courses_by_code', 'merge_courses'
+]
+
+SEEK_OPERATORS = ('NodeIndexSeek', 'NodeUniqueIndexSeek', 'NodeIndexSeekByRange', 'NodeUniqueIndexSeekByRange', 'MultiNodeIndexSeek', 'NodeIndexContainsScan', 'NodeIndexEndsWithScan')
+
+def _operators(plan):
+    operators = [plan['operatorType'].split('@')[0]]
+    for child in plan.get('children', []):
+        operators.extend(_operators(child))
+    return operators
+
+def _explain(tx, query):
+    return tx.run(f'EXPLAIN {query}', WARM_UP_PARAMS).consume().plan
+
+# Which hot queries are planned with an index seek and which still scan a label
+def explain_hot_queries():
+    report = []
+    for name in HOT_QUERIES:
+        operators = _operators(read_transaction(_explain, named_query(name)))
+        seeks = sorted({operator for operator in operators if operator.startswith(SEEK_OPERATORS)})
+        report.append({
+            'query': name,
+            'index_seek': bool(seeks),
+            'seeks': seeks,
+            'label_scans': operators.count('NodeByLabelScan'),
+        })
+    return report
+
+# Reported by /health/metrics
+schema_state = {'bootstrapped': False, 'report': None, 'index_usage': None, 'error': None}
+
+def _bootstrap():
+    try:
+        schema_state['report'] = bootstrap_schema()
+        schema_state['bootstrapped'] = True
+        schema_state['index_usage'] = explain_hot_queries()
+    except Exception as e:
+        schema_state['error'] = str(e)
+
+def start_schema_bootstrap():
+    threading.Thread(target=_bootstrap, name='schema-bootstrap', daemon=True).start()
+
+
+@click.command('bootstrap-schema')
+@click.option('--explain/--no-explain', default=True, help='Report which hot queries use index seeks.')
+@with_appcontext
+def bootstrap_schema_command(explain):
+    click.echo(json.dumps(bootstrap_schema(), ensure_ascii=False))
+    if explain:
+        for row in explain_hot_queries():
+            click.echo(json.dumps(row))
@@ -0,0 +1,71 @@
+# app/search_cache.py
+import threading
+import time
+from collections import OrderedDict
+from app.config import Config
+
+_MISSING = object()
+
+
+# Bounded LRU cache whose entries also expire `ttl` seconds after being set
+class LRUCache:
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING and item[1] < time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                item = _MISSING
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+# Normalized query -> embedding; the model output never goes stale, only the TTL bounds it
+query_embedding_cache = LRUCache(Config.SEARCH_CACHE_SIZE, Config.SEARCH_EMBEDDING_CACHE_TTL)
+
+# (normalized query, course label version) -> top-k response
+result_cache = LRUCache(Config.SEARCH_CACHE_SIZE, Config.SEARCH_RESULT_CACHE_TTL)
+
+def cache_metrics():
+    return {'query_embeddings': query_embedding_cache.metrics(), 'results': result_cache.metrics()}
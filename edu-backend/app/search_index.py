@@ -0,0 +1,342 @@
+# app/search_index.py
+import fcntl
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from app import graph_version
+from app.config import Config
+from app.embedding_matrix import MatrixIndex
+from app.lexical_index import LexicalIndex
+from app.queries import named_query
+from app.embedding_service import encode_texts, encoder_ready, warm_up_encoder
+from app.text_processing import preprocess_text
+from app.utils import execute_read
+
+logger = logging.getLogger(__name__)
+
+# The encoder model and mode are part of the key, so switching either re-embeds every course
+def label_hash(label):
+    key = f'{Config.ENCODER_MODEL_NAME}:{Config.ENCODER_MODE}\n{preprocess_text(label or "")}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# FAISS is only imported when that backend is selected
+def create_vector_index():
+    if Config.SEARCH_VECTOR_BACKEND == 'matrix':
+        return MatrixIndex(Config.SEARCH_PCA_DIMS)
+    from app.vector_index import VectorIndex
+    return VectorIndex()
+
+
+# Course metadata keyed by elementId, each stored with the hash of the normalized
+# label its embedding was computed from so unchanged labels are never re-encoded.
+# The full-precision embeddings only live in the .npz on disk; they are read back
+# when the vector index is (re)built, never kept per entry in the workers.
+# Every worker shares the files, so writes to them happen under an exclusive
+# lock on {path}.lock, after reloading whatever another worker saved first
+class CourseEmbeddingStore:
+    def __init__(self, path, index_path):
+        self.path = path
+        self.index_path = index_path
+        self.entries = {}
+        self.vectors = create_vector_index()
+        self.lexical = LexicalIndex()
+        self.lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self.loaded = False
+        self._stamp = None
+        self._file_lock_depth = 0
+
+    def _file_stamp(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    # Serializes writers, and load(), across worker processes; taken after self.lock.
+    # Re-entrant within the thread holding self.lock, so refresh() can reload under it
+    @contextmanager
+    def _file_lock(self):
+        if not self.path or self._file_lock_depth:
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(f'{self.path}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._file_lock_depth += 1
+            try:
+                yield
+            finally:
+                self._file_lock_depth -= 1
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_embeddings(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        with np.load(self.path) as data:
+            return dict(zip(data['ids'].tolist(), data['embeddings']))
+
+    # Under the file lock, so the .npz and the vector index are read as one saved pair,
+    # and a vector index rebuilt here is saved without racing a writer
+    def load(self):
+        with self.lock, self._file_lock():
+            if not self.path or not os.path.exists(self.path):
+                return False
+            with np.load(self.path) as data:
+                self.entries = {
+                    element_id: {'code': code or None, 'courseName': name, 'hash': digest}
+                    for element_id, code, name, digest in zip(
+                        data['ids'].tolist(), data['codes'].tolist(), data['names'].tolist(), data['hashes'].tolist())
+                }
+                self._stamp = self._file_stamp()
+                # Start warm from the saved vector index unless it is out of step with the entries
+                if not (self.index_path and self.vectors.load(self.index_path)) or set(self.vectors.keys()) != set(self.entries):
+                    self._rebuild_vectors(dict(zip(data['ids'].tolist(), data['embeddings'])))
+                    if self.index_path:
+                        self.vectors.save(self.index_path)
+            self._rebuild_lexical()
+            self.loaded = True
+            graph_version.bump(graph_version.COURSE_LABELS)
+            return True
+
+    # Callers hold _file_lock(). The vector index is written first, then the .npz
+    # goes to a unique temporary file next to it and is swapped in, so its stamp
+    # only changes once both files are complete
+    def save(self, embeddings):
+        with self.lock:
+            if not self.path:
+                return
+            if self.index_path:
+                self.vectors.save(self.index_path)
+            ids = list(self.entries)
+            entries = [self.entries[i] for i in ids]
+            fd, tmp_path = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(os.path.abspath(self.path)))
+            try:
+                with os.fdopen(fd, 'wb') as tmp_file:
+                    np.savez(
+                        tmp_file,
+                        ids=np.array(ids, dtype=str),
+                        codes=np.array([entry['code'] or '' for entry in entries], dtype=str),
+                        names=np.array([entry['courseName'] or '' for entry in entries], dtype=str),
+                        hashes=np.array([entry['hash'] for entry in entries], dtype=str),
+                        embeddings=np.array([embeddings[i] for i in ids], dtype='float32')
+                    )
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+            self._stamp = self._file_stamp()
+
+    def _rebuild_vectors(self, embeddings):
+        self.vectors.clear()
+        ids = list(self.entries)
+        if ids:
+            self.vectors.add(ids, np.stack([embeddings[i] for i in ids]))
+
+    def _rebuild_lexical(self):
+        self.lexical.clear()
+        for element_id, entry in self.entries.items():
+            self.lexical.add(element_id, entry['courseName'], entry['code'])
+
+    # Pick up entries written by another worker since we last loaded
+    def reload_if_changed(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        if self._file_stamp() != self._stamp:
+            self.load()
+
+    def _entry(self, result):
+        return {
+            'code': result['code'],
+            'courseName': result['courseName'],
+            'hash': label_hash(result['courseName'])
+        }
+
+    # Only courses that are new or whose normalized label changed are encoded,
+    # all of them together in length-bucketed batches
+    def _encode_changed(self, results, saved):
+        embeddings = {}
+        changed = []
+        for result in results:
+            previous = self.entries.get(result['elementId'])
+            if previous is not None and previous['hash'] == label_hash(result['courseName']) and result['elementId'] in saved:
+                embeddings[result['elementId']] = saved[result['elementId']]
+            else:
+                changed.append(result)
+        if changed:
+            encoded = encode_texts([preprocess_text(result['courseName'] or '') for result in changed])
+            encoded = encoded / np.maximum(np.linalg.norm(encoded, axis=1, keepdims=True), 1e-12)
+            for result, embedding in zip(changed, encoded):
+                embeddings[result['elementId']] = embedding
+        return embeddings, len(changed)
+
+    # Courses are encoded before self.lock is taken, so searches and exact-code
+    # lookups are not held up by a build. Takes the search_courses rows when the
+    # caller has already read them
+    def build(self, results=None):
+        if results is None:
+            results = execute_read(named_query('search_courses'))
+        embeddings, _ = self._encode_changed(results, self._read_embeddings())
+        with self.lock, self._file_lock():
+            self.entries = {result['elementId']: self._entry(result) for result in results}
+            self._rebuild_vectors(embeddings)
+            self._rebuild_lexical()
+            self.loaded = True
+            self.save(embeddings)
+            graph_version.bump(graph_version.COURSE_LABELS)
+        return len(self.entries)
+
+    # Enough for exact-code lookups without the model: the saved index, or else
+    # the courses read from the graph into the lexical index until a build
+    def ensure_lexical(self):
+        with self.lock:
+            if self.loaded or self.load() or len(self.lexical):
+                return
+            self.entries = {result['elementId']: self._entry(result) for result in execute_read(named_query('search_courses'))}
+            self._rebuild_lexical()
+
+    # Serialized so the warm-up and a deferred write never both build
+    def ensure_built(self):
+        with self._build_lock:
+            if not self.loaded and not self.load():
+                self.build()
+
+    # refresh() and remove() merge one course into the entries another worker
+    # may have saved since we loaded. They do nothing before the store is loaded:
+    # saving then would replace the .npz with just that course. refresh() takes
+    # the course's search_course rows when the caller has already read them
+    def refresh(self, element_id, result=None):
+        if result is None:
+            result = execute_read(named_query('search_course'), {'course_id': element_id})
+        if not result:
+            self.remove(element_id)
+            return
+        with self.lock, self._file_lock():
+            if not self.loaded:
+                return
+            self.reload_if_changed()
+            previous = self.entries.get(element_id)
+            saved = self._read_embeddings()
+            embeddings, changed = self._encode_changed(result, saved)
+            if not changed and previous is not None and previous['code'] == result[0]['code']:
+                return
+            self.entries[element_id] = self._entry(result[0])
+            saved[element_id] = embeddings[element_id]
+            self.vectors.update(element_id, embeddings[element_id])
+            self.lexical.add(element_id, result[0]['courseName'], result[0]['code'])
+            self.save(saved)
+            graph_version.bump(graph_version.COURSE_LABELS)
+
+    def remove(self, element_id):
+        with self.lock, self._file_lock():
+            if not self.loaded:
+                return
+            self.reload_if_changed()
+            if self.entries.pop(element_id, None) is not None:
+                self.vectors.remove([element_id])
+                self.lexical.remove(element_id)
+                self.save(self._read_embeddings())
+                graph_version.bump(graph_version.COURSE_LABELS)
+
+    # Top-k courses by cosine similarity as (elementId, entry, similarity)
+    def search(self, query_embedding, top_k=10):
+        with self.lock:
+            return [(element_id, self.entries[element_id], score) for element_id, score in self.vectors.search(query_embedding, top_k)]
+
+    def score(self, query_embedding, element_ids):
+        with self.lock:
+            return [(element_id, self.entries[element_id], score) for element_id, score in self.vectors.score(query_embedding, element_ids)]
+
+
+course_store = CourseEmbeddingStore(
+    Config.SEARCH_INDEX_PATH,
+    Config.SEARCH_MATRIX_PATH if Config.SEARCH_VECTOR_BACKEND == 'matrix' else Config.SEARCH_FAISS_PATH
+)
+
+# Search readiness, reported by /health/ready
+search_state = {'warming_up': False, 'error': None}
+
+def warm_up():
+    search_state['warming_up'] = True
+    try:
+        warm_up_encoder()
+        course_store.ensure_built()
+        search_state['error'] = None
+    except Exception as e:
+        search_state['error'] = str(e)
+    finally:
+        search_state['warming_up'] = False
+
+def start_warm_up():
+    threading.Thread(target=warm_up, name='search-warm-up', daemon=True).start()
+
+def search_ready():
+    return course_store.loaded and encoder_ready()
+
+# Course writes are applied on one background thread, in order, so the response
+# never waits for the encoder (or its first load) and never fails because of it.
+# The course itself is read in the request, on the session that wrote it
+_write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='search-write')
+
+def _apply_write(write, *args):
+    try:
+        course_store.ensure_built()
+        write(*args)
+    except Exception:
+        logger.exception('Could not update the search index for course %s', args[0])
+
+# Course write paths call these; they do nothing when search is disabled
+def refresh_course_embedding(element_id):
+    if not Config.SEARCH_ENABLED:
+        return
+    try:
+        result = execute_read(named_query('search_course'), {'course_id': element_id})
+    except Exception:
+        logger.exception('Could not read course %s for the search index', element_id)
+        return
+    _write_executor.submit(_apply_write, course_store.refresh, element_id, result)
+
+def remove_course_embedding(element_id):
+    if Config.SEARCH_ENABLED:
+        _write_executor.submit(_apply_write, course_store.remove, element_id)
+
+# After bulk writes; only new or relabelled courses are re-encoded
+def rebuild_course_embeddings():
+    if Config.SEARCH_ENABLED:
+        course_store.build()
+
+def _apply_rebuild(results):
+    try:
+        # A warm-up that has not loaded the store yet then finds it built
+        with course_store._build_lock:
+            course_store.build(results)
+    except Exception:
+        logger.exception('Could not rebuild the search index')
+
+# The same from a request: the courses are read here, so the rebuild sees the
+# request's writes, and encoded on the search write thread
+def queue_rebuild_course_embeddings():
+    if not Config.SEARCH_ENABLED:
+        return
+    try:
+        results = execute_read(named_query('search_courses'))
+    except Exception:
+        logger.exception('Could not read the courses for the search index')
+        return
+    _write_executor.submit(_apply_rebuild, results)
+
+
+@click.command('build-search-index')
+@with_appcontext
+def build_search_index_command():
+    count = course_store.build()
+    click.echo(f'Indexed {count} courses into {course_store.path}.')
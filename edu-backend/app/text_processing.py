@@ -0,0 +1,22 @@
+# app/text_processing.py
+import re
+
+# Bảng từ điển để chuyển đổi viết tắt thành dạng đầy đủ
+abbreviation_dict = {
+    "PBL": "Project Based Learning",
+    "ATTT": "An toàn thông tin",
+    "HTTT": "Hệ thống thông tin",
+    "CNPM": "Công nghệ phần mềm"
+}
+
+# Hàm để mở rộng các từ viết tắt trong văn bản
+def expand_abbreviations(text, abbreviation_dict):
+    words = text.split()
+    expanded_words = [abbreviation_dict.get(word.upper(), word) for word in words]
+    return " ".join(expanded_words)
+
+# Hàm tiền xử lý văn bản để mở rộng các từ viết tắt và chuẩn hóa văn bản
+def preprocess_text(text):
+    text = text.lower()  # Chuyển thành chữ thường
+    text = re.sub(r'[^\w\s]', '', text)  # Loại bỏ dấu câu
+    return expand_abbreviations(text, abbreviation_dict)  # Mở rộng từ viết tắt
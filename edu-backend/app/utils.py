@@ -1,14 +1,101 @@
-from neo4j import GraphDatabase
+from flask import g, has_app_context, has_request_context, request
+from neo4j import READ_ACCESS, Bookmarks, GraphDatabase
 from app.config import Config
 
 # Thiết lập kết nối đến Neo4j
 db_uri = Config.NEO4J_URI
 db_user = Config.NEO4J_USER
 db_password = Config.NEO4J_PASSWORD
-driver = GraphDatabase.driver(db_uri, auth=(db_user, db_password))
+
+# Everything below talks to the graph through this driver: Neo4j, or the
+# in-memory graph of app/memory_graph.py with the same session API
+def create_driver():
+    if Config.GRAPH_BACKEND == 'memory':
+        from app.memory_graph import MemoryDriver
+        return MemoryDriver(Config.MEMORY_GRAPH_SOURCE, Config.MEMORY_GRAPH_LOG)
+    return GraphDatabase.driver(
+        db_uri,
+        auth=(db_user, db_password),
+        max_connection_pool_size=Config.NEO4J_MAX_POOL_SIZE,
+        connection_acquisition_timeout=Config.NEO4J_ACQUISITION_TIMEOUT,
+        max_connection_lifetime=Config.NEO4J_MAX_CONNECTION_LIFETIME,
+        max_transaction_retry_time=Config.NEO4J_MAX_RETRY_TIME
+    )
+
+driver = create_driver()
 session_config = {'database': Config.NEO4J_DATABASE}
 
-def execute_query(query, params=None):
+# Causal consistency: a response to a write carries the bookmark of that write, and
+# a client that sends it back gets a session that waits for the write to be visible
+# on whichever cluster member serves its reads
+BOOKMARK_HEADER = 'X-Neo4j-Bookmark'
+
+def request_bookmarks():
+    if not has_request_context():
+        return None
+    values = [value.strip() for header in request.headers.getlist(BOOKMARK_HEADER) for value in header.split(',') if value.strip()]
+    return Bookmarks.from_raw_values(values) if values else None
+
+# One session per request, shared by every statement of that request and
+# closed on app context teardown (see create_app)
+def get_session():
+    if 'neo4j_session' not in g:
+        g.neo4j_session = driver.session(bookmarks=request_bookmarks(), **session_config)
+    return g.neo4j_session
+
+def close_session(exception=None):
+    g.pop('neo4j_wrote', None)
+    session = g.pop('neo4j_session', None)
+    if session is not None:
+        session.close()
+
+def attach_bookmark(response):
+    session = g.get('neo4j_session')
+    if session is not None and g.get('neo4j_wrote'):
+        values = session.last_bookmarks().raw_values
+        if values:
+            response.headers[BOOKMARK_HEADER] = ','.join(sorted(values))
+    return response
+
+def run_query(tx, query, params=None):
+    return [record.data() for record in tx.run(query, params)]
+
+def _run_transaction(access, work, *args, **kwargs):
+    if has_app_context():
+        return getattr(get_session(), access)(work, *args, **kwargs)
+    # Background threads (search warm-up) have no request to share a session with
     with driver.session(**session_config) as session:
-        result = session.run(query, params)
-        return [record.data() for record in result]
\ No newline at end of file
+        return getattr(session, access)(work, *args, **kwargs)
+
+# Run work(tx, *args) as one managed write transaction: committed when it returns,
+# rolled back if it raises, and retried on transient errors (deadlocks, leader
+# switches) for up to NEO4J_MAX_RETRY_TIME, so work must only touch the database via tx
+def write_transaction(work, *args, **kwargs):
+    if has_app_context():
+        g.neo4j_wrote = True
+    return _run_transaction('execute_write', work, *args, **kwargs)
+
+# Same for read-only work; on a cluster it is routed to followers and read replicas
+def read_transaction(work, *args, **kwargs):
+    return _run_transaction('execute_read', work, *args, **kwargs)
+
+def execute_write(query, params=None, tx=None):
+    if tx is not None:
+        return run_query(tx, query, params)
+    return write_transaction(run_query, query, params)
+
+def execute_read(query, params=None, tx=None):
+    if tx is not None:
+        return run_query(tx, query, params)
+    return read_transaction(run_query, query, params)
+
+# Yields records one at a time from a read transaction that stays open while the
+# caller consumes them, e.g. a streamed response, so large results never sit in memory
+def stream_read(query, params=None):
+    with driver.session(default_access_mode=READ_ACCESS, bookmarks=request_bookmarks(), **session_config) as session:
+        with session.begin_transaction() as tx:
+            for record in tx.run(query, params):
+                yield record.data()
+
+# Statements that may write default to the leader
+execute_query = execute_write
@@ -0,0 +1,142 @@
+# app/vector_index.py
+import os
+import tempfile
+import threading
+import faiss
+import numpy as np
+
+def _as_matrix(vectors):
+    matrix = np.ascontiguousarray(np.asarray(vectors, dtype='float32'))
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+
+# Inner-product FAISS index over L2-normalized vectors (so scores are cosine
+# similarities), addressed by Neo4j elementId through an int64 id map. The
+# serialized index and its id map are saved together in one .npz, so a worker
+# loading while another saves sees either the old pair or the new one
+class VectorIndex:
+    def __init__(self, dim=None):
+        self.dim = dim
+        self.index = None
+        self.id_to_key = {}
+        self.key_to_id = {}
+        self.next_id = 0
+        self.lock = threading.RLock()
+        if dim is not None:
+            self._create(dim)
+
+    def _create(self, dim):
+        self.dim = dim
+        self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+
+    def __len__(self):
+        return len(self.key_to_id)
+
+    def __contains__(self, key):
+        return key in self.key_to_id
+
+    def keys(self):
+        return list(self.key_to_id)
+
+    # Adding a key that is already indexed replaces its vector
+    def add(self, keys, vectors):
+        keys = list(keys)
+        if not keys:
+            return
+        matrix = _as_matrix(vectors)
+        faiss.normalize_L2(matrix)
+        with self.lock:
+            if self.index is None:
+                self._create(matrix.shape[1])
+            self.remove([key for key in keys if key in self.key_to_id])
+            ids = np.arange(self.next_id, self.next_id + len(keys), dtype='int64')
+            self.next_id += len(keys)
+            for key, faiss_id in zip(keys, ids.tolist()):
+                self.key_to_id[key] = faiss_id
+                self.id_to_key[faiss_id] = key
+            self.index.add_with_ids(matrix, ids)
+
+    def update(self, key, vector):
+        self.add([key], [vector])
+
+    def remove(self, keys):
+        with self.lock:
+            ids = [self.key_to_id.pop(key) for key in keys if key in self.key_to_id]
+            if not ids:
+                return 0
+            for faiss_id in ids:
+                del self.id_to_key[faiss_id]
+            return self.index.remove_ids(np.asarray(ids, dtype='int64'))
+
+    def clear(self):
+        with self.lock:
+            self.id_to_key = {}
+            self.key_to_id = {}
+            self.next_id = 0
+            if self.dim is not None:
+                self._create(self.dim)
+
+    def _query(self, query):
+        matrix = _as_matrix(query)
+        faiss.normalize_L2(matrix)
+        return matrix
+
+    # Top-k (key, cosine similarity) pairs, best first
+    def search(self, query, top_k=10):
+        with self.lock:
+            if not self.key_to_id:
+                return []
+            scores, ids = self.index.search(self._query(query), min(top_k, len(self.key_to_id)))
+            return [(self.id_to_key[faiss_id], float(score)) for faiss_id, score in zip(ids[0].tolist(), scores[0].tolist()) if faiss_id != -1]
+
+    # Exact similarities for a given set of keys, e.g. lexical candidates
+    def score(self, query, keys):
+        with self.lock:
+            keys = [key for key in keys if key in self.key_to_id]
+            if not keys:
+                return []
+            vectors = np.vstack([self.index.reconstruct(self.key_to_id[key]) for key in keys])
+            scores = vectors @ self._query(query)[0]
+            return list(zip(keys, scores.tolist()))
+
+    def save(self, path):
+        with self.lock:
+            if self.index is None:
+                return
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            keys = list(self.key_to_id)
+            fd, tmp_path = tempfile.mkstemp(suffix='.npz', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(
+                        f,
+                        index=faiss.serialize_index(self.index),
+                        keys=np.array(keys, dtype=str),
+                        ids=np.array([self.key_to_id[key] for key in keys], dtype='int64'),
+                        next_id=np.array(self.next_id, dtype='int64')
+                    )
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    # False for a missing file or one saved in another format, which is then rebuilt
+    def load(self, path):
+        try:
+            with np.load(path) as data:
+                index = faiss.deserialize_index(data['index'])
+                keys = data['keys'].tolist()
+                ids = data['ids'].tolist()
+                next_id = int(data['next_id'])
+        except (OSError, ValueError, KeyError):
+            return False
+        with self.lock:
+            self.index = index
+            self.dim = index.d
+            self.next_id = next_id
+            self.key_to_id = dict(zip(keys, ids))
+            self.id_to_key = dict(zip(ids, keys))
+            return True
@@ -0,0 +1,55 @@
+# benchmarks/coalescer_benchmark.py
+# Fires search queries from concurrent threads and compares one forward pass
+# per query with the BatchCoalescer: throughput, p50/p99 latency and the
+# coalescer's batch size / queue wait counters.
+#
+#   python -m benchmarks.coalescer_benchmark --threads 16 --queries 400 --window-ms 5
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.coalescer import BatchCoalescer
+from app.encoder import encode_batch, load_encoder
+from app.text_processing import preprocess_text
+from benchmarks.encode_batch_benchmark import DEFAULT_ONTOLOGY, load_labels
+
+def encode_one(text):
+    return encode_batch([text])[0]
+
+def run(encode, queries, threads):
+    def timed(query):
+        start = time.perf_counter()
+        encode(query)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        latencies = sorted(executor.map(timed, queries))
+    elapsed = time.perf_counter() - start
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return len(queries) / elapsed, statistics.median(latencies), p99
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--queries', type=int, default=400)
+    parser.add_argument('--window-ms', type=float, default=5)
+    parser.add_argument('--max-batch', type=int, default=32)
+    args = parser.parse_args()
+
+    labels = [preprocess_text(label) for label in load_labels(args.ontology)]
+    queries = [labels[i % len(labels)] for i in range(args.queries)]
+    load_encoder()
+
+    coalescer = BatchCoalescer(lambda texts: encode_batch(texts).numpy(), args.window_ms, args.max_batch)
+    for name, encode in (('one pass per query', encode_one), ('coalesced', coalescer.submit)):
+        throughput, p50, p99 = run(encode, queries, args.threads)
+        print(f'{name:<20} {throughput:8.1f} q/s   p50 {p50:7.1f} ms   p99 {p99:7.1f} ms')
+
+    metrics = coalescer.metrics()
+    print(f'batches {metrics["batches"]}, mean batch size {metrics["mean_batch_size"]:.1f}, '
+          f'max {metrics["max_batch_size"]}, mean queue wait {metrics["mean_wait_ms"]:.2f} ms, max {metrics["max_wait_ms"]:.2f} ms')
+
+if __name__ == '__main__':
+    main()
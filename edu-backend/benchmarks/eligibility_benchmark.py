@@ -0,0 +1,116 @@
+# benchmarks/eligibility_benchmark.py
+# GET /courses/<id>/eligible-relations on a synthetic curriculum held in the
+# memory graph: the former three statements, each scanning every Resource and
+# checking the reverse relation per node, against building the semester-bucketed
+# CurriculumIndex once and answering from it. Both must return the same courses.
+#
+#   python -m benchmarks.eligibility_benchmark --courses 5000 --other-nodes 20000 --lookups 200
+import argparse
+import random
+import statistics
+import time
+from app.curriculum_index import CurriculumIndex
+from app.memory_graph import HANDLERS, MemoryGraph
+from app.queries import SEMESTER_RELATION_TYPES
+
+def build_graph(courses, other_nodes, semesters, classes, seed):
+    rng = random.Random(seed)
+    graph = MemoryGraph()
+    root = graph.create_node({'Resource', 'owl__Class'}, {'rdfs__label': 'Môn học'})
+    class_ids = []
+    for number in range(classes):
+        class_id = graph.create_node({'Resource', 'owl__Class'}, {'rdfs__label': f'Nhóm {number}'})
+        graph.create_rel('rdfs__subClassOf', class_id, root)
+        class_ids.append(class_id)
+    by_semester = {}
+    for number in range(courses):
+        semester = rng.randint(1, semesters)
+        course = graph.create_node({'Resource'}, {
+            'ns0__maMonHoc': f'MH{number:05d}', 'rdfs__label': f'Môn học {number}', 'ns0__hocKy': semester
+        })
+        graph.create_rel('rdf__type', course, rng.choice(class_ids))
+        by_semester.setdefault(semester, []).append(course)
+    # Lecturers, rooms, documents...: Resources the old statements scanned too
+    for number in range(other_nodes):
+        graph.create_node({'Resource'}, {'rdfs__label': f'Tài nguyên {number}'})
+    for semester, bucket in by_semester.items():
+        earlier = [course for other, other_bucket in by_semester.items() if other < semester for course in other_bucket]
+        for course in bucket:
+            for relation_type in ('ns0__tienQuyet', 'ns0__hocTruoc'):
+                for target in rng.sample(earlier, min(len(earlier), rng.randint(0, 2))):
+                    graph.create_rel(relation_type, course, target)
+            if rng.random() < 0.2 and len(bucket) > 1:
+                graph.create_rel('ns0__songHanh', course, rng.choice(bucket))
+    graph.frozen = True
+    return graph, class_ids
+
+# What the three eligible_courses statements did: every Resource, every relation type
+def scan_eligible(graph, course_a):
+    semester_a = graph.props(course_a).get('ns0__hocKy')
+    results = {}
+    for relation_type in SEMESTER_RELATION_TYPES:
+        rows = []
+        for course_b in graph.with_label('Resource'):
+            semester_b = graph.props(course_b).get('ns0__hocKy')
+            if course_b == course_a or semester_a is None or semester_b is None:
+                continue
+            if relation_type == 'ns0__songHanh':
+                eligible = semester_a == semester_b
+            else:
+                eligible = semester_a > semester_b and not any(target == course_a for _, target in graph.out(course_b, relation_type))
+            if eligible:
+                props = graph.props(course_b)
+                rows.append({'course_id': course_b, 'ns0__maMonHoc': props.get('ns0__maMonHoc'), 'rdfs__label': props.get('rdfs__label')})
+        results[relation_type] = rows
+    return results
+
+def build_index(graph, class_ids):
+    return CurriculumIndex(HANDLERS['curriculum_index'](graph, {'classes': class_ids}, None))
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def same(a, b):
+    return all(
+        sorted(row['course_id'] for row in a[relation_type]) == sorted(row['course_id'] for row in b[relation_type])
+        for relation_type in SEMESTER_RELATION_TYPES
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--courses', type=int, default=5000)
+    parser.add_argument('--other-nodes', type=int, default=20000)
+    parser.add_argument('--semesters', type=int, default=10)
+    parser.add_argument('--classes', type=int, default=40)
+    parser.add_argument('--lookups', type=int, default=200)
+    parser.add_argument('--scan-lookups', type=int, default=10, help='The full scan is slow; time it on fewer courses.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    graph, class_ids = build_graph(args.courses, args.other_nodes, args.semesters, args.classes, args.seed)
+    courses = [course for course in graph.with_label('Resource') if 'ns0__maMonHoc' in graph.props(course)]
+    sample = random.Random(args.seed).sample(courses, min(args.lookups, len(courses)))
+    print(f'{len(courses)} courses, {len(graph.with_label("Resource"))} Resource nodes, {len(graph.rels)} relationships')
+
+    index, build_ms = timed(build_index, graph, class_ids)
+    print(f'index build: {build_ms:.1f} ms (once per course/relation write)')
+
+    scan_times = []
+    for course in sample[:args.scan_lookups]:
+        expected, elapsed = timed(scan_eligible, graph, course)
+        scan_times.append(elapsed)
+        if not same(expected, index.eligible(course)):
+            raise SystemExit(f'Eligible courses of {course} differ between the scan and the index')
+
+    index_times = [timed(index.eligible, course)[1] for course in sample]
+    scan_median = statistics.median(scan_times)
+    index_median = statistics.median(index_times)
+    print(f'three Resource scans: median {scan_median:.2f} ms over {len(scan_times)} courses')
+    print(f'curriculum index:     median {index_median:.3f} ms over {len(index_times)} courses '
+          f'({scan_median / index_median:.0f}x faster)')
+    print(f'results identical for the {len(scan_times)} scanned courses')
+
+if __name__ == '__main__':
+    main()
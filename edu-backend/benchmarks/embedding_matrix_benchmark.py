@@ -0,0 +1,77 @@
+# benchmarks/embedding_matrix_benchmark.py
+# Recall@k of the float16 (optionally PCA-reduced) embedding matrix against
+# exact full-precision cosine search, with file size and per-query scoring time,
+# so SEARCH_PCA_DIMS can be chosen from data.
+#
+#   python -m benchmarks.embedding_matrix_benchmark                          # PhoBERT
+#   python -m benchmarks.embedding_matrix_benchmark --model tiny             # small local model, no network
+#   python -m benchmarks.embedding_matrix_benchmark --synthetic 20000        # plus noisy copies, a larger catalogue
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import numpy as np
+from app.embedding_matrix import MatrixIndex
+from app.encoder import build_encoder, encode_batch
+from app.text_processing import preprocess_text
+from benchmarks.encode_batch_benchmark import DEFAULT_ONTOLOGY
+from benchmarks.quantization_benchmark import DEFAULT_QUERIES, load_course_labels, tiny_encoder
+
+def normalize(matrix):
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+def exact_top_k(queries, catalogue, k):
+    scores = normalize(queries) @ normalize(catalogue).T
+    return [set(np.argsort(-row)[:k].tolist()) for row in scores]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='vinai/phobert-base-v2', help='model name, or "tiny" for a small local model')
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--dims', default='0,256,128', help='comma-separated PCA sizes, 0 = no reduction')
+    parser.add_argument('--synthetic', type=int, default=0, help='extra noisy copies of course embeddings')
+    parser.add_argument('--noise', type=float, default=0.05)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    catalogue = [preprocess_text(label) for label in load_course_labels(args.ontology)]
+    queries = [preprocess_text(query) for query in DEFAULT_QUERIES] + catalogue
+    encoder = tiny_encoder(catalogue) if args.model == 'tiny' else build_encoder(args.model, 'fp32')
+    course_embeddings = encode_batch(catalogue, encoder=encoder).numpy()
+    query_embeddings = encode_batch(queries, encoder=encoder).numpy()
+    if args.synthetic:
+        rng = np.random.default_rng(0)
+        base = normalize(course_embeddings)
+        picks = rng.integers(0, len(base), args.synthetic)
+        noise = rng.normal(0, args.noise, (args.synthetic, base.shape[1])).astype('float32')
+        course_embeddings = np.vstack([course_embeddings, base[picks] + noise])
+    keys = [str(i) for i in range(len(course_embeddings))]
+    print(f'{len(keys)} courses x {course_embeddings.shape[1]} dims, {len(queries)} queries')
+
+    baseline = exact_top_k(query_embeddings, course_embeddings, args.k)
+    fp32_mb = course_embeddings.astype('float32').nbytes / (1024 * 1024)
+    print(f'fp32 baseline: {fp32_mb:8.2f} MB')
+    with tempfile.TemporaryDirectory() as directory:
+        for dims in [int(d) for d in args.dims.split(',')]:
+            if dims >= course_embeddings.shape[1]:
+                continue
+            index = MatrixIndex(dims)
+            index.add(keys, course_embeddings)
+            path = os.path.join(directory, f'courses.{dims}.f16.npy')
+            index.save(path)
+            mapped = MatrixIndex(dims)
+            mapped.load(path)
+
+            recalls, timings = [], []
+            for query, expected in zip(query_embeddings, baseline):
+                start = time.perf_counter()
+                found = mapped.search(query, args.k)
+                timings.append((time.perf_counter() - start) * 1000)
+                recalls.append(len({int(key) for key, _ in found} & expected) / len(expected))
+            size_mb = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory) if name.startswith(f'courses.{dims}.')) / (1024 * 1024)
+            print(f'{"full" if dims == 0 else dims:>5} dims f16: {size_mb:8.2f} MB   recall@{args.k} mean {statistics.mean(recalls):.3f} '
+                  f'min {min(recalls):.2f}   query {statistics.mean(timings):6.3f} ms')
+
+if __name__ == '__main__':
+    main()
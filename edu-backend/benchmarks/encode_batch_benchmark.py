@@ -0,0 +1,43 @@
+# benchmarks/encode_batch_benchmark.py
+# Compares encode_batch() with the old one-sentence-at-a-time loop on the
+# course labels of ontology.rdf.
+#
+#   python -m benchmarks.encode_batch_benchmark --repeat 3 --batch-size 32
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+import torch
+from app.encoder import encode_sentence, encode_batch
+
+RDFS_LABEL = '{http://www.w3.org/2000/01/rdf-schema#}label'
+DEFAULT_ONTOLOGY = os.path.join(os.path.dirname(__file__), '..', '..', 'ontology.rdf')
+
+def load_labels(path):
+    return [element.text for element in ET.parse(path).iter(RDFS_LABEL) if element.text]
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=1, help='repeat the label list to simulate a larger catalogue')
+    args = parser.parse_args()
+
+    labels = load_labels(args.ontology) * args.repeat
+    print(f'{len(labels)} labels, batch size {args.batch_size}')
+
+    loop_time, loop_embeddings = timed(lambda: torch.cat([encode_sentence(label) for label in labels]))
+    batch_time, batch_embeddings = timed(lambda: encode_batch(labels, batch_size=args.batch_size))
+
+    max_diff = (loop_embeddings - batch_embeddings).abs().max().item()
+    print(f'per-sentence loop: {loop_time:.2f}s ({len(labels) / loop_time:.1f} labels/s)')
+    print(f'encode_batch:      {batch_time:.2f}s ({len(labels) / batch_time:.1f} labels/s)')
+    print(f'speed-up: {loop_time / batch_time:.1f}x, max abs difference: {max_diff:.2e}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/plan_benchmark.py
+# The prerequisite DAG planner on the synthetic curriculum of the eligibility
+# benchmark: building the plan, serializing GET /curriculum/plan, and applying
+# relation adds/removals in place against rebuilding the plan after each one.
+# The incrementally updated plan must equal a fresh build.
+#
+#   python -m benchmarks.plan_benchmark --courses 5000 --changes 200
+import argparse
+import random
+import statistics
+from app.curriculum_plan import CurriculumPlan
+from benchmarks.eligibility_benchmark import build_graph, build_index, timed
+
+def rebuild(plan):
+    relations = {relation_id: (course_id, 'ns0__tienQuyet', target_id) for relation_id, (course_id, target_id) in plan.relations.items()}
+    return CurriculumPlan(dict(plan.courses), relations)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--courses', type=int, default=5000)
+    parser.add_argument('--other-nodes', type=int, default=0)
+    parser.add_argument('--semesters', type=int, default=10)
+    parser.add_argument('--classes', type=int, default=40)
+    parser.add_argument('--changes', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    graph, class_ids = build_graph(args.courses, args.other_nodes, args.semesters, args.classes, args.seed)
+    index = build_index(graph, class_ids)
+    plan, build_ms = timed(CurriculumPlan, dict(index.courses), index.relations)
+    result, result_ms = timed(plan.result)
+    print(f'{result["courses"]} courses, {result["relations"]} prerequisite relations, '
+          f'critical path {result["critical_path_length"]}, {len(result["cycles"])} cycles')
+    print(f'build: {build_ms:.1f} ms, result: {result_ms:.1f} ms')
+
+    # New relations point from a later to an earlier semester, as the semester rules require
+    rng = random.Random(args.seed)
+    courses = sorted(index.semesters)
+    added = []
+    add_times = []
+    for number in range(args.changes):
+        course_id, target_id = rng.sample(courses, 2)
+        if index.semesters[course_id] < index.semesters[target_id]:
+            course_id, target_id = target_id, course_id
+        if index.semesters[course_id] == index.semesters[target_id]:
+            continue
+        relation_id = f'bench:{number}'
+        add_times.append(timed(plan.add, relation_id, course_id, 'ns0__tienQuyet', target_id)[1])
+        added.append(relation_id)
+    remove_times = [timed(plan.remove, relation_id)[1] for relation_id in rng.sample(added, len(added) // 2)]
+    fresh, rebuild_ms = timed(rebuild, plan)
+    if fresh.earliest != plan.earliest or fresh.cycles != plan.cycles:
+        raise SystemExit('The incrementally updated plan differs from a fresh build')
+
+    print(f'add in place:    median {statistics.median(add_times):.3f} ms over {len(add_times)} relations')
+    print(f'remove in place: median {statistics.median(remove_times):.3f} ms over {len(remove_times)} relations')
+    print(f'full rebuild:    {rebuild_ms:.1f} ms; incremental result equals a fresh build')
+
+if __name__ == '__main__':
+    main()
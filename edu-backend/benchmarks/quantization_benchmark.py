@@ -0,0 +1,109 @@
+# benchmarks/quantization_benchmark.py
+# Compares the fp32 encoder with the int8 dynamic-quantized one on the course
+# catalogue of ontology.rdf: per-query latency, model size / RSS growth, and
+# how many of the fp32 top-10 results each query keeps under int8.
+#
+#   python -m benchmarks.quantization_benchmark                 # PhoBERT
+#   python -m benchmarks.quantization_benchmark --model tiny    # small local model, no network
+import argparse
+import io
+import statistics
+import time
+import xml.etree.ElementTree as ET
+import torch
+import torch.nn.functional as F
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import PreTrainedTokenizerFast, RobertaConfig, RobertaModel
+from app.encoder import build_encoder, encode_batch, quantize_model
+from app.text_processing import abbreviation_dict, preprocess_text
+from benchmarks.encode_batch_benchmark import DEFAULT_ONTOLOGY, RDFS_LABEL
+
+EDU_NS = '{http://localhost/ontologies/2024/10/11/edu_program#}'
+
+DEFAULT_QUERIES = list(abbreviation_dict) + [
+    'lập trình', 'cơ sở dữ liệu', 'mạng máy tính', 'trí tuệ nhân tạo', 'toán', 'anh văn',
+    'đồ án', 'hệ điều hành', 'phần mềm', 'bảo mật', 'kiểm thử', 'web'
+]
+
+# Courses are the individuals that carry a course code
+def load_course_labels(path):
+    labels = []
+    for element in ET.parse(path).getroot():
+        label = element.find(RDFS_LABEL)
+        if element.find(f'{EDU_NS}maMonHoc') is not None and label is not None and label.text:
+            labels.append(label.text)
+    return labels
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def model_size_mb(model):
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / (1024 * 1024)
+
+# A randomly initialised RoBERTa with a word-level vocabulary built from the
+# catalogue, so the benchmark can run without downloading PhoBERT
+def tiny_encoder(texts):
+    specials = ['<pad>', '<unk>', '<s>', '</s>']
+    words = sorted({word for text in texts for word in preprocess_text(text).split()})
+    vocab = {token: i for i, token in enumerate(specials + words)}
+    backend = Tokenizer(models.WordLevel(vocab, unk_token='<unk>'))
+    backend.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=backend, pad_token='<pad>', unk_token='<unk>', bos_token='<s>', eos_token='</s>')
+    torch.manual_seed(0)
+    config = RobertaConfig(vocab_size=len(vocab), hidden_size=256, num_hidden_layers=4, num_attention_heads=4,
+                           intermediate_size=1024, max_position_embeddings=256, pad_token_id=0)
+    return tokenizer, RobertaModel(config).eval()
+
+def top_k(query_embeddings, catalogue_embeddings, k):
+    scores = F.normalize(query_embeddings, dim=1) @ F.normalize(catalogue_embeddings, dim=1).T
+    return [set(row) for row in scores.topk(min(k, scores.shape[1]), dim=1).indices.tolist()]
+
+def query_latencies(queries, encoder, rounds):
+    latencies = []
+    for _ in range(rounds):
+        for query in queries:
+            start = time.perf_counter()
+            encode_batch([query], encoder=encoder)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[int(len(latencies) * 0.5)], latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='vinai/phobert-base-v2', help='model name, or "tiny" for a small local model')
+    parser.add_argument('--ontology', default=DEFAULT_ONTOLOGY)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    catalogue = [preprocess_text(label) for label in load_course_labels(args.ontology)]
+    queries = [preprocess_text(query) for query in DEFAULT_QUERIES] + catalogue
+    print(f'{len(catalogue)} courses, {len(queries)} queries, torch {torch.__version__}, {torch.get_num_threads()} threads')
+
+    before = rss_mb()
+    fp32 = tiny_encoder(catalogue) if args.model == 'tiny' else build_encoder(args.model, 'fp32')
+    fp32_rss = rss_mb() - before
+    before = rss_mb()
+    int8 = (fp32[0], quantize_model(fp32[1]))
+    int8_rss = rss_mb() - before
+
+    results = {}
+    for mode, encoder, rss in (('fp32', fp32, fp32_rss), ('int8', int8, int8_rss)):
+        mean, p50, p99 = query_latencies(queries, encoder, args.rounds)
+        catalogue_embeddings = encode_batch(catalogue, encoder=encoder)
+        results[mode] = top_k(encode_batch(queries, encoder=encoder), catalogue_embeddings, args.k)
+        print(f'{mode}: query latency mean {mean:6.2f} ms  p50 {p50:6.2f} ms  p99 {p99:6.2f} ms   '
+              f'weights {model_size_mb(encoder[1]):7.1f} MB   RSS +{rss:6.1f} MB')
+
+    overlaps = [len(a & b) / len(a) for a, b in zip(results['fp32'], results['int8'])]
+    print(f'top-{args.k} overlap int8 vs fp32: mean {statistics.mean(overlaps):.3f}, min {min(overlaps):.2f}, '
+          f'identical for {sum(o == 1.0 for o in overlaps)}/{len(overlaps)} queries')
+
+if __name__ == '__main__':
+    main()
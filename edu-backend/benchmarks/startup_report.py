@@ -0,0 +1,63 @@
+# benchmarks/startup_report.py
+# Measures what one worker pays at startup: time to create_app(), resident
+# memory once it can serve /courses, and (with search enabled) how long the
+# background warm-up takes until /health/ready reports ready.
+#
+#   python -m benchmarks.startup_report --timeout 300
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+WORKER = r'''
+import json, time
+start = time.perf_counter()
+
+def rss_mb():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+
+from app import create_app
+app = create_app()
+report = {'create_app_s': time.perf_counter() - start, 'rss_after_create_mb': rss_mb()}
+
+client = app.test_client()
+deadline = time.perf_counter() + TIMEOUT
+response = client.get('/health/ready')
+while response.status_code != 200 and time.perf_counter() < deadline:
+    time.sleep(0.1)
+    response = client.get('/health/ready')
+report['ready'] = response.status_code == 200
+report['ready_s'] = time.perf_counter() - start
+report['rss_when_ready_mb'] = rss_mb()
+report['torch_imported'] = 'torch' in __import__('sys').modules
+print(json.dumps(report))
+'''
+
+def run_worker(search_enabled, timeout):
+    env = dict(os.environ, SEARCH_ENABLED='true' if search_enabled else 'false')
+    code = WORKER.replace('TIMEOUT', str(timeout))
+    output = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True,
+                            cwd=os.path.join(os.path.dirname(__file__), '..'))
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--timeout', type=float, default=300, help='seconds to wait for /health/ready')
+    args = parser.parse_args()
+
+    print(f'{"mode":<16}{"create_app":>12}{"RSS":>10}{"ready after":>14}{"RSS ready":>12}  torch')
+    for search_enabled in (False, True):
+        report = run_worker(search_enabled, args.timeout)
+        mode = 'search enabled' if search_enabled else 'search disabled'
+        ready = f'{report["ready_s"]:.2f}s' if report['ready'] else 'timed out'
+        print(f'{mode:<16}{report["create_app_s"]:>11.2f}s{report["rss_after_create_mb"]:>8.0f}MB'
+              f'{ready:>14}{report["rss_when_ready_mb"]:>10.0f}MB  {report["torch_imported"]}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# tests/conftest.py
+# app/__init__ creates the Neo4j driver on import; it only connects on first use,
+# so the unit tests need a URI but never a running database
+import hashlib
+import os
+import numpy as np
+import pytest
+
+os.environ.setdefault('NEO4J_URI', 'bolt://localhost:7687')
+os.environ.setdefault('SEARCH_ENABLED', 'false')
+
+ONTOLOGY = os.path.join(os.path.dirname(__file__), '..', '..', 'ontology.rdf')
+
+# A deterministic stand-in for the encoder: equal texts get equal vectors
+def _embed(texts):
+    return np.array([np.frombuffer(hashlib.sha256(text.encode('utf-8')).digest(), dtype=np.uint8)[:16] for text in texts], dtype='float32')
+
+@pytest.fixture
+def embed():
+    return _embed
+
+# The search_courses rows the course store reads, replacing the graph; the
+# encoder is replaced by embed
+@pytest.fixture
+def course_rows(monkeypatch):
+    from app import search_index
+    rows = [{'elementId': f'n:{i}', 'code': f'mm{i}', 'courseName': name}
+            for i, name in enumerate(['Giải tích 1', 'Cấu trúc dữ liệu', 'Mạng máy tính', 'Lập trình Java'])]
+
+    def execute_read(query, params=None):
+        return [dict(row) for row in rows if params is None or row['elementId'] == params['course_id']]
+
+    monkeypatch.setattr(search_index, 'execute_read', execute_read)
+    monkeypatch.setattr(search_index, 'encode_texts', _embed)
+    return rows
+
+# Stores on the same files behave like the stores of different workers
+@pytest.fixture
+def make_store(tmp_path):
+    from app.search_index import CourseEmbeddingStore
+    return lambda: CourseEmbeddingStore(str(tmp_path / 'courses.npz'), str(tmp_path / 'courses.f16.npy'))
+
+# The in-memory backend on the shipped ontology, with a fresh write log, in place
+# of the Neo4j driver; the class closure is re-read from it
+@pytest.fixture
+def memory_driver(tmp_path, monkeypatch):
+    from app import utils
+    from app.class_closure import classes_changed
+    from app.memory_graph import MemoryDriver
+    driver = MemoryDriver(ONTOLOGY, str(tmp_path / 'graph.log.jsonl'))
+    monkeypatch.setattr(utils, 'driver', driver)
+    classes_changed()
+    return driver
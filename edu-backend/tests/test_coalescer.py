@@ -0,0 +1,44 @@
+# tests/test_coalescer.py
+import threading
+import time
+import numpy as np
+import pytest
+from app.coalescer import BatchCoalescer
+
+def _encode(texts):
+    return np.array([[len(text), index] for index, text in enumerate(texts)], dtype='float32')
+
+def test_lone_submit_does_not_wait_for_the_window():
+    coalescer = BatchCoalescer(_encode, window_ms=500)
+    coalescer.submit('warm up')
+    started = time.perf_counter()
+    row = coalescer.submit('abc')
+    assert (time.perf_counter() - started) * 1000 < 100
+    assert row.tolist() == [3, 0]
+
+def test_concurrent_submits_share_batches_and_get_their_own_rows():
+    def slow_encode(texts):
+        time.sleep(0.02)
+        return _encode(texts)
+
+    coalescer = BatchCoalescer(slow_encode, window_ms=50, max_batch=32)
+    texts = ['x' * length for length in range(1, 17)]
+    results = {}
+    threads = [threading.Thread(target=lambda text=text: results.__setitem__(text, coalescer.submit(text))) for text in texts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert {text: int(row[0]) for text, row in results.items()} == {text: len(text) for text in texts}
+    metrics = coalescer.metrics()
+    assert metrics['items'] == len(texts)
+    assert metrics['max_batch_size'] > 1
+
+def test_encoder_errors_reach_every_caller():
+    def failing(texts):
+        raise RuntimeError('encoder down')
+
+    coalescer = BatchCoalescer(failing, window_ms=5)
+    with pytest.raises(RuntimeError, match='encoder down'):
+        coalescer.submit('abc')
+    assert coalescer.metrics()['errors'] == 1
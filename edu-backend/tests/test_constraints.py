@@ -0,0 +1,96 @@
+# tests/test_constraints.py
+import random
+import pytest
+from flask import Flask
+from app.constraints import SemesterConstraints, relation_semester_error
+from app.curriculum_index import CurriculumIndex
+from app.routes import curriculum as curriculum_routes
+
+RELATION_TYPES = ['ns0__tienQuyet', 'ns0__hocTruoc', 'ns0__songHanh']
+
+@pytest.mark.parametrize('relation_type, course_semester, target_semester, allowed', [
+    ('ns0__tienQuyet', 3, 2, True),
+    ('ns0__tienQuyet', 2, 2, False),
+    ('ns0__tienQuyet', 1, 2, False),
+    ('ns0__hocTruoc', 4, 1, True),
+    ('ns0__hocTruoc', 2, 2, False),
+    ('ns0__songHanh', 2, 2, True),
+    ('ns0__songHanh', 2, 3, False),
+    ('ns0__tienQuyet', None, 2, True),
+    ('ns0__songHanh', 2, None, True),
+])
+def test_relation_semester_error(relation_type, course_semester, target_semester, allowed):
+    assert (relation_semester_error(relation_type, course_semester, target_semester) is None) == allowed
+
+def _key(error):
+    return error['course_id'], error['relation_type'], error['target_id'], error['course_semester'], error['target_semester']
+
+# A valid programme: random semesters and only the relations they allow
+def _programme(rng, courses=60, relations=200):
+    semesters = {f'c{i}': rng.choice([1, 2, 3, 4, 5, None]) for i in range(courses)}
+    stored = {}
+    while len(stored) < relations:
+        course_id, target_id = rng.sample(sorted(semesters), 2)
+        relation_type = rng.choice(RELATION_TYPES)
+        if relation_semester_error(relation_type, semesters[course_id], semesters[target_id]) is None:
+            stored[f'r{len(stored)}'] = (course_id, relation_type, target_id)
+    return semesters, stored
+
+@pytest.mark.parametrize('seed', range(5))
+def test_check_matches_a_full_check_of_the_changed_programme(seed):
+    rng = random.Random(seed)
+    semesters, stored = _programme(rng)
+    constraints = SemesterConstraints(semesters, stored)
+    assert constraints.check(everything=True) == []
+
+    for _ in range(30):
+        moves = {course_id: rng.choice([1, 2, 3, 4, 5, None]) for course_id in rng.sample(sorted(semesters), rng.randrange(4))}
+        removed = rng.sample(sorted(stored), rng.randrange(4))
+        added = [(course_id, rng.choice(RELATION_TYPES), target_id)
+                 for course_id, target_id in (rng.sample(sorted(semesters), 2) for _ in range(rng.randrange(4)))]
+
+        changed = SemesterConstraints(
+            {**semesters, **moves},
+            {**{relation_id: relation for relation_id, relation in stored.items() if relation_id not in removed},
+             **{f'new{i}': relation for i, relation in enumerate(added)}})
+        expected = sorted(map(_key, changed.check(everything=True)))
+        assert sorted(map(_key, constraints.check(moves, added, removed))) == expected
+
+def test_check_names_the_stored_relation_it_breaks():
+    constraints = SemesterConstraints({'a': 2, 'b': 1}, {'r1': ('a', 'ns0__tienQuyet', 'b')})
+    errors = constraints.check({'b': 2})
+    assert [(error['relation_id'], error['course_semester'], error['target_semester']) for error in errors] == [('r1', 2, 2)]
+    assert constraints.check({'b': 2}, removed=['r1']) == []
+
+def test_from_rows():
+    constraints = SemesterConstraints.from_rows([
+        {'relation_id': 'r1', 'course_id': 'a', 'relation_type': 'ns0__songHanh', 'target_id': 'b', 'course_semester': 1, 'target_semester': 1}
+    ])
+    assert constraints.semesters == {'a': 1, 'b': 1}
+    assert constraints.touching == {'a': {'r1'}, 'b': {'r1'}}
+    assert [error['relation_id'] for error in constraints.check({'a': 2})] == ['r1']
+
+@pytest.fixture
+def client(monkeypatch):
+    index = CurriculumIndex([
+        {'course_id': 'a', 'ns0__maMonHoc': 'mm1', 'rdfs__label': 'A', 'semester': 2,
+         'relations': [{'relation_id': 'r1', 'relation_type': 'ns0__tienQuyet', 'target_id': 'b'}]},
+        {'course_id': 'b', 'ns0__maMonHoc': 'mm2', 'rdfs__label': 'B', 'semester': 1, 'relations': []},
+    ])
+    monkeypatch.setattr(curriculum_routes, 'curriculum_index', lambda: index)
+    app = Flask(__name__)
+    app.register_blueprint(curriculum_routes.curriculum_bp)
+    return app.test_client()
+
+def test_validate_route(client):
+    assert client.get('/curriculum/validate').json['valid']
+    response = client.post('/curriculum/validate', json={'moves': {'a': 1}})
+    assert response.status_code == 200
+    assert [error['relation_id'] for error in response.json['errors']] == ['r1']
+    response = client.post('/curriculum/validate', json={'moves': {'a': 1}, 'removed': ['r1']})
+    assert response.json['valid']
+
+def test_validate_route_rejects_unknown_ids(client):
+    response = client.post('/curriculum/validate', json={'moves': {'zz': 1}, 'removed': ['r9'], 'added': [{'course_id': 'a', 'relation_type': 'ns0__x', 'target_id': 'b'}]})
+    assert response.status_code == 400
+    assert len(response.json['errors']) == 3
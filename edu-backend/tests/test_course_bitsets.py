@@ -0,0 +1,84 @@
+# tests/test_course_bitsets.py
+import random
+import numpy as np
+import pytest
+from app import course_bitsets
+from app.course_bitsets import CourseBitsets
+from app.curriculum_index import CurriculumIndex
+from app.memory_graph import HANDLERS, MemoryGraph
+
+STATUSES = ['hoàn thành', 'đang học', 'chưa học']
+
+# A memory graph of courses with random tienQuyet edges to earlier courses and
+# random UserCourse rows, and the curriculum index rows of the same courses
+def _curriculum(seed, courses=150, users=40):
+    rng = random.Random(seed)
+    graph = MemoryGraph()
+    course_ids = [graph.create_node({'Resource'}, {'ns0__maMonHoc': f'mm{i}', 'rdfs__label': f'Môn {i}'}) for i in range(courses)]
+    for i, course_id in enumerate(course_ids[1:], 1):
+        for target in rng.sample(course_ids[:i], min(i, rng.choice([0, 0, 1, 2, 4]))):
+            graph.create_rel('ns0__tienQuyet', course_id, target)
+    user_ids = [f'sv{u}' for u in range(users)]
+    for user_id in user_ids:
+        for course_id in rng.sample(course_ids, rng.randrange(courses // 2)):
+            graph.create_node({'UserCourse'}, {'user_id': user_id, 'course_id': course_id, 'status': rng.choice(STATUSES)})
+    rows = [{
+        'course_id': course_id,
+        'ns0__maMonHoc': graph.props(course_id)['ns0__maMonHoc'],
+        'rdfs__label': graph.props(course_id)['rdfs__label'],
+        'semester': None,
+        'relations': [{'relation_id': rel_id, 'relation_type': 'ns0__tienQuyet', 'target_id': target} for rel_id, target in graph.out(course_id)]
+    } for course_id in course_ids]
+    return graph, rows, user_ids
+
+def _progress(graph, user_ids):
+    return {row['user_id']: row for row in HANDLERS['user_progress'](graph, {'user_ids': user_ids}, None)}
+
+def _prerequisites(graph, course_id):
+    return {target for _, target in graph.out(course_id, 'ns0__tienQuyet')}
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_next_courses_matches_a_set_check(seed, monkeypatch):
+    # A small chunk makes next_courses() test the students in several slices
+    monkeypatch.setattr(course_bitsets, 'CHUNK_WORDS', 64)
+    graph, rows, user_ids = _curriculum(seed)
+    bitsets = CourseBitsets(CurriculumIndex(rows))
+    progress = _progress(graph, user_ids)
+    eligible = bitsets.next_courses(user_ids, progress)
+
+    for user_id, row in zip(user_ids, eligible):
+        completed = set(progress.get(user_id, {}).get('completed', ()))
+        taken = set(progress.get(user_id, {}).get('taken', ()))
+        expected = [course_id for course_id in bitsets.course_ids
+                    if course_id not in taken and _prerequisites(graph, course_id) <= completed]
+        assert [course['course_id'] for course in bitsets.course_list(row)] == expected
+
+def test_next_courses_agrees_with_the_completion_check():
+    graph, rows, user_ids = _curriculum(3, courses=80, users=10)
+    bitsets = CourseBitsets(CurriculumIndex(rows))
+    eligible = bitsets.next_courses(user_ids, _progress(graph, user_ids))
+    check = HANDLERS['incomplete_prerequisites']
+    for user_id, row in zip(user_ids, eligible):
+        for position in np.flatnonzero(row):
+            assert check(graph, {'user_id': user_id, 'course_id': bitsets.course_ids[position]}, None) == []
+
+def test_a_prerequisite_never_started_is_incomplete():
+    graph = MemoryGraph()
+    basic, advanced = (graph.create_node({'Resource'}, {'ns0__maMonHoc': code, 'rdfs__label': code}) for code in ('mm1', 'mm2'))
+    graph.create_rel('ns0__tienQuyet', advanced, basic)
+    params = {'user_id': 'sv1', 'course_id': advanced}
+    assert HANDLERS['incomplete_prerequisites'](graph, params, None) == [{'course_id': basic}]
+
+    uc = graph.create_node({'UserCourse'}, {'user_id': 'sv1', 'course_id': basic, 'status': 'đang học'})
+    assert HANDLERS['incomplete_prerequisites'](graph, params, None) == [{'course_id': basic}]
+
+    graph.props(uc)['status'] = 'hoàn thành'
+    assert HANDLERS['incomplete_prerequisites'](graph, params, None) == []
+
+def test_students_without_progress_only_get_ungated_courses():
+    graph, rows, _ = _curriculum(4, courses=70, users=0)
+    bitsets = CourseBitsets(CurriculumIndex(rows))
+    eligible = bitsets.next_courses(['sv-new'], {})
+    assert [course['course_id'] for course in bitsets.course_list(eligible[0])] == [
+        course_id for course_id in bitsets.course_ids if not _prerequisites(graph, course_id)
+    ]
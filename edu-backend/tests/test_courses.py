@@ -0,0 +1,77 @@
+# tests/test_courses.py
+# GET /courses keyset pagination and the cached class closure, on the memory backend
+import pytest
+from flask import Flask
+from app import class_closure, graph_version
+from app.class_closure import classes_changed
+from app.routes import courses as course_routes
+from app.routes.courses import decode_cursor, encode_cursor
+
+@pytest.fixture
+def client(memory_driver):
+    app = Flask(__name__)
+    app.register_blueprint(course_routes.courses_bp)
+    return app.test_client()
+
+def _codes(response):
+    return [course['ns0__maMonHoc'] for course in response.json['courses']]
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({'semester': 2147483647, 'course_id': '4:c0ffee:12'})
+    assert decode_cursor(cursor) == {'semester': 2147483647, 'course_id': '4:c0ffee:12'}
+    # URL-safe, so it can go in a query string as is
+    assert set(cursor) <= set('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_=')
+
+@pytest.mark.parametrize('cursor', ['%%%', 'bm90IGpzb24=', 'WzFd', 'WyJ4IiwgIm46MSJd', 'W251bGwsICJuOjEiXQ==', 'é'])
+def test_invalid_cursors_are_a_400(client, cursor):
+    response = client.get('/courses', query_string={'cursor': cursor})
+    assert response.status_code == 400
+    assert response.json == {'error': 'Invalid cursor.'}
+
+def test_cursor_pages_match_numbered_pages(client):
+    first = client.get('/courses', query_string={'limit': 7})
+    total = first.json['total_courses']
+    assert total > 7
+
+    by_cursor = _codes(first)
+    cursor = first.json['next_cursor']
+    while cursor:
+        response = client.get('/courses', query_string={'limit': 7, 'cursor': cursor})
+        assert response.status_code == 200
+        by_cursor += _codes(response)
+        cursor = response.json['next_cursor']
+
+    by_page = []
+    for page in range(1, first.json['total_pages'] + 1):
+        by_page += _codes(client.get('/courses', query_string={'limit': 7, 'page': page}))
+
+    assert by_cursor == by_page
+    assert len(by_cursor) == len(set(by_cursor)) == total
+    # The sort key stays inside the cursor
+    assert all('semester' not in course for course in first.json['courses'])
+
+def test_courses_are_ordered_by_semester_with_unset_last(client):
+    semesters = [course['ns0__hocKy'] for course in client.get('/courses', query_string={'limit': 1000}).json['courses']]
+    assert semesters == sorted(semesters, key=lambda semester: (semester is None, semester or 0))
+
+def test_class_closure_is_read_once_per_class_version(client, monkeypatch):
+    reads = []
+    execute_read = class_closure.execute_read
+    monkeypatch.setattr(class_closure, 'execute_read', lambda *args: reads.append(args) or execute_read(*args))
+    classes_changed()
+
+    classes = class_closure.course_classes()
+    assert classes and class_closure.course_classes() is classes
+    client.get('/courses')
+    assert len(reads) == 1
+
+    classes_changed()
+    assert class_closure.course_classes() == classes
+    assert len(reads) == 2
+
+def test_total_is_cached_until_courses_change(client, monkeypatch):
+    total = client.get('/courses').json['total_courses']
+    monkeypatch.setattr(course_routes, 'execute_read', lambda query, params=None: [] if 'count' not in query else [{'total_courses': 0}])
+    assert course_routes.count_courses(class_closure.course_classes()) == total
+    graph_version.bump(graph_version.COURSES)
+    assert course_routes.count_courses(class_closure.course_classes()) == 0
@@ -0,0 +1,46 @@
+# tests/test_curriculum_import.py
+import io
+import json
+import pytest
+from flask import Flask
+from app import search_index
+from app.config import Config
+from app.curriculum import CurriculumError, read_curriculum
+from app.routes import curriculum as curriculum_routes
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.register_blueprint(curriculum_routes.curriculum_bp)
+    return app.test_client()
+
+@pytest.mark.parametrize('body', [None, 'mm1', 5, True, {'courses': 'mm1'}, {'relations': {}}, ['mm1'], {'relations': [3]}])
+def test_import_rejects_bodies_of_the_wrong_shape(client, body, monkeypatch):
+    monkeypatch.setattr(curriculum_routes, 'run_import', lambda *args, **kwargs: pytest.fail('the import ran'))
+    response = client.post('/curriculum/import', data=json.dumps(body), content_type='application/json')
+    assert response.status_code == 400
+    assert response.json['errors']
+
+def test_uploaded_json_of_the_wrong_shape_is_a_curriculum_error():
+    with pytest.raises(CurriculumError):
+        read_curriculum(io.BytesIO(b'"mm1"'), 'json')
+
+def test_import_queues_the_embedding_rebuild(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(curriculum_routes, 'write_transaction', lambda *args: ({'created': 1}, ['mm1']))
+    monkeypatch.setattr(curriculum_routes, 'classes_changed', lambda: None)
+    monkeypatch.setattr(curriculum_routes, 'rebuild_course_embeddings', lambda: pytest.fail('the request rebuilt the index'))
+    monkeypatch.setattr(curriculum_routes, 'queue_rebuild_course_embeddings', lambda: calls.append('queued'))
+    response = client.post('/curriculum/import', json=[{'ns0__maMonHoc': 'mm1'}])
+    assert response.status_code == 200
+    assert calls == ['queued']
+
+def test_queued_rebuild_runs_on_the_write_thread(course_rows, make_store, monkeypatch):
+    store = make_store()
+    monkeypatch.setattr(search_index, 'course_store', store)
+    monkeypatch.setattr(Config, 'SEARCH_ENABLED', True)
+    search_index.queue_rebuild_course_embeddings()
+    # The executor has one thread, so this runs after the rebuild
+    search_index._write_executor.submit(lambda: None).result()
+    assert store.loaded
+    assert sorted(store.entries) == ['n:0', 'n:1', 'n:2', 'n:3']
@@ -0,0 +1,90 @@
+# tests/test_curriculum_plan.py
+import random
+import pytest
+from app.curriculum_plan import CurriculumPlan
+
+def _courses(n):
+    return {f'c{i:02}': {'course_id': f'c{i:02}', 'ns0__maMonHoc': f'mm{i:02}', 'rdfs__label': f'Môn {i}'} for i in range(n)}
+
+# Longest prerequisite chain ending at each course, straight from the relations;
+# None for courses in or behind a cycle
+def _earliest(courses, relations):
+    requires = {course_id: set() for course_id in courses}
+    for course_id, relation_type, target_id in relations.values():
+        if relation_type in ('ns0__tienQuyet', 'ns0__hocTruoc') and course_id in courses and target_id in courses:
+            requires[course_id].add(target_id)
+    earliest = {}
+
+    def visit(course_id, path):
+        if course_id in path:
+            return None
+        if course_id not in earliest:
+            found = [visit(target_id, path | {course_id}) for target_id in requires[course_id]]
+            earliest[course_id] = None if None in found else 1 + max(found, default=0)
+        return earliest[course_id]
+
+    for course_id in courses:
+        visit(course_id, frozenset())
+    return {course_id: value for course_id, value in earliest.items() if value is not None}
+
+def test_plan_of_a_small_programme():
+    courses = _courses(6)
+    plan = CurriculumPlan(courses, {
+        'r1': ('c01', 'ns0__tienQuyet', 'c00'),
+        'r2': ('c02', 'ns0__hocTruoc', 'c01'),
+        'r3': ('c03', 'ns0__songHanh', 'c02'),
+        'r4': ('c04', 'ns0__tienQuyet', 'c05'),
+        'r5': ('c05', 'ns0__tienQuyet', 'c04'),
+    })
+    result = plan.result()
+    assert [(course['course_id'], course['earliest_semester']) for course in result['order']] == [('c00', 1), ('c03', 1), ('c01', 2), ('c02', 3)]
+    assert [course['course_id'] for course in result['critical_path']] == ['c00', 'c01', 'c02']
+    assert [[course['course_id'] for course in cycle] for cycle in result['cycles']] == [['c04', 'c05']]
+    assert result['blocked'] == []
+    # Breaking the cycle frees both courses
+    plan.remove('r5')
+    assert plan.earliest['c04'] == 2 and plan.cycles == []
+
+def test_a_self_prerequisite_is_a_cycle():
+    plan = CurriculumPlan(_courses(2), {'r1': ('c00', 'ns0__tienQuyet', 'c00'), 'r2': ('c01', 'ns0__tienQuyet', 'c00')})
+    assert plan.cycles == [['c00']]
+    assert [course['course_id'] for course in plan.result()['blocked']] == ['c01']
+
+@pytest.mark.parametrize('seed', range(6))
+def test_incremental_updates_match_a_rebuild(seed):
+    rng = random.Random(seed)
+    courses = _courses(40)
+    relations = {}
+    next_id = 0
+    # Mostly forward edges, so the graph is acyclic most of the time
+    for _ in range(60):
+        a, b = sorted(rng.sample(sorted(courses), 2))
+        relations[f'r{next_id}'] = (b, rng.choice(['ns0__tienQuyet', 'ns0__hocTruoc', 'ns0__songHanh']), a)
+        next_id += 1
+    plan = CurriculumPlan(dict(courses), dict(relations))
+
+    for _ in range(300):
+        action = rng.random()
+        if action < 0.55:
+            a, b = rng.sample(sorted(courses), 2)
+            if rng.random() < 0.9:
+                a, b = sorted((a, b))
+            relation = (b, rng.choice(['ns0__tienQuyet', 'ns0__hocTruoc', 'ns0__songHanh']), a)
+            relation_id = f'r{next_id}'
+            next_id += 1
+            relations[relation_id] = relation
+            plan.add(relation_id, *relation)
+        elif action < 0.95 and relations:
+            relation_id = rng.choice(sorted(relations))
+            del relations[relation_id]
+            plan.remove(relation_id)
+        elif len(courses) > 5:
+            course_id = rng.choice(sorted(courses))
+            del courses[course_id]
+            relations = {relation_id: relation for relation_id, relation in relations.items() if course_id not in (relation[0], relation[2])}
+            plan.remove_course(course_id)
+
+        rebuilt = CurriculumPlan(dict(courses), dict(relations))
+        assert plan.earliest == rebuilt.earliest == _earliest(courses, relations)
+        assert plan.cycles == rebuilt.cycles
+        assert plan.result() == rebuilt.result()
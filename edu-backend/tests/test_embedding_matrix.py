@@ -0,0 +1,98 @@
+# tests/test_embedding_matrix.py
+import os
+import numpy as np
+import pytest
+from app import embedding_matrix
+from app.embedding_matrix import MatrixIndex, fit_pca
+
+def _vectors(count, width=48, rank=None, seed=0):
+    rng = np.random.default_rng(seed)
+    if rank is None:
+        return rng.standard_normal((count, width)).astype('float32')
+    # Points of an affine subspace of the given rank
+    basis = rng.standard_normal((rank, width))
+    return (rng.standard_normal((count, rank)) @ basis + rng.standard_normal(width)).astype('float32')
+
+def _cosine(vectors, query):
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors @ (query / np.linalg.norm(query))
+
+def _keys(count):
+    return [f'n:{i}' for i in range(count)]
+
+def test_fit_pca_components_are_orthonormal():
+    vectors = _vectors(50, rank=6)
+    mean, components = fit_pca(vectors, 6)
+    assert components.shape == (48, 6)
+    assert np.allclose(components.T @ components, np.eye(6), atol=1e-4)
+    # Six components span the whole subspace
+    centered = vectors - mean
+    assert np.allclose(centered @ components @ components.T, centered, atol=1e-3)
+
+@pytest.mark.parametrize('chunk_rows', [4096, 7])
+def test_search_matches_float32_cosine(chunk_rows):
+    vectors = _vectors(200)
+    index = MatrixIndex(chunk_rows=chunk_rows)
+    index.add(_keys(200), vectors)
+    assert index.matrix.dtype == np.float16
+
+    query = _vectors(1, seed=1)[0]
+    expected = _cosine(vectors, query)
+    results = index.search(query, 10)
+    assert [key for key, _ in results] == [f'n:{i}' for i in np.argsort(-expected)[:10]]
+    assert [score for _, score in results] == pytest.approx(np.sort(expected)[::-1][:10], abs=2e-3)
+    assert dict(index.score(query, ['n:5', 'n:9', 'missing'])) == pytest.approx({'n:5': expected[5], 'n:9': expected[9]}, abs=2e-3)
+
+def test_pca_keeps_the_ranking_of_centered_vectors():
+    vectors = _vectors(120, rank=8)
+    index = MatrixIndex(dims=8)
+    index.add(_keys(120), vectors)
+    assert index.matrix.shape == (120, 8)
+
+    query = _vectors(1, rank=8, seed=0)[0] + 0.01
+    mean = vectors.mean(axis=0)
+    expected = _cosine(vectors - mean, query - mean)
+    assert [key for key, _ in index.search(query, 5)] == [f'n:{i}' for i in np.argsort(-expected)[:5]]
+
+def test_updates_reuse_the_fitted_projection():
+    vectors = _vectors(30, rank=4)
+    index = MatrixIndex(dims=4)
+    index.add(_keys(30), vectors)
+    components = index.components
+    index.update('n:3', vectors[7])
+    index.add(['n:99'], [vectors[8]])
+    assert index.components is components
+    assert len(index) == 31 and index.keys()[-2:] == ['n:3', 'n:99']
+    assert index.search(vectors[7], 2)[0][1] == pytest.approx(1.0, abs=2e-3)
+    assert index.remove(['n:3', 'n:99', 'missing']) == 2
+    assert 'n:3' not in index and len(index) == 29
+
+def test_save_and_load_share_one_version(tmp_path):
+    path = str(tmp_path / 'courses.f16.npy')
+    vectors = _vectors(40, rank=6)
+    index = MatrixIndex(dims=6)
+    index.add(_keys(40), vectors)
+    index.save(path)
+
+    loaded = MatrixIndex(dims=6)
+    assert loaded.load(path)
+    assert isinstance(loaded.matrix, np.memmap) and loaded.matrix.dtype == np.float16
+    assert loaded.keys() == index.keys()
+    assert np.array_equal(loaded.components, index.components)
+    query = vectors[3]
+    assert loaded.search(query, 5) == index.search(query, 5)
+    # An index saved with another projection width is not loaded
+    assert not MatrixIndex(dims=0).load(path)
+    assert not MatrixIndex().load(str(tmp_path / 'missing.npy'))
+
+def test_save_removes_stale_versions(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_matrix, 'STALE_VERSION_SECONDS', -1)
+    path = str(tmp_path / 'courses.f16.npy')
+    index = MatrixIndex(dims=4)
+    index.add(_keys(20), _vectors(20, rank=4))
+    for _ in range(4):
+        index.save(path)
+    # The published version and the one it replaced, each a matrix and a projection
+    versions = sorted(name for name in os.listdir(tmp_path) if name.startswith('courses.f16.') and name != 'courses.f16.npy.meta.json')
+    assert len(versions) == 4
+    assert MatrixIndex(dims=4).load(path)
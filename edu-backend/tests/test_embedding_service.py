@@ -0,0 +1,61 @@
+# tests/test_embedding_service.py
+# ENCODER_BACKEND=service: which failures of the shared service fall back to
+# encoding in the worker. The in-process model is replaced by a counter.
+import logging
+import socket
+import threading
+import pytest
+import torch
+from app import embedding_service
+from app.config import Config
+from app.embedding_service import EmbeddingClient, encode_texts
+
+@pytest.fixture
+def local_calls(monkeypatch):
+    from app import encoder
+    calls = []
+
+    def encode_batch(texts, batch_size=32, encoder=None):
+        calls.append(list(texts))
+        return torch.ones((len(texts), 4))
+
+    monkeypatch.setattr(encoder, 'encode_batch', encode_batch)
+    monkeypatch.setattr(Config, 'ENCODER_BACKEND', 'service')
+    monkeypatch.setattr(Config, 'ENCODER_FALLBACK', True)
+    return calls
+
+def test_missing_service_falls_back_with_a_warning(local_calls, tmp_path, monkeypatch, caplog):
+    monkeypatch.setattr(embedding_service, 'client', EmbeddingClient(str(tmp_path / 'missing.sock'), 1))
+    with caplog.at_level(logging.WARNING, logger='app.embedding_service'):
+        assert encode_texts(['a', 'b']).shape == (2, 4)
+    assert local_calls == [['a', 'b']]
+    assert 'unavailable' in caplog.text
+
+def test_refused_connection_falls_back(local_calls, tmp_path, monkeypatch):
+    path = str(tmp_path / 'stale.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.close()
+    monkeypatch.setattr(embedding_service, 'client', EmbeddingClient(path, 1))
+    assert encode_texts(['a']).shape == (1, 4)
+    assert local_calls == [['a']]
+
+def test_slow_service_times_out_without_falling_back(local_calls, tmp_path, monkeypatch):
+    path = str(tmp_path / 'slow.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    accepted = []
+    # Accepts connections and never answers
+    thread = threading.Thread(target=lambda: [accepted.append(server.accept()[0]) for _ in range(2)], daemon=True)
+    thread.start()
+    monkeypatch.setattr(embedding_service, 'client', EmbeddingClient(path, 0.2))
+    try:
+        with pytest.raises(TimeoutError):
+            encode_texts(['a'])
+        assert local_calls == []
+        assert len(accepted) == 1
+    finally:
+        server.close()
+        for connection in accepted:
+            connection.close()
@@ -0,0 +1,82 @@
+# tests/test_lexical_index.py
+import math
+import unicodedata
+import pytest
+from app.lexical_index import LexicalIndex, fold_diacritics, normalize_code, tokenize
+
+COURSES = {
+    'n:0': ('Lập trình Java', 'INT2204'),
+    'n:1': ('Lập trình hướng đối tượng', 'INT2204 1'),
+    'n:2': ('Cấu trúc dữ liệu và giải thuật', 'INT2210'),
+    'n:3': ('Đại số tuyến tính', 'MAT1093'),
+    'n:4': ('PBL: Dự án công nghệ', 'PBL1'),
+}
+
+@pytest.fixture
+def index():
+    index = LexicalIndex()
+    for doc_id, (label, code) in COURSES.items():
+        index.add(doc_id, label, code)
+    return index
+
+@pytest.mark.parametrize('text, folded', [
+    ('Lập trình', 'Lap trinh'),
+    ('Đại số tuyến tính', 'Dai so tuyen tinh'),
+    ('đồ án', 'do an'),
+    ('Cấu trúc dữ liệu', 'Cau truc du lieu'),
+])
+def test_fold_diacritics(text, folded):
+    assert fold_diacritics(text) == folded
+    # Decomposed input (as some keyboards and browsers send it) folds the same way
+    assert fold_diacritics(unicodedata.normalize('NFD', text)) == folded
+
+def test_tokens_match_with_or_without_accents():
+    assert tokenize('Lập Trình JAVA') == tokenize('lap trinh java') == ['lap', 'trinh', 'java']
+
+def test_tokens_expand_abbreviations_and_code_prefixes():
+    assert tokenize('PBL1') == ['pbl1', 'pbl']
+    assert tokenize('PBL: Dự án') == ['pbl', 'du', 'an', 'project', 'based', 'learning']
+
+def test_normalize_code():
+    assert normalize_code(' int 2204 ') == 'INT2204'
+    assert normalize_code(None) == ''
+
+def test_exact_code(index):
+    assert index.exact_code('int2204') == ['n:0']
+    assert index.exact_code('INT 2204 1') == ['n:1']
+    assert index.exact_code('INT22') == []
+    index.remove('n:0')
+    assert index.exact_code('INT2204') == []
+
+def test_search_ignores_accents(index):
+    assert set(index.search('lap trinh')) == {'n:0', 'n:1'}
+    assert index.search('lap trinh') == index.search('LẬP TRÌNH')
+    assert max(index.search('dai so'), key=index.search('dai so').get) == 'n:3'
+    assert set(index.search('project based learning')) == {'n:4'}
+
+def test_scores_are_bm25(index):
+    doc_count = len(COURSES)
+    average_length = sum(sum(terms.values()) for terms in index.doc_terms.values()) / doc_count
+    expected = {}
+    for token in set(tokenize('lập trình java')):
+        docs = {doc_id: terms[token] for doc_id, terms in index.doc_terms.items() if token in terms}
+        idf = math.log(1 + (doc_count - len(docs) + 0.5) / (len(docs) + 0.5))
+        for doc_id, tf in docs.items():
+            length = sum(index.doc_terms[doc_id].values())
+            expected[doc_id] = expected.get(doc_id, 0.0) + idf * tf * 2.5 / (tf + 1.5 * (0.25 + 0.75 * length / average_length))
+    assert index.search('lập trình java') == pytest.approx(expected)
+    # The course matching the rarer term as well ranks first
+    assert max(expected, key=expected.get) == 'n:0'
+
+def test_re_adding_and_removing_keeps_the_totals(index):
+    total_length = index.total_length
+    index.add('n:2', 'Cấu trúc dữ liệu và giải thuật', 'INT2210')
+    assert index.total_length == total_length
+    index.add('n:2', 'Mạng máy tính', 'INT2213')
+    assert index.exact_code('INT2210') == [] and index.exact_code('INT2213') == ['n:2']
+    assert 'n:2' not in index.search('giai thuat')
+    for doc_id in COURSES:
+        index.remove(doc_id)
+    assert len(index) == 0
+    assert (index.postings, index.codes, index.total_length) == ({}, {}, 0)
+    assert index.search('lap trinh') == {}
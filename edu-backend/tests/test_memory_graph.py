@@ -0,0 +1,63 @@
+# tests/test_memory_graph.py
+# The in-memory backend against the query registry, and the routes on top of it
+import json
+import pytest
+from app import utils
+from app.config import Config
+from app.memory_graph import HANDLERS, WRITES, MemoryDriver
+from app.queries import QUERIES, READ_QUERIES, named_query
+
+# Statements the memory backend deliberately answers with UnsupportedQuery
+NEO4J_ONLY = {
+    'login_user', 'user_by_username', 'users_by_identity', 'other_users_by_identity',
+    'courses_by_code', 'merge_courses', 'merge_relations_by_code', 'semester_relations_by_code'
+}
+
+def test_every_handler_answers_a_registered_query():
+    assert set(HANDLERS) <= {name for name, _ in QUERIES}
+
+def test_every_query_has_a_handler_or_is_neo4j_only():
+    assert {name for name, _ in QUERIES} - set(HANDLERS) == NEO4J_ONLY
+
+def test_read_queries_never_write():
+    assert not WRITES & READ_QUERIES
+
+@pytest.fixture
+def driver(memory_driver):
+    return memory_driver
+
+@pytest.fixture
+def client(driver, monkeypatch):
+    from app import create_app
+    monkeypatch.setattr(Config, 'GRAPH_BACKEND', 'memory')
+    return create_app().test_client()
+
+def _user_courses(driver):
+    with driver.session() as session:
+        return session.execute_read(utils.run_query, named_query('all_user_courses'))
+
+def test_writes_reach_other_workers_on_the_same_log(driver, tmp_path):
+    other = MemoryDriver(driver.source, driver.log_path)
+    assert _user_courses(other) == []
+    with driver.session() as session:
+        session.execute_write(utils.run_query, named_query('create_user_course'), {'user_id': 'sv1', 'course_id': 'n:1', 'status': 'đang học'})
+    assert [row['user_id'] for row in _user_courses(other)] == ['sv1']
+    # A fresh start replays the log
+    assert _user_courses(MemoryDriver(driver.source, driver.log_path)) == _user_courses(other)
+
+def test_course_routes_read_the_ontology(client, driver):
+    response = client.get('/curriculum/export?format=json')
+    assert response.status_code == 200
+    exported = json.loads(response.get_data(as_text=True))
+    graph = driver.graph
+    assert sorted(course['ns0__maMonHoc'] for course in exported['courses']) == sorted(
+        graph.props(node_id)['ns0__maMonHoc'] for node_id in graph.nodes if 'ns0__maMonHoc' in graph.props(node_id))
+
+    course_id = graph.courses()[0]
+    response = client.get(f'/courses/{course_id}')
+    assert response.status_code == 200
+
+def test_neo4j_only_routes_answer_501(client):
+    response = client.post('/login', json={'username': 'sv1', 'password': 'x'})
+    assert response.status_code == 501
+    assert 'GRAPH_BACKEND=neo4j' in response.json['error']
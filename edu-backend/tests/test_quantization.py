@@ -0,0 +1,57 @@
+# tests/test_quantization.py
+# The int8 encoder mode against fp32 on the small local model of the
+# quantization benchmark, so nothing is downloaded.
+#
+#   python -m pytest tests
+import pytest
+import torch
+from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+from app.encoder import encode_batch, quantize_model
+from app.text_processing import preprocess_text
+from benchmarks.encode_batch_benchmark import DEFAULT_ONTOLOGY
+from benchmarks.quantization_benchmark import DEFAULT_QUERIES, load_course_labels, tiny_encoder, top_k
+
+K = 10
+# Share of the fp32 top-10 that int8 keeps, on average and for the worst query
+MIN_MEAN_OVERLAP = 0.95
+MIN_QUERY_OVERLAP = 0.7
+
+@pytest.fixture(scope='module')
+def catalogue():
+    return [preprocess_text(label) for label in load_course_labels(DEFAULT_ONTOLOGY)]
+
+@pytest.fixture(scope='module')
+def encoders(catalogue):
+    fp32 = tiny_encoder(catalogue)
+    return fp32, (fp32[0], quantize_model(fp32[1]))
+
+def test_quantize_model_replaces_every_linear(encoders):
+    fp32, int8 = encoders
+    linear = [name for name, module in fp32[1].named_modules() if isinstance(module, torch.nn.Linear)]
+    modules = dict(int8[1].named_modules())
+    assert linear
+    assert all(isinstance(modules[name], DynamicLinear) for name in linear)
+    assert not any(type(module) is torch.nn.Linear for module in modules.values())
+
+def test_quantize_model_keeps_the_fp32_model(encoders):
+    fp32, _ = encoders
+    assert any(type(module) is torch.nn.Linear for module in fp32[1].modules())
+
+def test_encode_batch_shape_matches(encoders, catalogue):
+    fp32, int8 = encoders
+    texts = catalogue[:20] + DEFAULT_QUERIES[:5]
+    expected = encode_batch(texts, encoder=fp32)
+    quantized = encode_batch(texts, encoder=int8)
+    assert expected.shape == quantized.shape == (len(texts), fp32[1].config.hidden_size)
+    assert quantized.dtype == torch.float32
+    assert encode_batch([], encoder=int8).shape == (0, fp32[1].config.hidden_size)
+
+def test_top_k_overlap_with_fp32(encoders, catalogue):
+    fp32, int8 = encoders
+    queries = [preprocess_text(query) for query in DEFAULT_QUERIES] + catalogue
+    results = {}
+    for mode, encoder in (('fp32', fp32), ('int8', int8)):
+        results[mode] = top_k(encode_batch(queries, encoder=encoder), encode_batch(catalogue, encoder=encoder), K)
+    overlaps = [len(a & b) / len(a) for a, b in zip(results['fp32'], results['int8'])]
+    assert sum(overlaps) / len(overlaps) >= MIN_MEAN_OVERLAP
+    assert min(overlaps) >= MIN_QUERY_OVERLAP
@@ -0,0 +1,126 @@
+# tests/test_rdf_loader.py
+# The RDF/XML and Turtle parsers, n10s naming, and what a load or a --diff load
+# writes. Writes go to a recorder standing in for the Neo4j transaction.
+import os
+import pytest
+from app import rdf_loader
+from app.rdf_loader import EDU, PREFIXES, RDF, RDF_TYPE, XSD, iter_triples, load_ontology, short_name
+
+ONTOLOGY_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+
+def _named(triples):
+    return {triple for triple in triples if not any(str(part).startswith('bnode://') for part in triple)}
+
+def test_rdfxml_and_turtle_exports_parse_to_the_same_triples():
+    from_xml = list(iter_triples(os.path.join(ONTOLOGY_DIR, 'ontology.rdf')))
+    from_turtle = list(iter_triples(os.path.join(ONTOLOGY_DIR, 'ontology.owl')))
+    assert len(set(from_xml)) == len(set(from_turtle))
+    # Blank node ids are derived from where the node appears, so only named triples compare
+    assert _named(from_xml) == _named(from_turtle)
+    assert any(predicate == EDU + 'maMonHoc' for _, predicate, _, _ in from_xml)
+
+def test_turtle_terms(tmp_path):
+    path = tmp_path / 'sample.ttl'
+    path.write_text('''@prefix : <http://example.org/#> .
+:a a :Course ; :credits 3 ; :weight 1.5 ; :elective false ;
+   :label """multi
+line""" , "second"@vi ;
+   :parts ( :b :c ) ;
+   :meta [ :note "x" ] .
+''', encoding='utf-8')
+    triples = list(iter_triples(str(path)))
+    subject = 'http://example.org/#a'
+    assert (subject, RDF_TYPE, 'http://example.org/#Course', None) in triples
+    assert (subject, 'http://example.org/#credits', '3', XSD + 'integer') in triples
+    assert (subject, 'http://example.org/#weight', '1.5', XSD + 'decimal') in triples
+    assert (subject, 'http://example.org/#elective', 'false', XSD + 'boolean') in triples
+    assert (subject, 'http://example.org/#label', 'multi\nline', '') in triples
+    assert (subject, 'http://example.org/#label', 'second', '') in triples
+    firsts = [obj for _, predicate, obj, _ in triples if predicate == RDF + 'first']
+    assert firsts == ['http://example.org/#b', 'http://example.org/#c']
+    assert any(predicate == 'http://example.org/#note' and obj == 'x' for _, predicate, obj, _ in triples)
+
+def test_short_name_assigns_prefixes_per_parse():
+    before = dict(PREFIXES)
+    first = dict(PREFIXES)
+    second = dict(PREFIXES)
+    assert short_name(EDU + 'hocKy', first) == 'ns0__hocKy'
+    assert short_name('http://example.org/a#x', first) == 'ns1__x'
+    assert short_name('http://example.org/b#y', first) == 'ns2__y'
+    assert short_name('http://example.org/b#y', second) == 'ns1__y'
+    assert PREFIXES == before
+
+
+class Recorder:
+    def __init__(self):
+        self.props = {}
+        self.labels = {}
+        self.relationships = set()
+
+    def run(self, query, params=None):
+        if query is rdf_loader.MERGE_NODES_QUERY:
+            for row in params['rows']:
+                props = self.props.setdefault(row['uri'], {})
+                for key, value in row['props'].items():
+                    if value is None:
+                        props.pop(key, None)
+                    else:
+                        props[key] = value
+        elif 'DETACH DELETE' in query:
+            for uri in params['uris']:
+                self.props.pop(uri, None)
+        elif 'REMOVE n:' in query or 'SET n:' in query:
+            label = query.split('n:', 2)[-1].strip('` \n')
+            for uri in params['uris']:
+                labels = self.labels.setdefault(uri, set())
+                (labels.discard if 'REMOVE' in query else labels.add)(label)
+        else:
+            rel_type = query.split('-[')[-1].split(']')[0].split(':')[-1].strip('`')
+            for pair in params['pairs']:
+                (self.relationships.discard if 'DELETE rel' in query else self.relationships.add)((pair['s'], rel_type, pair['o']))
+        return self
+
+    def consume(self):
+        return None
+
+@pytest.fixture
+def graph(monkeypatch):
+    recorder = Recorder()
+    monkeypatch.setattr(rdf_loader, 'write_transaction', lambda work, *args: work(recorder, *args))
+    monkeypatch.setattr(rdf_loader, 'execute_write', lambda query, params=None: [])
+    monkeypatch.setattr(rdf_loader, 'classes_changed', lambda: None)
+    monkeypatch.setattr(rdf_loader, 'rebuild_course_embeddings', lambda: None)
+    return recorder
+
+def _load(tmp_path, body, diff):
+    path = tmp_path / 'ontology.ttl'
+    path.write_text('@prefix : <http://localhost/ontologies/2024/10/11/edu_program#> .\n' + body, encoding='utf-8')
+    return load_ontology(str(path), str(tmp_path / 'state.jsonl'), diff=diff, batch_size=2)
+
+def test_full_load_writes_n10s_shape(graph, tmp_path):
+    report = _load(tmp_path, ':mm01 a :monHoc ; :hocKy 1 ; :tienQuyet :mm02 .\n:mm02 a :monHoc ; :hocKy 2 .\n', diff=False)
+    assert report['mode'] == 'full' and report['added'] == 5
+    assert graph.props[EDU + 'mm01'] == {'ns0__hocKy': 1}
+    assert graph.labels[EDU + 'mm01'] == {'ns0__monHoc'}
+    assert (EDU + 'mm01', 'ns0__tienQuyet', EDU + 'mm02') in graph.relationships
+    assert (EDU + 'mm01', 'rdf__type', EDU + 'monHoc') in graph.relationships
+
+def test_diff_writes_only_changes(graph, tmp_path):
+    _load(tmp_path, ':mm01 a :monHoc ; :hocKy 1 ; :tienQuyet :mm02 .\n:mm02 a :monHoc .\n', diff=False)
+    report = _load(tmp_path, ':mm01 a :monHoc ; :hocKy 2 .\n:mm03 a :monHoc .\n', diff=True)
+    assert report['mode'] == 'diff'
+    assert (report['added'], report['removed'], report['unchanged']) == (2, 3, 1)
+    assert graph.props[EDU + 'mm01'] == {'ns0__hocKy': 2}
+    assert (EDU + 'mm01', 'ns0__tienQuyet', EDU + 'mm02') not in graph.relationships
+    assert EDU + 'mm02' not in graph.props
+    assert graph.labels[EDU + 'mm03'] == {'ns0__monHoc'}
+
+def test_diff_keeps_a_multi_valued_literal_that_lost_one_value(graph, tmp_path):
+    _load(tmp_path, ':mm01 :tenKhac "a", "b", "c" .\n', diff=False)
+    assert graph.props[EDU + 'mm01'] == {'ns0__tenKhac': 'c'}
+    _load(tmp_path, ':mm01 :tenKhac "a", "b" .\n', diff=True)
+    assert graph.props[EDU + 'mm01'] == {'ns0__tenKhac': 'b'}
+    _load(tmp_path, ':mm01 :tenKhac "a" ; :hocKy 1 .\n', diff=True)
+    assert graph.props[EDU + 'mm01'] == {'ns0__tenKhac': 'a', 'ns0__hocKy': 1}
+    _load(tmp_path, ':mm01 :hocKy 1 .\n', diff=True)
+    assert graph.props[EDU + 'mm01'] == {'ns0__hocKy': 1}
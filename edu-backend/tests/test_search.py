@@ -0,0 +1,50 @@
+# tests/test_search.py
+# POST /search on a worker whose store has not been built: exact course codes
+# are answered from the saved index, or from the graph when nothing is saved,
+# without the model.
+import pytest
+from flask import Flask
+from app.routes import search as search_routes
+
+def _fail(*args, **kwargs):
+    raise AssertionError('the model or the graph was used')
+
+@pytest.fixture
+def cold_store(course_rows, make_store, monkeypatch):
+    make_store().build()
+    store = make_store()
+    monkeypatch.setattr(search_routes, 'course_store', store)
+    return store
+
+@pytest.fixture
+def client(cold_store):
+    app = Flask(__name__)
+    app.register_blueprint(search_routes.search_bp)
+    return app.test_client()
+
+def test_exact_code_on_a_cold_store_skips_the_model(client, cold_store, monkeypatch):
+    monkeypatch.setattr(cold_store, 'build', _fail)
+    monkeypatch.setattr(search_routes, 'encode_query', _fail)
+    response = client.post('/search', json={'query': 'MM2'})
+    assert response.status_code == 200
+    assert response.json == [{'elementId': 'n:2', 'rdfs__label': 'Mạng máy tính', 'similarity': 1.0}]
+    assert cold_store.loaded
+
+def test_exact_code_without_a_saved_index_skips_the_model(course_rows, make_store, monkeypatch):
+    from app import search_index
+    store = make_store()
+    monkeypatch.setattr(search_routes, 'course_store', store)
+    monkeypatch.setattr(search_index, 'encode_texts', _fail)
+    monkeypatch.setattr(search_routes, 'encode_query', _fail)
+    app = Flask(__name__)
+    app.register_blueprint(search_routes.search_bp)
+    response = app.test_client().post('/search', json={'query': 'mm1'})
+    assert response.status_code == 200
+    assert response.json == [{'elementId': 'n:1', 'rdfs__label': 'Cấu trúc dữ liệu', 'similarity': 1.0}]
+    assert not store.loaded
+
+def test_other_queries_rank_with_the_model(client, embed, monkeypatch):
+    monkeypatch.setattr(search_routes, 'encode_query', lambda text: embed([text])[0])
+    response = client.post('/search', json={'query': 'mạng máy tính'})
+    assert response.status_code == 200
+    assert response.json[0]['elementId'] == 'n:2'
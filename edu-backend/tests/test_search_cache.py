@@ -0,0 +1,83 @@
+# tests/test_search_cache.py
+import pytest
+from flask import Flask
+from app import graph_version, search_cache
+from app.routes import search as search_routes
+from app.search_cache import LRUCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(search_cache.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = LRUCache(2, 60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.metrics()['evictions'] == 1
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = LRUCache(10, 60)
+    cache.set('a', 1)
+    clock[0] += 59
+    assert cache.get('a') == 1
+    clock[0] += 2
+    assert cache.get('a', 'gone') == 'gone'
+    # Reading does not extend an entry; setting it again does
+    cache.set('a', 2)
+    clock[0] += 59
+    assert cache.get('a') == 2
+    metrics = cache.metrics()
+    assert (metrics['hits'], metrics['misses'], metrics['expirations'], metrics['size']) == (2, 1, 1, 1)
+    assert metrics['hit_rate'] == pytest.approx(2 / 3)
+
+def test_size_zero_disables_the_cache():
+    cache = LRUCache(0, 60)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+    assert cache.metrics()['size'] == 0
+
+def test_versioned_keys_miss_after_a_bump():
+    cache = LRUCache(10, 60)
+    cache.set(('q', graph_version.current(graph_version.COURSE_LABELS)), 'old')
+    graph_version.bump(graph_version.COURSE_LABELS)
+    assert cache.get(('q', graph_version.current(graph_version.COURSE_LABELS))) is None
+
+@pytest.fixture
+def search(course_rows, make_store, embed, monkeypatch):
+    store = make_store()
+    encoded = []
+    monkeypatch.setattr(search_routes, 'course_store', store)
+    monkeypatch.setattr(search_routes, 'encode_query', lambda text: encoded.append(text) or embed([text])[0])
+    monkeypatch.setattr(search_routes, 'query_embedding_cache', LRUCache(10, 60))
+    monkeypatch.setattr(search_routes, 'result_cache', LRUCache(10, 60))
+    app = Flask(__name__)
+    app.register_blueprint(search_routes.search_bp)
+    client = app.test_client()
+    return lambda query: client.post('/search', json={'query': query}).json, store, encoded
+
+def test_results_are_cached_until_a_label_changes(search, course_rows, monkeypatch):
+    run, store, encoded = search
+    ranked = []
+    store_search = store.search
+    monkeypatch.setattr(store, 'search', lambda *args: ranked.append(args) or store_search(*args))
+    first = run('mạng máy tính')
+    assert first[0]['rdfs__label'] == 'Mạng máy tính'
+
+    assert run('mạng máy tính') == first
+    assert len(ranked) == 1
+    assert encoded == ['mạng máy tính']
+
+    # A relabel bumps the course label version: the result is recomputed, but the
+    # query embedding is still cached
+    course_rows[2]['courseName'] = 'Mạng máy tính nâng cao'
+    store.refresh('n:2')
+    assert run('mạng máy tính')[0]['rdfs__label'] == 'Mạng máy tính nâng cao'
+    assert len(ranked) == 2
+    assert encoded == ['mạng máy tính']
+    assert search_routes.result_cache.metrics()['hits'] == 1
@@ -0,0 +1,38 @@
+# tests/test_search_index.py
+# CourseEmbeddingStore shared by several workers, each worker being a store on
+# the same files (see the course_rows and make_store fixtures)
+import numpy as np
+
+def _saved_ids(tmp_path):
+    with np.load(tmp_path / 'courses.npz') as data:
+        return sorted(data['ids'].tolist())
+
+def test_refresh_on_a_cold_store_leaves_the_saved_index_alone(course_rows, make_store, tmp_path):
+    make_store().build()
+    course_rows.append({'elementId': 'n:9', 'code': 'mm9', 'courseName': 'Hệ điều hành'})
+    cold = make_store()
+    cold.refresh('n:9')
+    cold.remove('n:0')
+    assert not cold.loaded
+    assert _saved_ids(tmp_path) == ['n:0', 'n:1', 'n:2', 'n:3']
+
+def test_writes_merge_what_other_workers_saved(course_rows, make_store, tmp_path):
+    first = make_store()
+    first.build()
+    second = make_store()
+    assert second.load()
+    course_rows.append({'elementId': 'n:8', 'code': 'mm8', 'courseName': 'Hệ điều hành'})
+    first.refresh('n:8')
+    course_rows.append({'elementId': 'n:9', 'code': 'mm9', 'courseName': 'Trí tuệ nhân tạo'})
+    second.refresh('n:9')
+    first.remove('n:0')
+    assert _saved_ids(tmp_path) == ['n:1', 'n:2', 'n:3', 'n:8', 'n:9']
+    assert sorted(first.entries) == ['n:1', 'n:2', 'n:3', 'n:8', 'n:9']
+
+def test_load_serves_the_saved_vector_index(course_rows, make_store, embed, tmp_path):
+    make_store().build()
+    store = make_store()
+    assert store.load()
+    assert sorted(store.vectors.keys()) == sorted(store.entries)
+    assert store.search(embed(['mạng máy tính'])[0], 1)[0][0] == 'n:2'
+    assert not [path for path in tmp_path.iterdir() if path.suffix == '.npz' and path.name != 'courses.npz']
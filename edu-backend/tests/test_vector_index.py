@@ -0,0 +1,53 @@
+# tests/test_vector_index.py
+import threading
+import numpy as np
+from app.vector_index import VectorIndex
+
+def _index(keys, seed=0):
+    index = VectorIndex()
+    index.add(keys, np.random.default_rng(seed).random((len(keys), 16)))
+    return index
+
+def test_save_and_load_round_trip(tmp_path):
+    index = _index(['a', 'b', 'c'])
+    index.remove(['b'])
+    path = str(tmp_path / 'courses.faiss')
+    index.save(path)
+    loaded = VectorIndex()
+    assert loaded.load(path)
+    assert sorted(loaded.keys()) == ['a', 'c']
+    assert loaded.next_id == index.next_id
+    query = np.random.default_rng(1).random(16)
+    assert loaded.search(query, 2) == index.search(query, 2)
+    assert sorted(tmp_path.iterdir()) == [tmp_path / 'courses.faiss']
+
+def test_load_rejects_missing_and_foreign_files(tmp_path):
+    (tmp_path / 'old.faiss').write_bytes(b'not an index')
+    assert not VectorIndex().load(str(tmp_path / 'old.faiss'))
+    assert not VectorIndex().load(str(tmp_path / 'missing.faiss'))
+
+# Every load sees an index and id map written by the same save
+def test_concurrent_saves_never_mix_index_and_ids(tmp_path):
+    path = str(tmp_path / 'courses.faiss')
+    _index(['seed']).save(path)
+    errors = []
+
+    def writer(number):
+        index = _index([f'w{number}_{i}' for i in range(5 + number)], number)
+        for _ in range(20):
+            index.save(path)
+
+    def reader():
+        for _ in range(100):
+            index = VectorIndex()
+            if index.load(path):
+                if index.index.ntotal != len(index) or len({key.split('_')[0] for key in index.keys()}) != 1:
+                    errors.append(index.keys())
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)] + [threading.Thread(target=reader) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir()] == ['courses.faiss']